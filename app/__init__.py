@@ -1,19 +1,41 @@
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+import numpy as np
 from .config import Config
 from .utils.grafo_builder import GrafoBuilder
 from .utils.mapa_utils import MapaUtils
 from .utils.parser_csv import ParserCSV
+from .utils.matriz_distancias import MatrizDistancias, obtener_matriz_persistida
 from .algoritmos.bellman_ford import BellmanFord
 from .algoritmos.programacion_dinamica import ProgramacionDinamica
 from .algoritmos.backtracking import Backtracking
+from .algoritmos.clarke_wright import ClarkeWright
+from .algoritmos.insercion_ventanas import InsercionVentanas
+from .algoritmos.alns import ALNS
+from .algoritmos.descomposicion import Descomposicion
 import os
 import json
 from datetime import datetime
 
 
+class ProveedorJSON(DefaultJSONProvider):
+    """Serializador JSON que entiende matrices de distancias y tipos de NumPy"""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, MatrizDistancias):
+            return o.a_dict()
+        if isinstance(o, np.generic):
+            return o.item()
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        return DefaultJSONProvider.default(o)
+
+
 def create_app():
     """Factory function to create and configure the Flask application"""
     app = Flask(__name__)
+    app.json = ProveedorJSON(app)
 
     # Load configuration
     config = Config()
@@ -26,12 +48,21 @@ def create_app():
         "grafo": None,
         "resultados": None,
     }
-    app.config["GRAFO_BUILDER"] = GrafoBuilder()
+    app.config["GRAFO_BUILDER"] = GrafoBuilder(
+        config.MODO_MATRIZ_DISTANCIAS,
+        config.TRABAJADORES_MATRIZ,
+        modo_grafo=config.MODO_GRAFO,
+        k_vecinos=config.K_VECINOS,
+    )
     app.config["MAPA_UTILS"] = MapaUtils()
     app.config["PARSER_CSV"] = ParserCSV()
     app.config["BELLMAN_FORD"] = BellmanFord
     app.config["PROGRAMACION_DINAMICA"] = ProgramacionDinamica
     app.config["BACKTRACKING"] = Backtracking
+    app.config["CLARKE_WRIGHT"] = ClarkeWright
+    app.config["INSERCION_VENTANAS"] = InsercionVentanas
+    app.config["ALNS"] = ALNS
+    app.config["DESCOMPOSICION"] = Descomposicion
 
     # Cargar datos iniciales
     parser_csv = ParserCSV()
@@ -43,6 +74,14 @@ def create_app():
             with open(archivo_csv, "r", encoding="utf-8") as f:
                 clientes = parser_csv.leer_clientes_csv(f)
                 datos_globales["clientes"] = clientes
+                if config.PERSISTIR_MATRIZ:
+                    # Deja la matriz en la caché desde la instantánea en disco
+                    obtener_matriz_persistida(
+                        archivo_csv,
+                        [grafo_builder.deposito] + clientes,
+                        config.MODO_MATRIZ_DISTANCIAS,
+                        trabajadores=config.TRABAJADORES_MATRIZ,
+                    )
                 datos_globales["grafo"] = grafo_builder.construir_grafo(clientes)
             print(f"✅ CSV cargado: {len(clientes)} clientes")
         else:
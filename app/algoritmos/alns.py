@@ -0,0 +1,579 @@
+import math
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from ..utils.calculos_comunes import construir_matriz_distancias
+from .clarke_wright import ClarkeWright
+
+MINUTOS_POR_KM = 2  # estimación
+TIEMPO_MAXIMO_RUTA = 480  # 8 horas
+TIEMPO_ALNS = 10.0  # segundos
+# Costo (km) de no atender a un cliente de prioridad 1; se divide por la prioridad
+PENALIZACION_NO_ASIGNADO = 1000.0
+# Clientes quitados en cada iteración
+MIN_REMOVIDOS = 4
+MAX_REMOVIDOS = 60
+FRACCION_REMOVIDOS = 0.2
+# Cuánto favorecen las remociones peor y relacionada a los primeros candidatos
+DETERMINISMO_REMOCION = 3
+# Puntajes de los operadores (Ropke y Pisinger) y ajuste de sus pesos
+PUNTAJE_MEJOR_GLOBAL = 33
+PUNTAJE_MEJORA = 9
+PUNTAJE_ACEPTADA = 13
+ITERACIONES_POR_SEGMENTO = 100
+REACCION = 0.1
+# Recocido: al inicio, una solución 5 % más larga se acepta con probabilidad 1/2
+EMPEORAMIENTO_INICIAL = 0.05
+ENFRIAMIENTO_FINAL = 1e-3
+# Con más de 1/8 de los nodos pendientes se copian filas completas al insertar
+PROPORCION_FILAS_COMPLETAS = 8
+EPSILON = 1e-9
+
+
+class Incumbente:
+    """Mejor solución encontrada hasta el momento
+
+    Se puede consultar desde otro hilo mientras la búsqueda sigue: las
+    escrituras y lecturas pasan por un lock y ``obtener`` devuelve copias.
+    ``traza`` guarda el costo de cada nueva mejor solución y los segundos
+    transcurridos desde ``inicio``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inicio = time.time()
+        self.costo = math.inf
+        self.rutas: List[List[int]] = []
+        self.no_asignados: List[int] = []
+        self.traza: List[Dict] = []
+
+    def reiniciar(self):
+        with self._lock:
+            self.inicio = time.time()
+            self.costo = math.inf
+            self.rutas, self.no_asignados, self.traza = [], [], []
+
+    def actualizar(self, costo: float, rutas: List[List[int]], no_asignados) -> None:
+        with self._lock:
+            self.costo = costo
+            self.rutas = [list(ruta) for ruta in rutas]
+            self.no_asignados = sorted(no_asignados)
+            self.traza.append({"tiempo": time.time() - self.inicio, "costo": costo})
+
+    def obtener(self) -> Dict:
+        with self._lock:
+            return {
+                "costo": self.costo,
+                "rutas": [list(ruta) for ruta in self.rutas],
+                "no_asignados": list(self.no_asignados),
+                "traza": list(self.traza),
+            }
+
+
+class ALNS:
+    """Búsqueda adaptativa de gran vecindario (ALNS) con presupuesto de tiempo
+
+    En cada iteración un operador de remoción (aleatoria, peor o
+    relacionada de Shaw) quita clientes de las rutas y uno de inserción
+    (voraz o con arrepentimiento 2 y 3) los vuelve a poner junto con los
+    que estaban sin atender. La nueva solución se acepta con el criterio
+    de recocido simulado, cuya temperatura baja con el tiempo transcurrido,
+    no con las iteraciones. Los pesos de los operadores se ajustan según
+    lo bien que les fue en cada segmento de iteraciones.
+
+    El costo es la distancia total más una penalización por cada cliente
+    sin atender (PENALIZACION_NO_ASIGNADO / prioridad). Las rutas respetan
+    la capacidad del vehículo y TIEMPO_MAXIMO_RUTA; la ruta r es del
+    vehículo r. La mejor solución está siempre en ``incumbente`` y
+    ``detener`` termina la búsqueda antes de agotar el tiempo.
+    """
+
+    def __init__(
+        self,
+        grafo: Dict,
+        tiempo_limite: float = TIEMPO_ALNS,
+        semilla: Optional[int] = None,
+    ):
+        self.grafo = grafo
+        self.tiempo_limite = tiempo_limite
+        self.aleatorio = random.Random(semilla)
+        self.incumbente = Incumbente()
+        self._detener = threading.Event()
+        self.clientes_no_asignados = []
+        self.destructores = {
+            "aleatoria": self._remocion_aleatoria,
+            "peor": self._remocion_peor,
+            "relacionada": self._remocion_relacionada,
+        }
+        self.reparadores = {
+            "voraz": lambda: self._reparar(1),
+            "arrepentimiento_2": lambda: self._reparar(2),
+            "arrepentimiento_3": lambda: self._reparar(3),
+        }
+        self.estadisticas = {
+            "iteraciones": 0,
+            "aceptadas": 0,
+            "mejoras_globales": 0,
+            "operadores": {},
+        }
+
+    def detener(self):
+        """Pide terminar la búsqueda; la mejor solución queda en ``incumbente``"""
+        self._detener.set()
+
+    def _preparar(
+        self,
+        pesos: np.ndarray,
+        demandas: List[float],
+        prioridades: List[int],
+        capacidades: List[float],
+    ):
+        n = len(pesos)
+        self.pesos = pesos
+        # Con distancias simétricas no hace falta copiar la transpuesta
+        self.pesos_transpuesta = (
+            pesos if np.array_equal(pesos, pesos.T) else np.ascontiguousarray(pesos.T)
+        )
+        self.demandas = np.asarray(demandas, dtype=np.float64)
+        self.penalizacion = np.array(
+            [0.0] + [PENALIZACION_NO_ASIGNADO / max(p, 1) for p in prioridades[1:]]
+        )
+        self.capacidades = list(capacidades)
+        self.distancia_maxima = TIEMPO_MAXIMO_RUTA / MINUTOS_POR_KM
+        # Escalas de la relación de Shaw
+        self.distancia_referencia = max(float(pesos.max()), EPSILON) if n else 1.0
+        self.demanda_referencia = max(float(self.demandas.max()), EPSILON) if n else 1.0
+
+        self.rutas: List[List[int]] = [[] for _ in capacidades]
+        self.carga = [0.0] * len(capacidades)
+        self.distancia = [0.0] * len(capacidades)
+        self.ruta_de = np.full(n, -1, dtype=np.int64)
+        self.no_asignados = set(range(1, n))
+
+    def _costo(self) -> float:
+        penalizacion = self.penalizacion[list(self.no_asignados)].sum()
+        return sum(self.distancia) + float(penalizacion)
+
+    def _copiar(self) -> Tuple:
+        return (
+            [list(ruta) for ruta in self.rutas],
+            list(self.carga),
+            list(self.distancia),
+            self.ruta_de.copy(),
+            set(self.no_asignados),
+        )
+
+    def _restaurar(self, copia: Tuple):
+        rutas, carga, distancia, ruta_de, no_asignados = copia
+        self.rutas, self.carga, self.distancia = rutas, carga, distancia
+        self.ruta_de, self.no_asignados = ruta_de, no_asignados
+
+    def _quitar(self, u: int):
+        r = int(self.ruta_de[u])
+        ruta = self.rutas[r]
+        i = ruta.index(u)
+        anterior = ruta[i - 1] if i > 0 else 0
+        siguiente = ruta[i + 1] if i + 1 < len(ruta) else 0
+        p = self.pesos
+        self.distancia[r] -= p[anterior, u] + p[u, siguiente] - p[anterior, siguiente]
+        self.carga[r] -= self.demandas[u]
+        del ruta[i]
+        self.ruta_de[u] = -1
+        self.no_asignados.add(u)
+
+    def _insertar(self, u: int, r: int, posicion: int):
+        ruta = self.rutas[r]
+        anterior = ruta[posicion - 1] if posicion > 0 else 0
+        siguiente = ruta[posicion] if posicion < len(ruta) else 0
+        p = self.pesos
+        self.distancia[r] += p[anterior, u] + p[u, siguiente] - p[anterior, siguiente]
+        self.carga[r] += self.demandas[u]
+        ruta.insert(posicion, u)
+        self.ruta_de[u] = r
+        self.no_asignados.discard(u)
+
+    def _elegir_rango(self, n: int) -> int:
+        # Posición al azar en una lista ordenada, sesgada hacia el principio
+        return int(n * self.aleatorio.random() ** DETERMINISMO_REMOCION)
+
+    def _cantidad_a_quitar(self) -> int:
+        ruteados = len(self.pesos) - 1 - len(self.no_asignados)
+        minimo = min(MIN_REMOVIDOS, ruteados)
+        maximo = max(minimo, min(MAX_REMOVIDOS, int(FRACCION_REMOVIDOS * ruteados)))
+        return self.aleatorio.randint(minimo, maximo)
+
+    def _remocion_aleatoria(self, cantidad: int):
+        ruteados = np.flatnonzero(self.ruta_de >= 0).tolist()
+        for u in self.aleatorio.sample(ruteados, cantidad):
+            self._quitar(u)
+
+    def _ganancias_remocion(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Clientes ruteados y cuánto se acorta su ruta al quitar cada uno"""
+        clientes, ganancias = [], []
+        for ruta in self.rutas:
+            if not ruta:
+                continue
+            recorrido = np.array([0] + ruta + [0])
+            anterior, actual, siguiente = recorrido[:-2], recorrido[1:-1], recorrido[2:]
+            ganancias.append(
+                self.pesos[anterior, actual]
+                + self.pesos[actual, siguiente]
+                - self.pesos[anterior, siguiente]
+            )
+            clientes.append(actual)
+        if not clientes:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        return np.concatenate(clientes), np.concatenate(ganancias)
+
+    def _remocion_peor(self, cantidad: int):
+        for _ in range(cantidad):
+            clientes, ganancias = self._ganancias_remocion()
+            if not len(clientes):
+                return
+            orden = np.argsort(-ganancias, kind="stable")
+            self._quitar(int(clientes[orden[self._elegir_rango(len(orden))]]))
+
+    def _remocion_relacionada(self, cantidad: int):
+        ruteados = np.flatnonzero(self.ruta_de >= 0)
+        if not cantidad or not len(ruteados):
+            return
+        removidos = [int(self.aleatorio.choice(ruteados.tolist()))]
+        self._quitar(removidos[0])
+        while len(removidos) < cantidad:
+            ruteados = np.flatnonzero(self.ruta_de >= 0)
+            if not len(ruteados):
+                return
+            # Relación de Shaw: cercanía y pedido parecido a un cliente ya quitado
+            referencia = self.aleatorio.choice(removidos)
+            relacion = (
+                self.pesos[referencia, ruteados] / self.distancia_referencia
+                + np.abs(self.demandas[ruteados] - self.demandas[referencia])
+                / self.demanda_referencia
+            )
+            orden = np.argsort(relacion, kind="stable")
+            u = int(ruteados[orden[self._elegir_rango(len(orden))]])
+            self._quitar(u)
+            removidos.append(u)
+
+    def _costos_insercion(
+        self, pendientes: np.ndarray, r: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Costo y posición de la mejor inserción de cada pendiente en la ruta r
+
+        El costo es infinito si el cliente no cabe o la ruta excede el
+        tiempo máximo.
+        """
+        costos = np.full(len(pendientes), np.inf)
+        posiciones = np.zeros(len(pendientes), dtype=np.int64)
+        caben = np.flatnonzero(
+            self.carga[r] + self.demandas[pendientes] <= self.capacidades[r]
+        )
+        if not len(caben):
+            return costos, posiciones
+
+        # desde[x, u] es la distancia x -> u y hacia[x, u] la distancia u -> x.
+        # Con muchos pendientes conviene copiar filas completas de la matriz
+        # (lectura contigua) y después elegir sus columnas
+        recorrido = np.array([0] + self.rutas[r] + [0])
+        anterior, siguiente = recorrido[:-1], recorrido[1:]
+        clientes = pendientes[caben]
+        if len(clientes) * PROPORCION_FILAS_COMPLETAS < len(self.pesos):
+            desde = self.pesos[anterior[:, None], clientes]
+            hacia = self.pesos_transpuesta[siguiente[:, None], clientes]
+        else:
+            desde = self.pesos[anterior][:, clientes]
+            hacia = self.pesos_transpuesta[siguiente][:, clientes]
+        delta = desde + hacia - self.pesos[anterior, siguiente][:, None]
+        delta[self.distancia[r] + delta > self.distancia_maxima + EPSILON] = np.inf
+        mejores = np.argmin(delta, axis=0)
+        posiciones[caben] = mejores
+        costos[caben] = delta[mejores, np.arange(len(clientes))]
+        return costos, posiciones
+
+    def _reparar(self, k: int):
+        """Inserta los clientes sin ruta: voraz si k es 1, con arrepentimiento k si no
+
+        Un cliente solo se inserta si hacerlo cuesta menos que su
+        penalización, que también acota el costo de las rutas donde no
+        cabe al calcular el arrepentimiento.
+        """
+        pendientes = np.array(sorted(self.no_asignados), dtype=np.int64)
+        if not len(pendientes) or not self.rutas:
+            return
+        costos = np.empty((len(pendientes), len(self.rutas)))
+        posiciones = np.empty((len(pendientes), len(self.rutas)), dtype=np.int64)
+        for r in range(len(self.rutas)):
+            costos[:, r], posiciones[:, r] = self._costos_insercion(pendientes, r)
+        penalizacion = self.penalizacion[pendientes]
+        activos = np.ones(len(pendientes), dtype=bool)
+        filas = np.arange(len(pendientes))
+
+        while True:
+            mejor_ruta = np.argmin(costos, axis=1)
+            mejor = costos[filas, mejor_ruta]
+            candidatos = np.flatnonzero(activos & (mejor < penalizacion))
+            if not len(candidatos):
+                return
+            if k == 1:
+                i = candidatos[np.argmin(mejor[candidatos] - penalizacion[candidatos])]
+            else:
+                acotados = np.minimum(
+                    costos[candidatos], penalizacion[candidatos, None]
+                )
+                if acotados.shape[1] > k:
+                    acotados = np.partition(acotados, k - 1, axis=1)[:, :k]
+                acotados = np.sort(acotados, axis=1)
+                arrepentimiento = (acotados[:, 1:] - acotados[:, :1]).sum(axis=1)
+                # Mayor arrepentimiento; a igualdad, la inserción más barata
+                i = candidatos[np.lexsort((mejor[candidatos], -arrepentimiento))[0]]
+
+            r = int(mejor_ruta[i])
+            self._insertar(int(pendientes[i]), r, int(posiciones[i, r]))
+            activos[i] = False
+            costos[i] = np.inf
+            resto = np.flatnonzero(activos)
+            if len(resto):
+                costos[resto, r], posiciones[resto, r] = self._costos_insercion(
+                    pendientes[resto], r
+                )
+
+    def resolver(
+        self,
+        pesos: np.ndarray,
+        demandas: List[float],
+        prioridades: List[int],
+        capacidades: List[float],
+        inicial: Optional[List[List[int]]] = None,
+    ) -> List[List[int]]:
+        """Busca hasta agotar ``tiempo_limite`` o hasta que se llame a ``detener``
+
+        ``pesos`` tiene el depósito en la posición 0 y ``demandas`` y
+        ``prioridades`` están en las mismas posiciones. ``inicial`` son
+        rutas factibles por vehículo para empezar; los clientes que no
+        están en ellas se agregan con la inserción voraz. Devuelve la mejor
+        solución: una lista de clientes por vehículo (puede estar vacía).
+        """
+        inicio = time.time()
+        self.incumbente.reiniciar()
+        self._preparar(pesos, demandas, prioridades, capacidades)
+
+        # Solución inicial completada con inserción voraz
+        for r, ruta in enumerate(inicial or []):
+            for u in ruta:
+                self._insertar(u, r, len(self.rutas[r]))
+        self._reparar(1)
+        costo_actual = self._costo()
+        self.incumbente.actualizar(costo_actual, self.rutas, self.no_asignados)
+        temperatura_inicial = EMPEORAMIENTO_INICIAL * sum(self.distancia) / math.log(2)
+
+        nombres_d, nombres_r = list(self.destructores), list(self.reparadores)
+        pesos_op = {nombre: 1.0 for nombre in nombres_d + nombres_r}
+        puntajes = dict.fromkeys(pesos_op, 0.0)
+        usos = dict.fromkeys(pesos_op, 0)
+        operadores = {
+            nombre: {"usos": 0, "exitos": 0} for nombre in nombres_d + nombres_r
+        }
+
+        while not self._detener.is_set():
+            transcurrido = time.time() - inicio
+            if transcurrido >= self.tiempo_limite or len(pesos) <= 1:
+                break
+            temperatura = temperatura_inicial * ENFRIAMIENTO_FINAL ** (
+                transcurrido / max(self.tiempo_limite, EPSILON)
+            )
+            destructor = self.aleatorio.choices(
+                nombres_d, weights=[pesos_op[d] for d in nombres_d]
+            )[0]
+            reparador = self.aleatorio.choices(
+                nombres_r, weights=[pesos_op[r] for r in nombres_r]
+            )[0]
+
+            copia = self._copiar()
+            self.destructores[destructor](self._cantidad_a_quitar())
+            self.reparadores[reparador]()
+            costo = self._costo()
+            self.estadisticas["iteraciones"] += 1
+
+            if costo < self.incumbente.costo - EPSILON:
+                puntaje = PUNTAJE_MEJOR_GLOBAL
+                self.incumbente.actualizar(costo, self.rutas, self.no_asignados)
+                self.estadisticas["mejoras_globales"] += 1
+            elif costo < costo_actual - EPSILON:
+                puntaje = PUNTAJE_MEJORA
+            elif costo <= costo_actual + EPSILON:
+                puntaje = 0
+            elif temperatura > 0 and self.aleatorio.random() < math.exp(
+                (costo_actual - costo) / temperatura
+            ):
+                puntaje = PUNTAJE_ACEPTADA
+            else:
+                puntaje = None
+                self._restaurar(copia)
+
+            if puntaje is None:
+                puntaje = 0
+            else:
+                costo_actual = costo
+                self.estadisticas["aceptadas"] += 1
+
+            for nombre in (destructor, reparador):
+                puntajes[nombre] += puntaje
+                usos[nombre] += 1
+                operadores[nombre]["usos"] += 1
+                operadores[nombre]["exitos"] += puntaje > 0
+
+            # Ajustar los pesos al final de cada segmento
+            if self.estadisticas["iteraciones"] % ITERACIONES_POR_SEGMENTO == 0:
+                for nombre in pesos_op:
+                    if usos[nombre]:
+                        promedio = max(puntajes[nombre] / usos[nombre], EPSILON)
+                        pesos_op[nombre] = (1 - REACCION) * pesos_op[nombre]
+                        pesos_op[nombre] += REACCION * promedio
+                    puntajes[nombre], usos[nombre] = 0.0, 0
+
+        for nombre, datos in operadores.items():
+            datos["peso"] = pesos_op[nombre]
+        self.estadisticas["operadores"] = operadores
+        self.estadisticas["tiempo_busqueda"] = time.time() - inicio
+        return self.incumbente.obtener()["rutas"]
+
+    @staticmethod
+    def solucion_inicial(
+        clientes: List[Dict], capacidades: List[float], pesos: np.ndarray
+    ) -> List[List[int]]:
+        """Rutas de Clarke-Wright (posiciones en ``pesos``), una por vehículo"""
+        ahorros = ClarkeWright({})
+        seleccionados = ahorros.seleccionar_clientes(
+            clientes, capacidades, pesos[0, 1:]
+        )
+        posicion = {cliente["id"]: i + 1 for i, cliente in enumerate(clientes)}
+        nodos = [0] + [posicion[cliente["id"]] for cliente in seleccionados]
+        rutas = ahorros.unir_rutas(
+            pesos[np.ix_(nodos, nodos)],
+            [0.0] + [cliente["pedido"] for cliente in seleccionados],
+            capacidades,
+        )
+        # La k-ésima ruta más cargada va en el k-ésimo vehículo más grande
+        rutas.sort(key=lambda x: x[1], reverse=True)
+        return [[nodos[p] for p in ruta] for ruta, _ in rutas[: len(capacidades)]]
+
+    def optimizar_rutas(self, clientes: List[Dict], vehiculos: List[Dict]) -> Dict:
+        """Método principal para optimizar rutas usando ALNS"""
+        tiempo_inicio = time.time()
+
+        try:
+            # Construir matriz de distancias
+            matriz_distancias = construir_matriz_distancias(clientes)
+            nodos = ["deposito"] + [c["id"] for c in clientes]
+            pesos = np.asarray(matriz_distancias.submatriz(nodos), dtype=np.float64)
+
+            vehiculos_ordenados = sorted(
+                (vehiculo for vehiculo in vehiculos if vehiculo["disponible"]),
+                key=lambda x: x["capacidad"],
+                reverse=True,
+            )
+            capacidades = [vehiculo["capacidad"] for vehiculo in vehiculos_ordenados]
+            rutas_alns = self.resolver(
+                pesos,
+                [0.0] + [c["pedido"] for c in clientes],
+                [0] + [c["prioridad"] for c in clientes],
+                capacidades,
+                self.solucion_inicial(clientes, capacidades, pesos),
+            )
+            mejor = self.incumbente.obtener()
+            self.clientes_no_asignados = [
+                clientes[u - 1]["id"] for u in mejor["no_asignados"]
+            ]
+
+            rutas = []
+            for vehiculo, ruta in zip(vehiculos_ordenados, rutas_alns):
+                if not ruta:
+                    continue
+                clientes_ruta = [clientes[u - 1] for u in ruta]
+                recorrido = [0] + ruta + [0]
+                distancia_total = float(pesos[recorrido[:-1], recorrido[1:]].sum())
+                rutas.append(
+                    {
+                        "vehiculo_id": vehiculo["id"],
+                        "placa": vehiculo["placa"],
+                        "capacidad": vehiculo["capacidad"],
+                        "clientes": clientes_ruta,
+                        "distancia_total": distancia_total,
+                        "carga_total": sum(c["pedido"] for c in clientes_ruta),
+                        "tiempo_estimado": distancia_total * MINUTOS_POR_KM,
+                        "orden_visita": ["deposito"]
+                        + [c["id"] for c in clientes_ruta]
+                        + ["deposito"],
+                    }
+                )
+
+            # Calcular métricas
+            distancia_total = sum(ruta["distancia_total"] for ruta in rutas)
+            tiempo_total = sum(ruta["tiempo_estimado"] for ruta in rutas)
+            clientes_atendidos = sum(len(ruta["clientes"]) for ruta in rutas)
+            vehiculos_utilizados = len(rutas)
+
+            tiempo_ejecucion = time.time() - tiempo_inicio
+
+            resultados = {
+                "algoritmo": "ALNS",
+                "tiempo_ejecucion": tiempo_ejecucion,
+                "rutas": rutas,
+                "metricas": {
+                    "distancia_total": distancia_total,
+                    "tiempo_total": tiempo_total,
+                    "clientes_atendidos": clientes_atendidos,
+                    "vehiculos_utilizados": vehiculos_utilizados,
+                    "eficiencia": clientes_atendidos / max(vehiculos_utilizados, 1),
+                    "costo_objetivo": mejor["costo"],
+                },
+                "clientes_no_asignados": self.clientes_no_asignados,
+                "traza": mejor["traza"],
+                "estadisticas_alns": self.estadisticas,
+            }
+
+            return resultados
+
+        except Exception as e:
+            return {
+                "algoritmo": "ALNS",
+                "error": str(e),
+                "tiempo_ejecucion": time.time() - tiempo_inicio,
+            }
+
+
+def optimizar_rutas_alns(clientes: List[Dict], vehiculos: List[Dict], **kwargs) -> Dict:
+    """
+    Función principal para optimizar rutas usando búsqueda adaptativa de gran vecindario
+
+    Args:
+        clientes: Lista de clientes con sus coordenadas y pedidos
+        vehiculos: Lista de vehículos con sus capacidades
+        **kwargs: tiempo_limite (segundos) y semilla (el resto se ignora)
+
+    Returns:
+        Dict con los resultados de la optimización
+    """
+    try:
+        # Crear instancia del algoritmo
+        claves = ("tiempo_limite", "semilla")
+        opciones = {clave: kwargs[clave] for clave in claves if clave in kwargs}
+        alns = ALNS({}, **opciones)
+
+        # Ejecutar optimización directamente
+        resultados = alns.optimizar_rutas(clientes, vehiculos)
+
+        # Agregar información básica
+        resultados["fecha_ejecucion"] = time.time()
+
+        return resultados
+
+    except Exception as e:
+        return {
+            "algoritmo": "ALNS",
+            "error": f"Error en optimización: {str(e)}",
+            "tiempo_ejecucion": 0,
+            "fecha_ejecucion": time.time()
+        }
@@ -1,189 +1,474 @@
+import atexit
 import math
+import os
+import tempfile
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Tuple, Optional
 import copy
+import numpy as np
+from .heuristicas import dos_opt, vecino_mas_cercano
 from ..utils.calculos_comunes import calcular_distancia, construir_matriz_distancias
+from ..utils.matriz_distancias import MatrizDistancias, nucleos_disponibles
+
+MINUTOS_POR_KM = 2  # estimación
+TIEMPO_MAXIMO_RUTA = 480  # 8 horas
+# Iteraciones de subgradiente para las penalizaciones de la cota
+ITERACIONES_SUBGRADIENTE_RAIZ = 30
+ITERACIONES_SUBGRADIENTE_NODO = 2
+PASO_SUBGRADIENTE = 1.0
+# Plazo en segundos para todos los subproblemas de una ejecución (5 minutos)
+TIEMPO_LIMITE_TOTAL = 300
+# Por debajo de este tamaño de subproblema, arrancar el pool cuesta más que
+# resolver todo en serie
+MIN_CLIENTES_PARALELO = 12
+# Estados (pendientes, último nodo) que recuerda la tabla de transposición
+CAPACIDAD_TABLA_TRANSPOSICION = 100_000
+# Archivos temporales de matrices que se conservan para los trabajadores
+CAPACIDAD_ARCHIVOS_MATRIZ = 4
+
+
+def arbol_minimo(pesos: np.ndarray) -> Tuple[float, np.ndarray]:
+    """Prim O(n²) sobre una matriz densa; devuelve el costo y el padre de cada nodo"""
+    n = len(pesos)
+    padres = np.zeros(n, dtype=np.int64)
+    padres[0] = -1
+    if n <= 1:
+        return 0.0, padres
+
+    en_arbol = np.zeros(n, dtype=bool)
+    en_arbol[0] = True
+    mejor = pesos[0].copy()
+    costo = 0.0
+    for _ in range(n - 1):
+        candidatos = np.where(en_arbol, np.inf, mejor)
+        v = int(np.argmin(candidatos))
+        costo += candidatos[v]
+        en_arbol[v] = True
+        mejora = (pesos[v] < mejor) & ~en_arbol
+        mejor[mejora] = pesos[v][mejora]
+        padres[mejora] = v
+    return float(costo), padres
+
+
+class EstadoBusqueda:
+    """Ruta parcial del backtracking con sus acumulados.
+
+    Los nodos se identifican por posición (0 es el depósito y 1..m los
+    clientes). Carga, distancia y tiempo se guardan como acumulados y los
+    clientes pendientes en una máscara de bits, así que agregar o quitar un
+    cliente cuesta O(1) en lugar de volver a sumar toda la ruta.
+
+    ``escala`` son las unidades de ``pesos`` por km: con 1000 (metros
+    enteros) distancia y tiempo se acumulan como enteros y el tiempo
+    máximo se compara en minutos * escala.
+    """
+
+    def __init__(
+        self,
+        pesos: List[List[float]],
+        pedidos: List[float],
+        capacidad,
+        escala: int = 1,
+    ):
+        self.pesos = pesos
+        self.pedidos = pedidos
+        self.capacidad = capacidad
+        self.tiempo_maximo = TIEMPO_MAXIMO_RUTA * escala
+        self.ruta = [0]
+        self.carga = 0.0
+        self.distancia = 0
+        self.tiempo = 0
+        # Bit c - 1 encendido: el cliente c todavía no está en la ruta
+        self.restantes = (1 << (len(pesos) - 1)) - 1
+        self.pedido_pendiente = float(sum(pedidos))
+        # Acumulados previos a cada agregado, para deshacer sin restar
+        self._historial = []
+
+    @property
+    def ultimo(self) -> int:
+        return self.ruta[-1]
+
+    def pendientes(self) -> List[int]:
+        """Posiciones de los clientes que faltan visitar"""
+        resultado = []
+        mascara = self.restantes
+        while mascara:
+            bit = mascara & -mascara
+            resultado.append(bit.bit_length())
+            mascara ^= bit
+        return resultado
+
+    def puede_agregar(self, cliente: int) -> bool:
+        """Verifica capacidad y tiempo máximo al agregar un cliente"""
+        if self.carga + self.pedidos[cliente] > self.capacidad:
+            return False
+        tiempo_adicional = self.pesos[self.ultimo][cliente] * MINUTOS_POR_KM
+        return self.tiempo + tiempo_adicional <= self.tiempo_maximo
+
+    def agregar(self, cliente: int):
+        distancia = self.pesos[self.ultimo][cliente]
+        self._historial.append((self.carga, self.distancia, self.tiempo))
+        self.carga += self.pedidos[cliente]
+        self.distancia += distancia
+        self.tiempo += distancia * MINUTOS_POR_KM
+        self.restantes ^= 1 << (cliente - 1)
+        self.pedido_pendiente -= self.pedidos[cliente]
+        self.ruta.append(cliente)
+
+    def quitar(self):
+        cliente = self.ruta.pop()
+        self.restantes |= 1 << (cliente - 1)
+        self.pedido_pendiente += self.pedidos[cliente]
+        self.carga, self.distancia, self.tiempo = self._historial.pop()
+
+    def cabe_lo_pendiente(self) -> bool:
+        """Indica si la carga de todos los clientes pendientes entra en el vehículo"""
+        return self.carga + self.pedido_pendiente <= self.capacidad + 1e-9
+
+    def costo_cerrado(self) -> float:
+        """Distancia de la ruta actual volviendo al depósito"""
+        return self.distancia + self.pesos[self.ultimo][0]
+
+
+class TablaTransposicion:
+    """Menor distancia parcial con la que se llegó a cada estado de la búsqueda.
+
+    Dos rutas parciales con los mismos clientes pendientes y el mismo último
+    nodo llevan la misma carga y admiten las mismas continuaciones, así que
+    la que llega con más distancia (y por lo tanto más tiempo) no puede
+    mejorar a la otra. La memoria se acota desalojando la entrada usada hace
+    más tiempo (LRU).
+    """
+
+    politica = "LRU"
+
+    def __init__(self, capacidad: int = CAPACIDAD_TABLA_TRANSPOSICION):
+        self.capacidad = capacidad
+        self.entradas: "OrderedDict[tuple, float]" = OrderedDict()
+        self.estadisticas = {"consultas": 0, "aciertos": 0, "podas": 0, "desalojos": 0}
+
+    def podar(self, clave: tuple, distancia: float) -> bool:
+        """Indica si el estado ya se vio con igual o menor distancia; si no, lo anota"""
+        self.estadisticas["consultas"] += 1
+        anterior = self.entradas.get(clave)
+        if anterior is not None:
+            self.estadisticas["aciertos"] += 1
+            self.entradas.move_to_end(clave)
+            if anterior <= distancia:
+                self.estadisticas["podas"] += 1
+                return True
+        self.entradas[clave] = distancia
+        if len(self.entradas) > self.capacidad:
+            self.entradas.popitem(last=False)
+            self.estadisticas["desalojos"] += 1
+        return False
+
+
+def resumir_tabla(estadisticas: Dict, capacidad: int) -> Dict:
+    """Agrega la política y la tasa de aciertos a los contadores de la tabla"""
+    return {
+        "politica": TablaTransposicion.politica,
+        "capacidad": capacidad,
+        **estadisticas,
+        "tasa_aciertos": estadisticas["aciertos"] / max(estadisticas["consultas"], 1),
+    }
 
 
 class Backtracking:
     """Implementación de Backtracking con poda para optimización de rutas"""
 
-    def __init__(self, grafo: Dict):
+    def __init__(
+        self,
+        grafo: Dict,
+        trabajadores: Optional[int] = None,
+        tiempo_limite: float = TIEMPO_LIMITE_TOTAL,
+    ):
         self.grafo = grafo
         self.mejor_solucion = None
         self.mejor_costo = float("inf")
         self.nodos_visitados = set()
         self.tiempo_inicio = None
-        self.tiempo_limite = 300  # 5 minutos
+        # Plazo global de optimizar_rutas y momento en que vence el
+        # subproblema en curso
+        self.tiempo_limite = tiempo_limite
+        self.fin_subproblema = None
+        # Procesos para los subproblemas; None elige según su tamaño
+        self.trabajadores = trabajadores
+        self.trabajadores_usados = 1
+        self.pesos = None
+        # Unidades de ``pesos`` por km (1000 si son metros enteros)
+        self.escala = 1
+        self.estadisticas_cota = {"evaluaciones": 0, "prim": 0, "hojas_quitadas": 0}
+        self.estadisticas_busqueda = {
+            "nodos": 0,
+            "mejoras": 0,
+            "podas_cota": 0,
+            "podas_capacidad": 0,
+            "podas_inicio_caliente": 0,
+            "inicios_calientes": 0,
+            "podas_simetria": 0,
+            "rupturas_simetria": 0,
+        }
+        self.capacidad_tabla = CAPACIDAD_TABLA_TRANSPOSICION
+        self.tabla = TablaTransposicion(self.capacidad_tabla)
+        self.estadisticas_tabla = dict(self.tabla.estadisticas)
+        # Solo se exploran recorridos con el primer cliente menor que el último
+        self._romper_simetria = False
+        # Sucesor de cada nodo en la mejor ruta conocida (orden de los hijos)
+        self._sucesores = {}
+        self._incumbente_inicial = False
 
     def calcular_cota_inferior(
-        self,
-        ruta_actual: List[str],
-        clientes_restantes: List[Dict],
-        matriz_distancias: Dict,
-    ) -> float:
-        """Calcula una cota inferior para la poda"""
-        if not ruta_actual:
-            return 0
-
-        # Distancia actual
-        distancia_actual = 0
-        for i in range(len(ruta_actual) - 1):
-            distancia_actual += matriz_distancias[ruta_actual[i]][ruta_actual[i + 1]]
-
-        # Cota inferior usando el árbol de expansión mínima
-        if clientes_restantes:
-            # Calcular MST para los nodos restantes
-            nodos_restantes = [cliente["id"] for cliente in clientes_restantes]
-            mst_costo = self.calcular_mst(nodos_restantes, matriz_distancias)
-
-            # Agregar distancia desde el último nodo al MST y desde MST al depósito
-            if ruta_actual:
-                ultimo_nodo = ruta_actual[-1]
-                min_distancia_mst = min(
-                    matriz_distancias[ultimo_nodo][nodo] for nodo in nodos_restantes
-                )
-                min_distancia_deposito = min(
-                    matriz_distancias[nodo]["deposito"] for nodo in nodos_restantes
-                )
+        self, estado: EstadoBusqueda, arbol_padre: Optional[Dict] = None
+    ) -> Tuple[float, Dict]:
+        """Calcula una cota inferior para la poda (1-árbol con penalizaciones)
+
+        Completar la ruta es un camino hamiltoniano desde el último nodo
+        hasta el depósito pasando por los pendientes. Con penalizaciones pi,
+        el árbol mínimo sobre w(u, v) + pi[u] + pi[v] menos la suma de
+        pi[v] por el grado que v tendría en el camino (1 en los extremos,
+        2 en el resto) nunca supera el costo de ese camino. Las pi se ajustan
+        por subgradiente y se heredan a los hijos; si el nodo que sale de la
+        ruta era una hoja del árbol del padre, el árbol del hijo se obtiene
+        quitando esa hoja sin volver a ejecutar Prim.
+        """
+        pendientes = estado.pendientes()
+        if not pendientes:
+            return estado.distancia, None
+
+        if arbol_padre is None:
+            # Raíz: camino desde el último nodo hasta el depósito (si la ruta
+            # está vacía el depósito aparece en ambos extremos)
+            pi = np.zeros(len(estado.pesos))
+            nodos = np.array([estado.ultimo] + pendientes + [0])
+            objetivo = np.full(len(nodos), 2.0)
+            objetivo[[0, -1]] = 1.0
+            arbol = self._uno_arbol(nodos, objetivo, pi)
+            iteraciones = ITERACIONES_SUBGRADIENTE_RAIZ
+        else:
+            arbol = self._arbol_hijo(arbol_padre, estado)
+            iteraciones = ITERACIONES_SUBGRADIENTE_NODO
+
+        mejor_cota = arbol["cota"]
+        mejor_arbol = arbol
+        for _ in range(iteraciones):
+            if estado.distancia + mejor_cota >= self.mejor_costo:
+                break
+            subgradiente = arbol["grados"] - arbol["objetivo"]
+            norma = float(subgradiente @ subgradiente)
+            if norma == 0:
+                # El árbol ya es un camino: la cota es exacta
+                break
+            referencia = self.mejor_costo - estado.distancia
+            paso = PASO_SUBGRADIENTE * (referencia - arbol["cota"]) / norma
+            pi = arbol["pi"].copy()
+            pi[arbol["nodos"]] += paso * subgradiente
+            arbol = self._uno_arbol(arbol["nodos"], arbol["objetivo"], pi)
+            if arbol["cota"] > mejor_cota:
+                mejor_cota = arbol["cota"]
+                mejor_arbol = arbol
+
+        # Los hijos heredan las penalizaciones que dieron la mejor cota
+        self.estadisticas_cota["evaluaciones"] += 1
+        return self._redondear_cota(estado.distancia + mejor_cota), mejor_arbol
+
+    def _redondear_cota(self, cota: float):
+        """Con distancias enteras ninguna ruta cuesta una fracción: la cota
+        se redondea hacia arriba y se compara como entero"""
+        if self.escala == 1:
+            return cota
+        return math.ceil(cota - 1e-6)
+
+    def _uno_arbol(
+        self, nodos: np.ndarray, objetivo: np.ndarray, pi: np.ndarray
+    ) -> Dict:
+        """Árbol mínimo sobre los pesos penalizados de ``nodos``"""
+        penalizacion = pi[nodos]
+        pesos = self.pesos[np.ix_(nodos, nodos)]
+        pesos = pesos + penalizacion[:, None] + penalizacion[None, :]
+        if len(nodos) > 2 and nodos[0] == nodos[-1]:
+            # El camino nunca une directamente las dos copias del depósito
+            pesos[0, -1] = pesos[-1, 0] = np.inf
+        costo, padres = arbol_minimo(pesos)
+        grados = np.ones(len(nodos))
+        grados[0] = 0
+        np.add.at(grados, padres[1:], 1)
+        self.estadisticas_cota["prim"] += 1
+        return {
+            "nodos": nodos,
+            "objetivo": objetivo,
+            "pi": pi,
+            "pesos": pesos,
+            "padres": padres,
+            "grados": grados,
+            "costo": costo,
+            "cota": costo - float(objetivo @ penalizacion),
+        }
 
-                return (
-                    distancia_actual
-                    + mst_costo
-                    + min_distancia_mst
-                    + min_distancia_deposito
-                )
+    def _arbol_hijo(self, arbol: Dict, estado: EstadoBusqueda) -> Dict:
+        """Árbol del hijo tras agregar ``estado.ultimo`` a la ruta"""
+        nodos = arbol["nodos"]
+        nuevo = estado.ultimo
+        objetivo = arbol["objetivo"].copy()
+        objetivo[np.flatnonzero(nodos == nuevo)[0]] = 1.0
+
+        # El nodo anterior sale del conjunto (si es el depósito, su copia de
+        # inicio, que es la primera)
+        indice = int(np.flatnonzero(nodos == estado.ruta[-2])[0])
+        if arbol["grados"][indice] != 1:
+            restantes = np.delete(np.arange(len(nodos)), indice)
+            return self._uno_arbol(nodos[restantes], objetivo[restantes], arbol["pi"])
+
+        # Era una hoja: el árbol sin ella sigue siendo mínimo
+        padres = arbol["padres"].copy()
+        grados = arbol["grados"].copy()
+        if padres[indice] >= 0:
+            vecino = padres[indice]
+        else:
+            vecino = int(np.flatnonzero(padres == indice)[0])
+            padres[vecino] = -1
+        grados[vecino] -= 1
+        costo = arbol["costo"] - arbol["pesos"][indice, vecino]
+
+        restantes = np.delete(np.arange(len(nodos)), indice)
+        padres = padres[restantes]
+        padres[padres > indice] -= 1
+        self.estadisticas_cota["hojas_quitadas"] += 1
+        return self._con_objetivo(
+            {
+                "nodos": nodos[restantes],
+                "pi": arbol["pi"],
+                "pesos": arbol["pesos"][np.ix_(restantes, restantes)],
+                "padres": padres,
+                "grados": grados[restantes],
+                "costo": costo,
+            },
+            objetivo[restantes],
+        )
 
-        return distancia_actual
+    def _con_objetivo(self, arbol: Dict, objetivo: np.ndarray) -> Dict:
+        # Mismo árbol con otros grados objetivo: solo cambia la cota
+        penalizacion = arbol["pi"][arbol["nodos"]]
+        return {
+            **arbol,
+            "objetivo": objetivo,
+            "cota": arbol["costo"] - float(objetivo @ penalizacion),
+        }
 
     def calcular_mst(self, nodos: List[str], matriz_distancias: Dict) -> float:
         """Calcula el costo del árbol de expansión mínima usando Prim"""
         if len(nodos) <= 1:
             return 0
-
-        # Implementación simplificada de Prim
-        visitados = set()
-        costo_total = 0
-
-        # Empezar con el primer nodo
-        visitados.add(nodos[0])
-
-        while len(visitados) < len(nodos):
-            min_distancia = float("inf")
-            nodo_agregar = None
-
-            for nodo_visitado in visitados:
-                for nodo_no_visitado in nodos:
-                    if nodo_no_visitado not in visitados:
-                        distancia = matriz_distancias[nodo_visitado][nodo_no_visitado]
-                        if distancia < min_distancia:
-                            min_distancia = distancia
-                            nodo_agregar = nodo_no_visitado
-
-            if nodo_agregar:
-                visitados.add(nodo_agregar)
-                costo_total += min_distancia
-
-        return costo_total
-
-    def verificar_restricciones(
-        self,
-        ruta_actual: List[str],
-        cliente: Dict,
-        vehiculo: Dict,
-        matriz_distancias: Dict,
-    ) -> bool:
-        """Verifica si se cumplen todas las restricciones"""
-        # Verificar capacidad
-        carga_actual = sum(
-            c["pedido"] for c in self.obtener_clientes_en_ruta(ruta_actual)
+        pesos = np.array(
+            [[matriz_distancias[u][v] for v in nodos] for u in nodos], dtype=np.float64
         )
-        if carga_actual + cliente["pedido"] > vehiculo["capacidad"]:
-            return False
-
-        # Verificar tiempo (estimación: 2 minutos por km)
-        if ruta_actual:
-            distancia_adicional = matriz_distancias[ruta_actual[-1]][cliente["id"]]
-            tiempo_adicional = distancia_adicional * 2
-            tiempo_actual = sum(
-                matriz_distancias[ruta_actual[i]][ruta_actual[i + 1]] * 2
-                for i in range(len(ruta_actual) - 1)
-            )
-
-            if tiempo_actual + tiempo_adicional > 480:  # 8 horas
-                return False
-
-        # Verificar ventana horaria (simplificado)
-        # En una implementación real, se verificaría la hora actual vs ventana
-
-        return True
-
-    def obtener_clientes_en_ruta(self, ruta: List[str]) -> List[Dict]:
-        """Obtiene los clientes que están en la ruta actual"""
-        # Esta función necesitaría acceso a la lista completa de clientes
-        # Por simplicidad, retornamos una lista vacía
-        return []
+        return arbol_minimo(pesos)[0]
 
     def backtracking_rutas(
         self,
-        ruta_actual: List[str],
-        clientes_restantes: List[Dict],
-        vehiculos_disponibles: List[Dict],
+        estado: EstadoBusqueda,
+        nodos: List[str],
         matriz_distancias: Dict,
         nivel: int = 0,
+        arbol: Optional[Dict] = None,
     ):
         """Algoritmo de backtracking con poda"""
         # Verificar límite de tiempo
-        if time.time() - self.tiempo_inicio > self.tiempo_limite:
+        if time.time() > self.fin_subproblema:
             return
 
         # Si no hay más clientes, evaluar la solución
-        if not clientes_restantes:
-            if ruta_actual:
-                # Agregar retorno al depósito
-                ruta_completa = ruta_actual + ["deposito"]
-                costo_total = sum(
-                    matriz_distancias[ruta_completa[i]][ruta_completa[i + 1]]
-                    for i in range(len(ruta_completa) - 1)
-                )
+        self.estadisticas_busqueda["nodos"] += 1
+        if not estado.restantes:
+            costo_total = estado.costo_cerrado()
+            if costo_total < self.mejor_costo:
+                self._registrar_solucion(estado.ruta[1:], costo_total, nodos)
+                self.estadisticas_busqueda["mejoras"] += 1
+            return
 
-                if costo_total < self.mejor_costo:
-                    self.mejor_costo = costo_total
-                    self.mejor_solucion = ruta_completa.copy()
+        # Simetría: el último cliente debe ser mayor que el primero, así que
+        # debe quedar alguno pendiente por encima de él
+        primero = 0
+        if self._romper_simetria and len(estado.ruta) > 1:
+            primero = estado.ruta[1]
+            if not estado.restantes >> primero:
+                self.estadisticas_busqueda["podas_simetria"] += 1
+                return
+
+        # Mismo estado ya alcanzado con menor distancia
+        if self.tabla.podar(
+            (estado.restantes, estado.ultimo, primero), estado.distancia
+        ):
             return
 
-        # Poda: verificar cota inferior
-        cota_inferior = self.calcular_cota_inferior(
-            ruta_actual, clientes_restantes, matriz_distancias
-        )
-        if cota_inferior >= self.mejor_costo:
+        # Si lo pendiente ya no entra en el vehículo, no hay solución completa
+        if not estado.cabe_lo_pendiente():
+            self.estadisticas_busqueda["podas_capacidad"] += 1
             return
 
-        # Probar cada cliente restante
-        for i, cliente in enumerate(clientes_restantes):
-            # Verificar restricciones
-            if not self.verificar_restricciones(
-                ruta_actual, cliente, vehiculos_disponibles[0], matriz_distancias
-            ):
+        # Poda: verificar cota inferior (sin solución de referencia no poda nada)
+        if math.isfinite(self.mejor_costo):
+            cota_inferior, arbol = self.calcular_cota_inferior(estado, arbol)
+            if cota_inferior >= self.mejor_costo:
+                self.estadisticas_busqueda["podas_cota"] += 1
+                if self._incumbente_inicial:
+                    self.estadisticas_busqueda["podas_inicio_caliente"] += 1
+                return
+        else:
+            arbol = None
+
+        # Probar cada cliente restante: primero el sucesor en la mejor ruta
+        # conocida y luego los demás del más cercano al más lejano
+        sucesor = self._sucesores.get(estado.ultimo)
+        distancias = estado.pesos[estado.ultimo]
+        candidatos = sorted(
+            estado.pendientes(), key=lambda c: (c != sucesor, distancias[c])
+        )
+        for cliente in candidatos:
+            # Verificar restricciones (capacidad y tiempo)
+            if not estado.puede_agregar(cliente):
                 continue
 
-            # Agregar cliente a la ruta
-            ruta_actual.append(cliente["id"])
-
-            # Recursión
-            clientes_restantes_nuevo = (
-                clientes_restantes[:i] + clientes_restantes[i + 1 :]
-            )
+            estado.agregar(cliente)
             self.backtracking_rutas(
-                ruta_actual,
-                clientes_restantes_nuevo,
-                vehiculos_disponibles,
-                matriz_distancias,
-                nivel + 1,
+                estado, nodos, matriz_distancias, nivel + 1, arbol
             )
-
             # Backtrack
-            ruta_actual.pop()
+            estado.quitar()
+
+    def _registrar_solucion(self, orden: List[int], costo: float, nodos: List[str]):
+        """Guarda una ruta (posiciones de clientes) como la mejor conocida"""
+        self.mejor_costo = costo
+        self.mejor_solucion = ["deposito"] + [nodos[c] for c in orden] + ["deposito"]
+        recorrido = [0] + list(orden) + [0]
+        self._sucesores = dict(zip(recorrido[:-1], recorrido[1:]))
+        self._incumbente_inicial = False
+
+    def inicio_caliente(self, estado: EstadoBusqueda, nodos: List[str]) -> bool:
+        """Fija como cota superior una ruta de vecino más cercano mejorada con 2-opt
+
+        Solo se usa si la ruta respeta capacidad y tiempo; devuelve si se usó.
+        """
+        orden = dos_opt(self.pesos, vecino_mas_cercano(self.pesos))
+        factible = True
+        for cliente in orden:
+            if not estado.puede_agregar(cliente):
+                factible = False
+                break
+            estado.agregar(cliente)
+        costo = estado.costo_cerrado()
+        while len(estado.ruta) > 1:
+            estado.quitar()
+
+        if not factible:
+            return False
+        self._registrar_solucion(orden, costo, nodos)
+        self._incumbente_inicial = True
+        self.estadisticas_busqueda["inicios_calientes"] += 1
+        return True
 
     def dividir_problema_por_vehiculos(
         self, clientes: List[Dict], vehiculos: List[Dict]
@@ -225,9 +510,17 @@ class Backtracking:
         return asignaciones
 
     def optimizar_ruta_individual(
-        self, clientes: List[Dict], vehiculo: Dict, matriz_distancias: Dict
+        self,
+        clientes: List[Dict],
+        vehiculo: Dict,
+        matriz_distancias: Dict,
+        tiempo_limite: Optional[float] = None,
     ) -> Dict:
-        """Optimiza la ruta para un vehículo individual usando backtracking"""
+        """Optimiza la ruta para un vehículo individual usando backtracking
+
+        ``tiempo_limite`` (segundos) acota la búsqueda de este subproblema;
+        por defecto se usa el plazo global.
+        """
         if len(clientes) <= 1:
             return {
                 "vehiculo_id": vehiculo["id"],
@@ -243,11 +536,50 @@ class Backtracking:
         # Reinicializar para este subproblema
         self.mejor_solucion = None
         self.mejor_costo = float("inf")
+        self._sucesores = {}
+        self._incumbente_inicial = False
         self.tiempo_inicio = time.time()
+        if tiempo_limite is None:
+            tiempo_limite = self.tiempo_limite
+        self.fin_subproblema = self.tiempo_inicio + tiempo_limite
 
         # Ejecutar backtracking
-        ruta_inicial = ["deposito"]
-        self.backtracking_rutas(ruta_inicial, clientes, [vehiculo], matriz_distancias)
+        nodos = ["deposito"] + [c["id"] for c in clientes]
+        self.escala = getattr(matriz_distancias, "escala", 1)
+        if self.escala != 1:
+            # Metros enteros: distancias, tiempos y cotas se comparan como int
+            self.pesos = matriz_distancias.submatriz(nodos, crudo=True).astype(
+                np.int64
+            )
+        elif hasattr(matriz_distancias, "submatriz"):
+            self.pesos = matriz_distancias.submatriz(nodos).astype(np.float64)
+        else:
+            self.pesos = np.array(
+                [[matriz_distancias[u][v] for v in nodos] for u in nodos],
+                dtype=np.float64,
+            )
+        estado = EstadoBusqueda(
+            self.pesos.tolist(),
+            [0] + [c["pedido"] for c in clientes],
+            vehiculo["capacidad"],
+            self.escala,
+        )
+        self.inicio_caliente(estado, nodos)
+
+        # Un recorrido y su inverso cuestan lo mismo si la matriz es simétrica.
+        # El tiempo máximo se controla sin el regreso, que cambia al invertir;
+        # pero si la cota superior ya cabe en ese tiempo, toda ruta mejor lo
+        # cumple en ambos sentidos y basta explorar uno
+        self._romper_simetria = bool(
+            math.isfinite(self.mejor_costo)
+            and self.mejor_costo * MINUTOS_POR_KM <= estado.tiempo_maximo
+            and np.allclose(self.pesos, self.pesos.T)
+        )
+        self.estadisticas_busqueda["rupturas_simetria"] += self._romper_simetria
+        self.tabla = TablaTransposicion(self.capacidad_tabla)
+        self.backtracking_rutas(estado, nodos, matriz_distancias)
+        for clave, valor in self.tabla.estadisticas.items():
+            self.estadisticas_tabla[clave] += valor
 
         if self.mejor_solucion:
             distancia_total = sum(
@@ -280,6 +612,84 @@ class Backtracking:
                 + ["deposito"],
             }
 
+    def resolver_subproblemas(
+        self, asignaciones: List[Dict], matriz_distancias: MatrizDistancias
+    ) -> List[Dict]:
+        """Optimiza la ruta de cada asignación sin pasar el plazo global.
+
+        Los subproblemas son independientes. Con varios trabajadores se
+        reparten en un pool de procesos que abren la matriz como memoria
+        mapeada de solo lectura (ver ``archivo_matriz``), sin copiarla a
+        cada proceso. Cada uno recibe una cuota de tiempo_limite *
+        trabajadores / subproblemas, recortada al plazo global. En serie,
+        cada subproblema recibe el tiempo restante dividido entre los que
+        faltan. Las rutas se devuelven en el orden de ``asignaciones``.
+        """
+        fin_global = time.time() + self.tiempo_limite
+        trabajadores = self.trabajadores
+        if trabajadores is None:
+            mayor = max((len(a["clientes"]) for a in asignaciones), default=0)
+            trabajadores = 1
+            if mayor >= MIN_CLIENTES_PARALELO:
+                trabajadores = nucleos_disponibles()
+        trabajadores = max(1, min(trabajadores, len(asignaciones)))
+        self.trabajadores_usados = trabajadores
+
+        if trabajadores == 1:
+            rutas = []
+            for i, asignacion in enumerate(asignaciones):
+                restante = max(0.0, fin_global - time.time())
+                rutas.append(
+                    self.optimizar_ruta_individual(
+                        asignacion["clientes"],
+                        asignacion["vehiculo"],
+                        matriz_distancias,
+                        tiempo_limite=restante / (len(asignaciones) - i),
+                    )
+                )
+            return rutas
+
+        cuota = self.tiempo_limite * trabajadores / len(asignaciones)
+        ruta_matriz, temporal = archivo_matriz(matriz_distancias)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=trabajadores,
+                initializer=_iniciar_trabajador,
+                initargs=(
+                    ruta_matriz,
+                    matriz_distancias.ids,
+                    matriz_distancias.lats,
+                    matriz_distancias.lons,
+                    matriz_distancias.modo,
+                ),
+            ) as pool:
+                futuros = [
+                    pool.submit(
+                        _resolver_subproblema,
+                        asignacion["clientes"],
+                        asignacion["vehiculo"],
+                        fin_global,
+                        cuota,
+                    )
+                    for asignacion in asignaciones
+                ]
+                resultados = [futuro.result() for futuro in futuros]
+        finally:
+            if temporal:
+                os.remove(ruta_matriz)
+
+        rutas = []
+        for ruta, busqueda, cota, tabla in resultados:
+            for acumulado, parcial in (
+                (self.estadisticas_busqueda, busqueda),
+                (self.estadisticas_cota, cota),
+                (self.estadisticas_tabla, tabla),
+            ):
+                for clave, valor in parcial.items():
+                    acumulado[clave] += valor
+            rutas.append(ruta)
+        return rutas
+
     def optimizar_rutas(self, clientes: List[Dict], vehiculos: List[Dict]) -> Dict:
         """Método principal para optimizar rutas usando Backtracking"""
         tiempo_inicio = time.time()
@@ -292,12 +702,9 @@ class Backtracking:
             asignaciones = self.dividir_problema_por_vehiculos(clientes, vehiculos)
 
             # Optimizar cada subproblema
-            rutas_optimizadas = []
-            for asignacion in asignaciones:
-                ruta = self.optimizar_ruta_individual(
-                    asignacion["clientes"], asignacion["vehiculo"], matriz_distancias
-                )
-                rutas_optimizadas.append(ruta)
+            rutas_optimizadas = self.resolver_subproblemas(
+                asignaciones, matriz_distancias
+            )
 
             # Calcular métricas
             distancia_total = sum(ruta["distancia_total"] for ruta in rutas_optimizadas)
@@ -321,6 +728,14 @@ class Backtracking:
                     "eficiencia": clientes_atendidos / max(vehiculos_utilizados, 1),
                 },
                 "asignaciones": asignaciones,
+                "estadisticas_busqueda": {
+                    **self.estadisticas_busqueda,
+                    "cota": self.estadisticas_cota,
+                    "trabajadores": self.trabajadores_usados,
+                    "tabla_transposicion": resumir_tabla(
+                        self.estadisticas_tabla, self.capacidad_tabla
+                    ),
+                },
                 "matriz_distancias": matriz_distancias,
             }
 
@@ -334,6 +749,100 @@ class Backtracking:
             }
 
 
+# Archivos .npy temporales por (huella, modo), del más viejo al más nuevo
+_archivos_matriz = OrderedDict()
+_lock_archivos = threading.Lock()
+
+
+def _archivo_mapeado(datos: np.ndarray) -> Optional[str]:
+    """Ruta del .npy del que ``datos`` es el arreglo completo mapeado, o None"""
+    ruta = getattr(datos, "filename", None)
+    if not ruta or not ruta.endswith(".npy") or not datos.flags.c_contiguous:
+        return None
+    try:
+        guardados = np.load(ruta, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if guardados.shape != datos.shape or guardados.dtype != datos.dtype:
+        return None
+    return ruta
+
+
+def archivo_matriz(matriz: MatrizDistancias) -> Tuple[str, bool]:
+    """Archivo .npy con los datos de la matriz para abrirlo mapeado.
+
+    Si la matriz ya está mapeada desde un .npy (la instantánea de
+    PERSISTIR_MATRIZ) se usa ese archivo. Si no, se escribe un temporal
+    por huella y modo que se reutiliza mientras siga entre los últimos
+    CAPACIDAD_ARCHIVOS_MATRIZ. Devuelve la ruta y si el llamador debe
+    borrarla (solo cuando la matriz no tiene coordenadas para la huella).
+    """
+    ruta = _archivo_mapeado(matriz.datos)
+    if ruta:
+        return ruta, False
+
+    def escribir() -> str:
+        descriptor, ruta = tempfile.mkstemp(suffix=".npy")
+        with os.fdopen(descriptor, "wb") as f:
+            np.save(f, np.ascontiguousarray(matriz.datos))
+        return ruta
+
+    if matriz.lats is None or matriz.lons is None:
+        return escribir(), True
+
+    clave = (matriz.huella(), matriz.modo)
+    with _lock_archivos:
+        ruta = _archivos_matriz.get(clave)
+        if ruta and os.path.exists(ruta):
+            _archivos_matriz.move_to_end(clave)
+            return ruta, False
+        ruta = escribir()
+        _archivos_matriz[clave] = ruta
+        while len(_archivos_matriz) > CAPACIDAD_ARCHIVOS_MATRIZ:
+            _, vieja = _archivos_matriz.popitem(last=False)
+            if os.path.exists(vieja):
+                os.remove(vieja)
+        return ruta, False
+
+
+@atexit.register
+def _borrar_archivos_matriz():
+    with _lock_archivos:
+        for ruta in _archivos_matriz.values():
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        _archivos_matriz.clear()
+
+
+# Estado de cada proceso trabajador: la matriz compartida de solo lectura
+_trabajador = {}
+
+
+def _iniciar_trabajador(
+    ruta: str, ids: List, lats: np.ndarray, lons: np.ndarray, modo: str
+):
+    datos = np.load(ruta, mmap_mode="r")
+    _trabajador["matriz"] = MatrizDistancias(ids, datos, lats, lons, modo)
+
+
+def _resolver_subproblema(
+    clientes: List[Dict], vehiculo: Dict, fin_global: float, cuota: float
+) -> Tuple[Dict, Dict, Dict, Dict]:
+    backtracking = Backtracking({})
+    ruta = backtracking.optimizar_ruta_individual(
+        clientes,
+        vehiculo,
+        _trabajador["matriz"],
+        tiempo_limite=max(0.0, min(cuota, fin_global - time.time())),
+    )
+    return (
+        ruta,
+        backtracking.estadisticas_busqueda,
+        backtracking.estadisticas_cota,
+        backtracking.estadisticas_tabla,
+    )
+
+
 def optimizar_rutas_backtracking(clientes: List[Dict], vehiculos: List[Dict], **kwargs) -> Dict:
     """
     Función principal para optimizar rutas usando el algoritmo Backtracking
@@ -341,14 +850,19 @@ def optimizar_rutas_backtracking(clientes: List[Dict], vehiculos: List[Dict], **
     Args:
         clientes: Lista de clientes con sus coordenadas y pedidos
         vehiculos: Lista de vehículos con sus capacidades
-        **kwargs: Parámetros adicionales (ignorados para simplificar)
+        **kwargs: trabajadores y tiempo_limite (el resto se ignora)
     
     Returns:
         Dict con los resultados de la optimización
     """
     try:
         # Crear instancia del algoritmo
-        backtracking = Backtracking({})
+        opciones = {
+            clave: kwargs[clave]
+            for clave in ("trabajadores", "tiempo_limite")
+            if clave in kwargs
+        }
+        backtracking = Backtracking({}, **opciones)
         
         # Ejecutar optimización directamente
         resultados = backtracking.optimizar_rutas(clientes, vehiculos)
@@ -1,7 +1,17 @@
-import math
 import time
+from collections import deque
 from typing import Dict, List, Tuple, Optional
-from ..utils.calculos_comunes import calcular_distancia, construir_matriz_distancias
+import numpy as np
+from ..utils.calculos_comunes import DEPOSITO, construir_matriz_distancias
+from ..utils.matriz_distancias import MatrizDistancias, calcular_tam_bloque
+from ..utils.vecinos_cercanos import VecinosCercanos, obtener_vecinos_cercanos
+
+# Por debajo de esta fracción de aristas presentes se usa la variante con cola
+DENSIDAD_SPFA = 0.1
+# Candidatos que se revisan antes de recorrer la fila completa de la matriz
+K_VECINOS_ASIGNACION = 10
+MINUTOS_POR_KM = 2  # estimación
+TIEMPO_MAXIMO_RUTA = 480  # 8 horas
 
 
 class BellmanFord:
@@ -14,36 +24,166 @@ class BellmanFord:
         self.predecesores = {}
 
     def bellman_ford_caminos_minimos(
-        self, matriz_distancias: Dict, origen: str
+        self, matriz_distancias, origen: str, metodo: Optional[str] = None
     ) -> Tuple[Dict, Dict]:
-        """Ejecuta el algoritmo Bellman-Ford para encontrar caminos mínimos"""
-        # Inicialización
-        distancias = {nodo: float("inf") for nodo in matriz_distancias.keys()}
-        predecesores = {nodo: None for nodo in matriz_distancias.keys()}
-
-        distancias[origen] = 0
-
-        # Relajación de aristas
-        for _ in range(len(matriz_distancias) - 1):
-            for u in matriz_distancias.keys():
-                for v in matriz_distancias[u].keys():
-                    peso = matriz_distancias[u][v]
-                    if (
-                        distancias[u] != float("inf")
-                        and distancias[u] + peso < distancias[v]
-                    ):
-                        distancias[v] = distancias[u] + peso
-                        predecesores[v] = u
-
-        # Detección de ciclos negativos
-        for u in matriz_distancias.keys():
-            for v in matriz_distancias[u].keys():
-                peso = matriz_distancias[u][v]
-                if (
-                    distancias[u] != float("inf")
-                    and distancias[u] + peso < distancias[v]
-                ):
+        """Ejecuta el algoritmo Bellman-Ford para encontrar caminos mínimos
+
+        Acepta una MatrizDistancias, las listas de VecinosCercanos o un dict
+        de dicts. Con ``metodo="matriz"`` cada pasada relaja todas las aristas
+        con una sola operación min(dist[:, None] + W) sobre bloques de filas;
+        con ``metodo="spfa"`` se usa una cola de nodos cuya distancia cambió,
+        más adecuada para grafos dispersos. Si no se indica, se elige según el
+        tipo de grafo. En ambos casos se termina en cuanto una pasada no
+        mejora ninguna distancia.
+        """
+        ids, filas, csr = self._preparar_grafo(matriz_distancias, metodo)
+        posicion_origen = ids.index(origen)
+
+        if csr is not None:
+            distancias, predecesores = self._spfa(len(ids), posicion_origen, *csr)
+        else:
+            distancias, predecesores = self._pasadas_matriz(
+                len(ids), posicion_origen, filas
+            )
+
+        return (
+            {nodo: float(d) for nodo, d in zip(ids, distancias.tolist())},
+            {
+                nodo: (ids[p] if p >= 0 else None)
+                for nodo, p in zip(ids, predecesores.tolist())
+            },
+        )
+
+    def _preparar_grafo(self, matriz_distancias, metodo: Optional[str]):
+        # Devuelve (ids, función de bloques de filas, arreglos CSR o None)
+        if isinstance(matriz_distancias, VecinosCercanos):
+            vecinos = matriz_distancias
+            return (
+                list(vecinos.ids),
+                None,
+                (vecinos.indptr, vecinos.indices, vecinos.pesos),
+            )
+
+        if isinstance(matriz_distancias, MatrizDistancias):
+            ids = list(matriz_distancias.ids)
+            filas = matriz_distancias.filas
+            densidad = 1.0
+        else:
+            # Dict de dicts: se pasa a una matriz con inf donde no hay arista
+            ids = list(matriz_distancias.keys())
+            indice = {nodo: i for i, nodo in enumerate(ids)}
+            pesos = np.full((len(ids), len(ids)), np.inf)
+            aristas = 0
+            for u, destinos in matriz_distancias.items():
+                for v, peso in destinos.items():
+                    pesos[indice[u], indice[v]] = peso
+                    aristas += 1
+
+            def filas(inicio, fin):
+                return pesos[inicio:fin]
+
+            densidad = aristas / max(len(ids) ** 2, 1)
+
+        if metodo is None:
+            metodo = "spfa" if densidad < DENSIDAD_SPFA else "matriz"
+        if metodo == "matriz":
+            return ids, filas, None
+        if metodo != "spfa":
+            raise ValueError(f"Método de Bellman-Ford desconocido: {metodo}")
+
+        # CSR a partir de las filas, sin las aristas inexistentes ni los lazos
+        indptr = [0]
+        indices = []
+        pesos_csr = []
+        n = len(ids)
+        tam_bloque = calcular_tam_bloque(n)
+        for inicio in range(0, n, tam_bloque):
+            fin = min(inicio + tam_bloque, n)
+            bloque = np.asarray(filas(inicio, fin), dtype=np.float64)
+            for k, fila in enumerate(bloque):
+                validos = np.isfinite(fila)
+                validos[inicio + k] = False
+                columnas = np.flatnonzero(validos)
+                indices.append(columnas)
+                pesos_csr.append(fila[columnas])
+                indptr.append(indptr[-1] + len(columnas))
+        return (
+            ids,
+            None,
+            (
+                np.array(indptr, dtype=np.int64),
+                np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64),
+                np.concatenate(pesos_csr) if pesos_csr else np.zeros(0),
+            ),
+        )
+
+    def _pasadas_matriz(
+        self, n: int, origen: int, filas
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Pasadas de Bellman-Ford relajando todas las aristas con NumPy"""
+        distancias = np.full(n, np.inf)
+        predecesores = np.full(n, -1, dtype=np.int64)
+        distancias[origen] = 0.0
+        tam_bloque = calcular_tam_bloque(n)
+
+        # Tras n - 1 pasadas las distancias son definitivas; si la pasada n
+        # todavía mejora alguna, hay un ciclo negativo
+        for pasada in range(n):
+            hubo_cambios = False
+            for inicio in range(0, n, tam_bloque):
+                fin = min(inicio + tam_bloque, n)
+                candidatas = distancias[inicio:fin, None] + np.asarray(
+                    filas(inicio, fin), dtype=np.float64
+                )
+                mejor_origen = np.argmin(candidatas, axis=0)
+                mejores = candidatas[mejor_origen, np.arange(n)]
+                mejora = mejores < distancias
+                if mejora.any():
+                    if pasada == n - 1:
+                        raise ValueError("Se detectó un ciclo negativo en el grafo")
+                    distancias[mejora] = mejores[mejora]
+                    predecesores[mejora] = inicio + mejor_origen[mejora]
+                    hubo_cambios = True
+            if not hubo_cambios:
+                break
+
+        return distancias, predecesores
+
+    def _spfa(
+        self,
+        n: int,
+        origen: int,
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        pesos: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Variante con cola (SPFA): solo se relajan las aristas de los nodos que cambiaron"""
+        distancias = np.full(n, np.inf)
+        predecesores = np.full(n, -1, dtype=np.int64)
+        distancias[origen] = 0.0
+        en_cola = np.zeros(n, dtype=bool)
+        veces_en_cola = np.zeros(n, dtype=np.int64)
+
+        cola = deque([origen])
+        en_cola[origen] = True
+        while cola:
+            u = cola.popleft()
+            en_cola[u] = False
+
+            destinos = indices[indptr[u]:indptr[u + 1]]
+            candidatas = distancias[u] + pesos[indptr[u]:indptr[u + 1]]
+            mejora = candidatas < distancias[destinos]
+            destinos = destinos[mejora]
+            distancias[destinos] = candidatas[mejora]
+            predecesores[destinos] = u
+
+            for v in destinos[~en_cola[destinos]].tolist():
+                # Un nodo que entra n veces a la cola está en un ciclo negativo
+                veces_en_cola[v] += 1
+                if veces_en_cola[v] >= n:
                     raise ValueError("Se detectó un ciclo negativo en el grafo")
+                en_cola[v] = True
+                cola.append(v)
 
         return distancias, predecesores
 
@@ -64,14 +204,39 @@ class BellmanFord:
         vehiculos: List[Dict],
         distancias: Dict,
         predecesores: Dict,
+        matriz: Optional[MatrizDistancias] = None,
     ) -> List[Dict]:
-        """Asigna clientes a vehículos basándose en capacidad y distancia"""
-        
-        rutas = []
-        clientes_asignados = set()
+        """Asigna clientes a vehículos basándose en capacidad y distancia
+
+        Cada vehículo arma su ruta por vecino más cercano: la siguiente parada
+        es, entre los clientes de mejor prioridad que aún caben en capacidad y
+        en las 8 horas, el más cercano a la última parada. Las distancias se
+        leen de la matriz ya construida y los clientes pendientes se marcan en
+        un arreglo booleano; primero se buscan candidatos entre los k vecinos
+        más cercanos y solo si ahí no hay uno válido se recorre la fila completa.
+        """
+        if matriz is None:
+            matriz = construir_matriz_distancias(clientes)
+
+        n = len(clientes)
+        posiciones = matriz.posiciones([cliente["id"] for cliente in clientes])
+        cliente_en_posicion = np.full(len(matriz), -1, dtype=np.int64)
+        cliente_en_posicion[posiciones] = np.arange(n)
+        pedidos = np.array(
+            [cliente["pedido"] for cliente in clientes], dtype=np.float64
+        )
+        prioridades = np.array([cliente["prioridad"] for cliente in clientes])
+        desde_deposito = np.array(
+            [distancias.get(cliente["id"], float("inf")) for cliente in clientes]
+        )
+        vecinos = obtener_vecinos_cercanos(
+            [DEPOSITO] + clientes, K_VECINOS_ASIGNACION
+        )
+        if list(vecinos.ids) != list(matriz.ids):
+            vecinos = None
 
-        # Ordenar clientes por prioridad (menor número = mayor prioridad)
-        clientes_ordenados = sorted(clientes, key=lambda x: x["prioridad"])
+        pendientes = np.ones(n, dtype=bool)
+        rutas = []
 
         # Ordenar vehículos por capacidad (mayor a menor)
         vehiculos_ordenados = sorted(
@@ -81,6 +246,8 @@ class BellmanFord:
         for vehiculo in vehiculos_ordenados:
             if not vehiculo["disponible"]:
                 continue
+            if not pendientes.any():
+                break
 
             ruta_vehiculo = {
                 "vehiculo_id": vehiculo["id"],
@@ -93,60 +260,99 @@ class BellmanFord:
             }
 
             capacidad_restante = vehiculo["capacidad"]
-
-            for cliente in clientes_ordenados:
-                if cliente["id"] in clientes_asignados:
-                    continue
-
-                # Verificar capacidad
-                if cliente["pedido"] > capacidad_restante:
-                    continue
-
-                # Calcular distancia desde el último punto de la ruta
-                if not ruta_vehiculo["clientes"]:
-                    # Primer cliente desde depósito
-                    distancia = distancias.get(cliente["id"], float("inf"))
-                    camino = self.reconstruir_camino(predecesores, cliente["id"])
-                else:
-                    # Desde el último cliente
-                    ultimo_cliente = ruta_vehiculo["clientes"][-1]
-                    distancia = calcular_distancia(
-                        ultimo_cliente["latitud"],
-                        ultimo_cliente["longitud"],
-                        cliente["latitud"],
-                        cliente["longitud"],
+            ultimo = None
+
+            while True:
+                caben = pendientes & (pedidos <= capacidad_restante)
+                if not caben.any():
+                    break
+
+                siguiente = None
+                if ultimo is not None and vecinos is not None:
+                    siguiente = self._siguiente_entre_vecinos(
+                        vecinos,
+                        posiciones[ultimo],
+                        cliente_en_posicion,
+                        caben,
+                        prioridades,
+                        ruta_vehiculo["tiempo_estimado"],
                     )
-                    camino = [ultimo_cliente["id"], cliente["id"]]
-
-                # Verificar restricciones de tiempo (8 horas máximo)
-                tiempo_estimado = distancia * 2  # 2 minutos por km (estimación)
-                if ruta_vehiculo["tiempo_estimado"] + tiempo_estimado > 480:  # 8 horas
-                    continue
+                if siguiente is None:
+                    if ultimo is None:
+                        # Primer cliente desde el depósito
+                        fila = desde_deposito
+                    else:
+                        fila = np.asarray(
+                            matriz.fila(posiciones[ultimo]), dtype=np.float64
+                        )[posiciones]
+                    siguiente = self._siguiente_en_fila(
+                        fila, caben, prioridades, ruta_vehiculo["tiempo_estimado"]
+                    )
+                if siguiente is None:
+                    break
 
+                indice, distancia = siguiente
+                cliente = clientes[indice]
                 ruta_vehiculo["clientes"].append(cliente)
                 ruta_vehiculo["distancia_total"] += distancia
                 ruta_vehiculo["carga_total"] += cliente["pedido"]
-                ruta_vehiculo["tiempo_estimado"] += tiempo_estimado
+                ruta_vehiculo["tiempo_estimado"] += distancia * MINUTOS_POR_KM
                 capacidad_restante -= cliente["pedido"]
-                clientes_asignados.add(cliente["id"])
+                pendientes[indice] = False
+                ultimo = indice
 
             if ruta_vehiculo["clientes"]:
                 # Agregar retorno al depósito
-                if ruta_vehiculo["clientes"]:
-                    ultimo_cliente = ruta_vehiculo["clientes"][-1]
-                    distancia_deposito = calcular_distancia(
-                        ultimo_cliente["latitud"],
-                        ultimo_cliente["longitud"],
-                        -12.0464,
-                        -77.0428,  # Coordenadas del depósito
-                    )
-                    ruta_vehiculo["distancia_total"] += distancia_deposito
-                    ruta_vehiculo["tiempo_estimado"] += distancia_deposito * 2
+                distancia_deposito = matriz.valor(posiciones[ultimo], 0)
+                ruta_vehiculo["distancia_total"] += distancia_deposito
+                ruta_vehiculo["tiempo_estimado"] += distancia_deposito * MINUTOS_POR_KM
 
                 rutas.append(ruta_vehiculo)
 
         return rutas
 
+    def _siguiente_entre_vecinos(
+        self,
+        vecinos: VecinosCercanos,
+        posicion_ultimo: int,
+        cliente_en_posicion: np.ndarray,
+        caben: np.ndarray,
+        prioridades: np.ndarray,
+        tiempo_actual: float,
+    ) -> Optional[Tuple[int, float]]:
+        """Busca la siguiente parada entre los vecinos de la última; None si no alcanza"""
+        nivel = prioridades[caben].min()
+        for posicion, distancia in zip(
+            vecinos.knn_indices[posicion_ultimo].tolist(),
+            vecinos.knn_distancias[posicion_ultimo].tolist(),
+        ):
+            indice = cliente_en_posicion[posicion]
+            if indice < 0 or not caben[indice] or prioridades[indice] != nivel:
+                continue
+            # Es el más cercano de la mejor prioridad: si no entra en el
+            # tiempo, ninguno de ese nivel entra y se decide con la fila
+            if tiempo_actual + distancia * MINUTOS_POR_KM <= TIEMPO_MAXIMO_RUTA:
+                return int(indice), distancia
+            return None
+        return None
+
+    def _siguiente_en_fila(
+        self,
+        fila: np.ndarray,
+        caben: np.ndarray,
+        prioridades: np.ndarray,
+        tiempo_actual: float,
+    ) -> Optional[Tuple[int, float]]:
+        """Elige la siguiente parada recorriendo todas las distancias de la fila"""
+        tiempos = tiempo_actual + fila * MINUTOS_POR_KM
+        factibles = caben & (tiempos <= TIEMPO_MAXIMO_RUTA)
+        if not factibles.any():
+            return None
+        nivel = prioridades[factibles].min()
+        candidatos = np.flatnonzero(factibles & (prioridades == nivel))
+        indice = candidatos[np.argmin(fila[candidatos])]
+        return int(indice), float(fila[indice])
+
     def optimizar_rutas(self, clientes: List[Dict], vehiculos: List[Dict]) -> Dict:
         """Método principal para optimizar rutas usando Bellman-Ford"""
         tiempo_inicio = time.time()
@@ -162,7 +368,7 @@ class BellmanFord:
 
             # Asignar clientes a vehículos
             rutas = self.asignar_clientes_a_vehiculos(
-                clientes, vehiculos, distancias, predecesores
+                clientes, vehiculos, distancias, predecesores, matriz_distancias
             )
 
             # Calcular métricas
@@ -0,0 +1,403 @@
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..utils.calculos_comunes import construir_matriz_distancias
+
+MINUTOS_POR_KM = 2  # estimación
+TIEMPO_MAXIMO_RUTA = 480  # 8 horas
+# Presupuesto por defecto de la etapa de mejora, en segundos
+TIEMPO_BUSQUEDA_LOCAL = 2.0
+# Vecinos de cada cliente junto a los que se prueba dejarlo
+K_VECINOS_BUSQUEDA_LOCAL = 10
+# Largo máximo de los tramos que mueven Or-opt y relocate
+LARGO_MAXIMO_TRAMO = 3
+EPSILON = 1e-9
+
+
+class BusquedaLocal:
+    """Mejora un conjunto de rutas con 2-opt, Or-opt, relocate y swap.
+
+    Los nodos son posiciones en ``pesos`` (0 es el depósito) y cada ruta es
+    la lista de clientes que visita, sin el depósito. Solo se prueban
+    movimientos que dejan a un cliente junto a uno de sus k vecinos más
+    cercanos, y se aplica la primera mejora encontrada. Cada cliente tiene
+    un bit "no mirar": sale de la cola cuando ningún movimiento suyo mejora
+    y vuelve a ella cuando cambia una arista que lo toca.
+
+    Los movimientos entre rutas respetan la capacidad del vehículo y
+    TIEMPO_MAXIMO_RUTA; los que cambian una sola ruta siempre la acortan.
+    Supone distancias simétricas.
+    """
+
+    def __init__(
+        self,
+        pesos: np.ndarray,
+        rutas: List[List[int]],
+        demandas: List[float],
+        capacidades: List[float],
+        k_vecinos: int = K_VECINOS_BUSQUEDA_LOCAL,
+    ):
+        pesos = np.asarray(pesos, dtype=np.float64)
+        self.d = pesos.tolist()
+        self.rutas = [list(ruta) for ruta in rutas]
+        self.demandas = demandas
+        self.capacidades = capacidades
+        self.ruta_de = [-1] * len(pesos)
+        self.indice_en = [-1] * len(pesos)
+        for r in range(len(self.rutas)):
+            self._reindexar(r)
+        self.cargas = [sum(demandas[c] for c in ruta) for ruta in self.rutas]
+        self.distancias = [self.costo(ruta) for ruta in self.rutas]
+        self.vecinos = self._calcular_vecinos(pesos, k_vecinos)
+        self.evaluaciones = 0
+        self.movimientos = {"2opt": 0, "or_opt": 0, "relocate": 0, "swap": 0}
+
+    @staticmethod
+    def _calcular_vecinos(pesos: np.ndarray, k: int) -> List[List[int]]:
+        # Los k clientes más cercanos de cada cliente, del más cercano al más lejano
+        k = min(k, len(pesos) - 2)
+        if k <= 0:
+            return [[] for _ in range(len(pesos))]
+        distancias = pesos[1:, 1:].copy()
+        np.fill_diagonal(distancias, np.inf)
+        cercanos = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+        orden = np.argsort(np.take_along_axis(distancias, cercanos, axis=1), axis=1)
+        return [[]] + (np.take_along_axis(cercanos, orden, axis=1) + 1).tolist()
+
+    def costo(self, ruta: List[int]) -> float:
+        """Distancia de una ruta saliendo y volviendo al depósito"""
+        recorrido = [0] + ruta + [0]
+        return sum(self.d[a][b] for a, b in zip(recorrido, recorrido[1:]))
+
+    def _reindexar(self, r: int):
+        for i, cliente in enumerate(self.rutas[r]):
+            self.ruta_de[cliente] = r
+            self.indice_en[cliente] = i
+
+    def _anterior(self, cliente: int) -> int:
+        i = self.indice_en[cliente]
+        return self.rutas[self.ruta_de[cliente]][i - 1] if i > 0 else 0
+
+    def _siguiente(self, cliente: int) -> int:
+        ruta = self.rutas[self.ruta_de[cliente]]
+        i = self.indice_en[cliente]
+        return ruta[i + 1] if i + 1 < len(ruta) else 0
+
+    def mejorar(self, tiempo_limite: float = TIEMPO_BUSQUEDA_LOCAL) -> bool:
+        """Aplica movimientos hasta un óptimo local o hasta agotar el tiempo.
+
+        Devuelve si se llegó al óptimo local (la cola quedó vacía).
+        """
+        inicio = time.time()
+        cola = deque(cliente for ruta in self.rutas for cliente in ruta)
+        en_cola = set(cola)
+        while cola:
+            if time.time() - inicio > tiempo_limite:
+                return False
+            cliente = cola.popleft()
+            en_cola.discard(cliente)
+            tocados = self._mejorar_cliente(cliente)
+            for nodo in tocados or ():
+                if nodo and nodo not in en_cola:
+                    cola.append(nodo)
+                    en_cola.add(nodo)
+        return True
+
+    def _mejorar_cliente(self, u: int) -> Optional[List[int]]:
+        # Devuelve los nodos cuyas aristas cambiaron, o None si nada mejora
+        for v in self.vecinos[u]:
+            if self.ruta_de[u] == self.ruta_de[v]:
+                tocados = self._dos_opt(u, v) or self._mover_tramo(u, v)
+            else:
+                tocados = self._mover_tramo(u, v) or self._intercambiar(u, v)
+            if tocados:
+                return tocados
+        return None
+
+    def _dos_opt(self, u: int, v: int) -> Optional[List[int]]:
+        """Invierte el tramo entre u y v para que queden unidos por una arista"""
+        d = self.d
+        r = self.ruta_de[u]
+        ruta = self.rutas[r]
+        i, j = self.indice_en[u], self.indice_en[v]
+        if i > j:
+            i, j, u, v = j, i, v, u
+        anterior_u = ruta[i - 1] if i > 0 else 0
+        siguiente_u = ruta[i + 1]
+        anterior_v = ruta[j - 1]
+        siguiente_v = ruta[j + 1] if j + 1 < len(ruta) else 0
+        self.evaluaciones += 2
+
+        # (u, su), (v, sv) -> (u, v), (su, sv)
+        ganancia = (
+            d[u][siguiente_u]
+            + d[v][siguiente_v]
+            - d[u][v]
+            - d[siguiente_u][siguiente_v]
+        )
+        if ganancia > EPSILON:
+            self._invertir(r, i + 1, j, ganancia)
+            return [u, siguiente_u, v, siguiente_v]
+
+        # (pu, u), (pv, v) -> (pu, pv), (u, v)
+        ganancia = (
+            d[anterior_u][u]
+            + d[anterior_v][v]
+            - d[anterior_u][anterior_v]
+            - d[u][v]
+        )
+        if ganancia > EPSILON:
+            self._invertir(r, i, j - 1, ganancia)
+            return [anterior_u, u, anterior_v, v]
+        return None
+
+    def _invertir(self, r: int, inicio: int, fin: int, ganancia: float):
+        ruta = self.rutas[r]
+        ruta[inicio : fin + 1] = ruta[inicio : fin + 1][::-1]
+        for i in range(inicio, fin + 1):
+            self.indice_en[ruta[i]] = i
+        self.distancias[r] -= ganancia
+        self.movimientos["2opt"] += 1
+
+    def _mover_tramo(self, u: int, v: int) -> Optional[List[int]]:
+        """Mueve el tramo que empieza en u (1 a LARGO_MAXIMO_TRAMO clientes) junto a v.
+
+        En la misma ruta es Or-opt; hacia otra ruta es relocate. El tramo
+        se inserta en el sentido que resulte más corto.
+        """
+        d = self.d
+        ruta_a, ruta_b = self.ruta_de[u], self.ruta_de[v]
+        misma = ruta_a == ruta_b
+        clientes_a = self.rutas[ruta_a]
+        i = self.indice_en[u]
+        anterior = clientes_a[i - 1] if i > 0 else 0
+        carga = 0.0
+        # Aristas internas del tramo: pasan con él a la otra ruta
+        interno = 0.0
+
+        for largo in range(1, LARGO_MAXIMO_TRAMO + 1):
+            if i + largo > len(clientes_a):
+                return None
+            ultimo = clientes_a[i + largo - 1]
+            if ultimo == v:
+                return None
+            carga += self.demandas[ultimo]
+            if largo > 1:
+                interno += d[clientes_a[i + largo - 2]][ultimo]
+            if not misma and self.cargas[ruta_b] + carga > self.capacidades[ruta_b]:
+                return None
+            siguiente = clientes_a[i + largo] if i + largo < len(clientes_a) else 0
+
+            quitar = d[anterior][u] + d[ultimo][siguiente] - d[anterior][siguiente]
+            if quitar <= EPSILON:
+                continue
+
+            # Vecinos de v una vez quitado el tramo
+            anterior_v, siguiente_v = self._anterior(v), self._siguiente(v)
+            if misma and v == siguiente:
+                anterior_v = anterior
+            if misma and v == anterior:
+                siguiente_v = siguiente
+
+            for a, b in ((anterior_v, v), (v, siguiente_v)):
+                if misma and (a, b) == (anterior, siguiente):
+                    continue
+                directo = d[a][u] + d[ultimo][b]
+                invertido = d[a][ultimo] + d[u][b]
+                agregar = min(directo, invertido) - d[a][b]
+                self.evaluaciones += 1
+                ganancia = quitar - agregar
+                if ganancia <= EPSILON:
+                    continue
+                if not misma and (
+                    (self.distancias[ruta_b] + agregar + interno) * MINUTOS_POR_KM
+                    > TIEMPO_MAXIMO_RUTA
+                ):
+                    continue
+
+                tramo = clientes_a[i : i + largo]
+                if invertido < directo:
+                    tramo.reverse()
+                del clientes_a[i : i + largo]
+                clientes_b = self.rutas[ruta_b]
+                posicion = clientes_b.index(a) + 1 if a else 0
+                clientes_b[posicion:posicion] = tramo
+                self._reindexar(ruta_a)
+                if misma:
+                    self.distancias[ruta_a] -= ganancia
+                    self.movimientos["or_opt"] += 1
+                else:
+                    self._reindexar(ruta_b)
+                    self.distancias[ruta_a] -= quitar + interno
+                    self.distancias[ruta_b] += agregar + interno
+                    self.cargas[ruta_a] -= carga
+                    self.cargas[ruta_b] += carga
+                    self.movimientos["relocate"] += 1
+                return [anterior, siguiente, u, ultimo, a, b]
+        return None
+
+    def _intercambiar(self, u: int, v: int) -> Optional[List[int]]:
+        """Intercambia u con el cliente anterior o siguiente a v (rutas distintas)"""
+        d = self.d
+        ruta_a, ruta_b = self.ruta_de[u], self.ruta_de[v]
+        anterior_u, siguiente_u = self._anterior(u), self._siguiente(u)
+
+        for w in (self._anterior(v), self._siguiente(v)):
+            if not w:
+                continue
+            anterior_w, siguiente_w = self._anterior(w), self._siguiente(w)
+            diferencia = self.demandas[w] - self.demandas[u]
+            if (
+                self.cargas[ruta_a] + diferencia > self.capacidades[ruta_a]
+                or self.cargas[ruta_b] - diferencia > self.capacidades[ruta_b]
+            ):
+                continue
+
+            delta_a = (
+                d[anterior_u][w]
+                + d[w][siguiente_u]
+                - d[anterior_u][u]
+                - d[u][siguiente_u]
+            )
+            delta_b = (
+                d[anterior_w][u]
+                + d[u][siguiente_w]
+                - d[anterior_w][w]
+                - d[w][siguiente_w]
+            )
+            self.evaluaciones += 1
+            if delta_a + delta_b >= -EPSILON:
+                continue
+            if any(
+                delta > 0
+                and (self.distancias[r] + delta) * MINUTOS_POR_KM > TIEMPO_MAXIMO_RUTA
+                for r, delta in ((ruta_a, delta_a), (ruta_b, delta_b))
+            ):
+                continue
+
+            i, j = self.indice_en[u], self.indice_en[w]
+            self.rutas[ruta_a][i], self.rutas[ruta_b][j] = w, u
+            self.ruta_de[u], self.ruta_de[w] = ruta_b, ruta_a
+            self.indice_en[u], self.indice_en[w] = j, i
+            self.distancias[ruta_a] += delta_a
+            self.distancias[ruta_b] += delta_b
+            self.cargas[ruta_a] += diferencia
+            self.cargas[ruta_b] -= diferencia
+            self.movimientos["swap"] += 1
+            return [anterior_u, siguiente_u, u, w, anterior_w, siguiente_w]
+        return None
+
+
+def _secuencia(ruta: Dict) -> List:
+    """Ids de los clientes de una ruta en el orden en que se visitan"""
+    for clave in ("ruta_optimizada", "orden_visita"):
+        if ruta.get(clave):
+            return [nodo for nodo in ruta[clave] if nodo != "deposito"]
+    return [cliente["id"] for cliente in ruta["clientes"]]
+
+
+def mejorar_resultados(
+    resultados: Dict,
+    tiempo_limite: float = TIEMPO_BUSQUEDA_LOCAL,
+    matriz: Optional[Dict] = None,
+    k_vecinos: int = K_VECINOS_BUSQUEDA_LOCAL,
+) -> Dict:
+    """Aplica la búsqueda local a ``resultados["rutas"]`` de cualquier algoritmo.
+
+    Actualiza en el lugar el orden y los totales de cada ruta (las que
+    quedan vacías se quitan) y las métricas, y agrega en
+    ``metricas["busqueda_local"]`` la mejora lograda, los movimientos
+    aplicados y los movimientos evaluados por segundo. ``matriz`` es la
+    matriz del dataset; por defecto se usa la de los resultados o se
+    calcula una solo con los clientes de las rutas. Las rutas con horarios
+    (``resultados["ventanas_horarias"]``) no se tocan: los movimientos no
+    verifican ventanas de tiempo.
+    """
+    rutas = resultados.get("rutas") or []
+    if not rutas:
+        return resultados
+    if resultados.get("ventanas_horarias"):
+        resultados["metricas"]["busqueda_local"] = {
+            "omitida": "la búsqueda local no respeta ventanas de tiempo"
+        }
+        return resultados
+
+    inicio = time.time()
+    clientes_por_id = {c["id"]: c for ruta in rutas for c in ruta["clientes"]}
+    secuencias = [_secuencia(ruta) for ruta in rutas]
+    ids = ["deposito"] + [nodo for secuencia in secuencias for nodo in secuencia]
+    posicion = {nodo: i for i, nodo in enumerate(ids)}
+
+    if matriz is None:
+        matriz = resultados.get("matriz_distancias")
+    if matriz is None:
+        matriz = construir_matriz_distancias(
+            [clientes_por_id[nodo] for nodo in ids[1:]], usar_cache=False
+        )
+    if hasattr(matriz, "submatriz"):
+        pesos = matriz.submatriz(ids)
+    else:
+        pesos = np.array([[matriz[u][v] for v in ids] for u in ids])
+
+    busqueda = BusquedaLocal(
+        pesos,
+        [[posicion[nodo] for nodo in secuencia] for secuencia in secuencias],
+        [0.0] + [clientes_por_id[nodo]["pedido"] for nodo in ids[1:]],
+        [ruta["capacidad"] for ruta in rutas],
+        k_vecinos,
+    )
+    distancia_inicial = sum(busqueda.distancias)
+    optimo_local = busqueda.mejorar(tiempo_limite)
+    tiempo = time.time() - inicio
+
+    rutas_mejoradas = []
+    for ruta, secuencia in zip(rutas, busqueda.rutas):
+        if not secuencia:
+            continue
+        ids_ruta = [ids[p] for p in secuencia]
+        distancia = busqueda.costo(secuencia)
+        ruta["clientes"] = [clientes_por_id[nodo] for nodo in ids_ruta]
+        ruta["distancia_total"] = distancia
+        ruta["carga_total"] = sum(c["pedido"] for c in ruta["clientes"])
+        ruta["tiempo_estimado"] = distancia * MINUTOS_POR_KM
+        for clave in ("ruta_optimizada", "orden_visita"):
+            if clave in ruta:
+                ruta[clave] = ["deposito"] + ids_ruta + ["deposito"]
+        rutas_mejoradas.append(ruta)
+    resultados["rutas"] = rutas_mejoradas
+
+    distancia_final = sum(ruta["distancia_total"] for ruta in rutas_mejoradas)
+    aplicados = sum(busqueda.movimientos.values())
+    metricas = resultados.setdefault("metricas", {})
+    clientes_atendidos = sum(len(ruta["clientes"]) for ruta in rutas_mejoradas)
+    metricas.update(
+        {
+            "distancia_total": distancia_final,
+            "tiempo_total": sum(ruta["tiempo_estimado"] for ruta in rutas_mejoradas),
+            "clientes_atendidos": clientes_atendidos,
+            "vehiculos_utilizados": len(rutas_mejoradas),
+            "eficiencia": clientes_atendidos / max(len(rutas_mejoradas), 1),
+        }
+    )
+    metricas["busqueda_local"] = {
+        "distancia_inicial": distancia_inicial,
+        "distancia_final": distancia_final,
+        "mejora": distancia_inicial - distancia_final,
+        "mejora_porcentual": (
+            100 * (distancia_inicial - distancia_final) / distancia_inicial
+            if distancia_inicial
+            else 0.0
+        ),
+        "movimientos": busqueda.movimientos,
+        "movimientos_aplicados": aplicados,
+        "evaluaciones": busqueda.evaluaciones,
+        "tiempo": tiempo,
+        "tiempo_limite": tiempo_limite,
+        "optimo_local": optimo_local,
+        "movimientos_por_segundo": busqueda.evaluaciones / max(tiempo, 1e-9),
+        "mejoras_por_segundo": aplicados / max(tiempo, 1e-9),
+    }
+    return resultados
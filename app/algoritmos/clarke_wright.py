@@ -0,0 +1,292 @@
+import time
+from bisect import bisect_left, insort
+from typing import Dict, List, Tuple
+import numpy as np
+from ..utils.calculos_comunes import construir_matriz_distancias
+
+MINUTOS_POR_KM = 2  # estimación
+TIEMPO_MAXIMO_RUTA = 480  # 8 horas
+EPSILON = 1e-9
+
+
+def _asignable(cargas: List[float], capacidades: List[float]) -> bool:
+    """Indica si las rutas más cargadas caben una por vehículo.
+
+    ``cargas`` está en orden ascendente y ``capacidades`` en orden
+    descendente: basta comparar la k-ésima ruta más cargada con el k-ésimo
+    vehículo más grande.
+    """
+    return all(
+        carga <= capacidad for carga, capacidad in zip(reversed(cargas), capacidades)
+    )
+
+
+class ClarkeWright:
+    """Algoritmo de ahorros de Clarke y Wright para toda la flota a la vez
+
+    Cada cliente empieza en su propia ruta depósito-cliente-depósito y las
+    rutas se unen por sus extremos en orden decreciente de ahorro
+    s(i, j) = d(0, i) + d(0, j) - d(i, j), mientras la unión respete la
+    capacidad, TIEMPO_MAXIMO_RUTA y pueda seguir asignándose cada ruta a un
+    vehículo distinto de la flota.
+    """
+
+    def __init__(self, grafo: Dict):
+        self.grafo = grafo
+        self.clientes_no_asignados = []
+        self.estadisticas = {
+            "pares_con_ahorro": 0,
+            "uniones": 0,
+            "rechazos_capacidad": 0,
+            "rechazos_tiempo": 0,
+            "rechazos_flota": 0,
+        }
+
+    def seleccionar_clientes(
+        self, clientes: List[Dict], capacidades: List[float], deposito: np.ndarray
+    ) -> List[Dict]:
+        """Elige los clientes a atender por prioridad hasta llenar la flota
+
+        ``deposito`` son las distancias desde el depósito a cada cliente. Se
+        descartan los que no caben en ningún vehículo o cuyo ida y vuelta
+        supera el tiempo máximo, y los que ya no entran en la capacidad
+        total de la flota.
+        """
+        orden = sorted(
+            range(len(clientes)),
+            key=lambda i: (clientes[i]["prioridad"], -clientes[i]["pedido"]),
+        )
+        capacidad_libre = sum(capacidades)
+        cargas = []
+        seleccionados = []
+        for i in orden:
+            cliente = clientes[i]
+            pedido = cliente["pedido"]
+            if (
+                pedido > capacidad_libre
+                or 2 * deposito[i] * MINUTOS_POR_KM > TIEMPO_MAXIMO_RUTA
+            ):
+                self.clientes_no_asignados.append(cliente["id"])
+                continue
+            insort(cargas, pedido)
+            if not _asignable(cargas, capacidades):
+                cargas.pop(bisect_left(cargas, pedido))
+                self.clientes_no_asignados.append(cliente["id"])
+                continue
+            capacidad_libre -= pedido
+            seleccionados.append(cliente)
+        return seleccionados
+
+    @staticmethod
+    def calcular_ahorros(
+        pesos: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Pares (i, j), i < j, con ahorro positivo, de mayor a menor ahorro"""
+        deposito = pesos[0, 1:]
+        ahorros = deposito[:, None] + deposito[None, :] - pesos[1:, 1:]
+        i, j = np.triu_indices(len(deposito), k=1)
+        valores = ahorros[i, j]
+        positivos = np.flatnonzero(valores > EPSILON)
+        orden = positivos[np.argsort(-valores[positivos], kind="stable")]
+        return i[orden] + 1, j[orden] + 1, valores[orden]
+
+    def unir_rutas(
+        self, pesos: np.ndarray, demandas: List[float], capacidades: List[float]
+    ) -> List[Tuple[List[int], float]]:
+        """Une las rutas por ahorros; devuelve (clientes en orden, carga) por ruta
+
+        Las rutas se guardan con union-find (la raíz lleva carga y
+        distancia) y, para cada cliente, sus vecinos dentro de la ruta: un
+        cliente con menos de dos es un extremo y todavía puede unirse.
+        """
+        n = len(pesos)
+        padre = list(range(n))
+        carga = list(demandas)
+        distancia = (2 * pesos[0]).tolist()
+        enlaces = [[] for _ in range(n)]
+        cargas = sorted(demandas[1:])
+
+        def raiz(x: int) -> int:
+            while padre[x] != x:
+                padre[x] = padre[padre[x]]
+                x = padre[x]
+            return x
+
+        origenes, destinos, ahorros = self.calcular_ahorros(pesos)
+        self.estadisticas["pares_con_ahorro"] = len(ahorros)
+        pares = zip(origenes.tolist(), destinos.tolist(), ahorros.tolist())
+        for i, j, ahorro in pares:
+            if len(enlaces[i]) == 2 or len(enlaces[j]) == 2:
+                continue
+            ri, rj = raiz(i), raiz(j)
+            if ri == rj:
+                continue
+
+            nueva_carga = carga[ri] + carga[rj]
+            if nueva_carga > capacidades[0]:
+                self.estadisticas["rechazos_capacidad"] += 1
+                continue
+            nueva_distancia = distancia[ri] + distancia[rj] - ahorro
+            if nueva_distancia * MINUTOS_POR_KM > TIEMPO_MAXIMO_RUTA:
+                self.estadisticas["rechazos_tiempo"] += 1
+                continue
+
+            # La unión no debe dejar rutas sin un vehículo que las lleve
+            cargas.pop(bisect_left(cargas, carga[ri]))
+            cargas.pop(bisect_left(cargas, carga[rj]))
+            insort(cargas, nueva_carga)
+            if not _asignable(cargas, capacidades):
+                cargas.pop(bisect_left(cargas, nueva_carga))
+                insort(cargas, carga[ri])
+                insort(cargas, carga[rj])
+                self.estadisticas["rechazos_flota"] += 1
+                continue
+
+            padre[rj] = ri
+            carga[ri] = nueva_carga
+            distancia[ri] = nueva_distancia
+            enlaces[i].append(j)
+            enlaces[j].append(i)
+            self.estadisticas["uniones"] += 1
+
+        # Recorrer cada ruta desde uno de sus extremos
+        rutas = []
+        visitado = [False] * n
+        for inicio in range(1, n):
+            if visitado[inicio] or len(enlaces[inicio]) == 2:
+                continue
+            ruta = [inicio]
+            visitado[inicio] = True
+            anterior, actual = None, inicio
+            while True:
+                siguientes = [x for x in enlaces[actual] if x != anterior]
+                if not siguientes:
+                    break
+                anterior, actual = actual, siguientes[0]
+                ruta.append(actual)
+                visitado[actual] = True
+            rutas.append((ruta, carga[raiz(inicio)]))
+        return rutas
+
+    def optimizar_rutas(self, clientes: List[Dict], vehiculos: List[Dict]) -> Dict:
+        """Método principal para optimizar rutas usando Clarke-Wright"""
+        tiempo_inicio = time.time()
+
+        try:
+            # Construir matriz de distancias
+            matriz_distancias = construir_matriz_distancias(clientes)
+
+            vehiculos_ordenados = sorted(
+                (vehiculo for vehiculo in vehiculos if vehiculo["disponible"]),
+                key=lambda x: x["capacidad"],
+                reverse=True,
+            )
+            capacidades = [vehiculo["capacidad"] for vehiculo in vehiculos_ordenados]
+
+            # Clientes que la flota puede atender
+            self.clientes_no_asignados = []
+            desde_deposito = np.asarray(
+                matriz_distancias.fila(matriz_distancias.posicion("deposito")),
+                dtype=np.float64,
+            )[matriz_distancias.posiciones([c["id"] for c in clientes])]
+            seleccionados = self.seleccionar_clientes(
+                clientes, capacidades, desde_deposito
+            )
+
+            # Unir rutas por ahorros
+            nodos = ["deposito"] + [c["id"] for c in seleccionados]
+            pesos = np.asarray(matriz_distancias.submatriz(nodos), dtype=np.float64)
+            rutas_unidas = self.unir_rutas(
+                pesos, [0.0] + [c["pedido"] for c in seleccionados], capacidades
+            )
+
+            # La k-ésima ruta más cargada va en el k-ésimo vehículo más grande
+            rutas_unidas.sort(key=lambda x: x[1], reverse=True)
+            rutas = []
+            for k, (ruta, carga) in enumerate(rutas_unidas):
+                clientes_ruta = [seleccionados[p - 1] for p in ruta]
+                if k >= len(vehiculos_ordenados):
+                    self.clientes_no_asignados.extend(c["id"] for c in clientes_ruta)
+                    continue
+                vehiculo = vehiculos_ordenados[k]
+                recorrido = [0] + ruta + [0]
+                distancia_total = float(pesos[recorrido[:-1], recorrido[1:]].sum())
+                rutas.append(
+                    {
+                        "vehiculo_id": vehiculo["id"],
+                        "placa": vehiculo["placa"],
+                        "capacidad": vehiculo["capacidad"],
+                        "clientes": clientes_ruta,
+                        "distancia_total": distancia_total,
+                        "carga_total": carga,
+                        "tiempo_estimado": distancia_total * MINUTOS_POR_KM,
+                        "orden_visita": ["deposito"]
+                        + [c["id"] for c in clientes_ruta]
+                        + ["deposito"],
+                    }
+                )
+
+            # Calcular métricas
+            distancia_total = sum(ruta["distancia_total"] for ruta in rutas)
+            tiempo_total = sum(ruta["tiempo_estimado"] for ruta in rutas)
+            clientes_atendidos = sum(len(ruta["clientes"]) for ruta in rutas)
+            vehiculos_utilizados = len(rutas)
+
+            tiempo_ejecucion = time.time() - tiempo_inicio
+
+            resultados = {
+                "algoritmo": "Clarke-Wright",
+                "tiempo_ejecucion": tiempo_ejecucion,
+                "rutas": rutas,
+                "metricas": {
+                    "distancia_total": distancia_total,
+                    "tiempo_total": tiempo_total,
+                    "clientes_atendidos": clientes_atendidos,
+                    "vehiculos_utilizados": vehiculos_utilizados,
+                    "eficiencia": clientes_atendidos / max(vehiculos_utilizados, 1),
+                },
+                "clientes_no_asignados": self.clientes_no_asignados,
+                "estadisticas_ahorros": self.estadisticas,
+            }
+
+            return resultados
+
+        except Exception as e:
+            return {
+                "algoritmo": "Clarke-Wright",
+                "error": str(e),
+                "tiempo_ejecucion": time.time() - tiempo_inicio,
+            }
+
+
+def optimizar_rutas_clarke_wright(clientes: List[Dict], vehiculos: List[Dict], **kwargs) -> Dict:
+    """
+    Función principal para optimizar rutas usando el algoritmo de ahorros de Clarke-Wright
+
+    Args:
+        clientes: Lista de clientes con sus coordenadas y pedidos
+        vehiculos: Lista de vehículos con sus capacidades
+        **kwargs: Parámetros adicionales (ignorados para simplificar)
+
+    Returns:
+        Dict con los resultados de la optimización
+    """
+    try:
+        # Crear instancia del algoritmo
+        clarke_wright = ClarkeWright({})
+
+        # Ejecutar optimización directamente
+        resultados = clarke_wright.optimizar_rutas(clientes, vehiculos)
+
+        # Agregar información básica
+        resultados["fecha_ejecucion"] = time.time()
+
+        return resultados
+
+    except Exception as e:
+        return {
+            "algoritmo": "Clarke-Wright",
+            "error": f"Error en optimización: {str(e)}",
+            "tiempo_ejecucion": 0,
+            "fecha_ejecucion": time.time()
+        }
@@ -0,0 +1,282 @@
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from ..utils.matriz_distancias import nucleos_disponibles
+from ..utils.zonas import dividir_por_barrido, dividir_por_kmeans, zonas_vecinas
+from .busqueda_local import mejorar_resultados
+from .registro import ALGORITMOS, obtener_algoritmo
+
+CLIENTES_POR_ZONA = 150
+ALGORITMO_ZONAS = "clarke_wright"
+METODO_ZONAS = "kmeans"
+METODOS_ZONAS = {"barrido": dividir_por_barrido, "kmeans": dividir_por_kmeans}
+# Tope de la búsqueda local sobre las rutas de cada par de zonas vecinas
+TIEMPO_REPARACION_PAR = 0.5
+
+
+def repartir_flota(demandas: List[float], vehiculos: List[Dict]) -> List[List[Dict]]:
+    """Reparte los vehículos entre las zonas según su demanda
+
+    Cada zona recibe primero un vehículo (la de más demanda, el más
+    grande) y después cada vehículo restante va a la zona con más demanda
+    todavía sin cubrir.
+    """
+    ordenados = sorted(vehiculos, key=lambda x: x["capacidad"], reverse=True)
+    flotas = [[] for _ in demandas]
+    faltante = list(demandas)
+    por_demanda = sorted(range(len(demandas)), key=lambda z: -demandas[z])
+    for z, vehiculo in zip(por_demanda, ordenados):
+        flotas[z].append(vehiculo)
+        faltante[z] -= vehiculo["capacidad"]
+    for vehiculo in ordenados[len(demandas):]:
+        z = max(range(len(demandas)), key=faltante.__getitem__)
+        flotas[z].append(vehiculo)
+        faltante[z] -= vehiculo["capacidad"]
+    return flotas
+
+
+class Descomposicion:
+    """Agrupar primero, rutear después
+
+    Los clientes se dividen en zonas de unos CLIENTES_POR_ZONA clientes
+    (barrido polar alrededor del depósito o k-means balanceado por
+    demanda) y la flota se reparte entre ellas. Cada zona se resuelve por
+    separado con cualquier algoritmo registrado, en un pool de procesos
+    si hay varios núcleos. Al final, la búsqueda local trabaja sobre las
+    rutas de cada par de zonas vecinas para corregir lo que el corte dejó
+    mal repartido entre ellas.
+
+    Como el tamaño de las zonas es fijo, el tiempo crece aproximadamente
+    en forma lineal con la cantidad de clientes.
+    """
+
+    def __init__(
+        self,
+        grafo: Dict,
+        algoritmo: str = ALGORITMO_ZONAS,
+        metodo: str = METODO_ZONAS,
+        clientes_por_zona: int = CLIENTES_POR_ZONA,
+        trabajadores: Optional[int] = None,
+        opciones: Optional[Dict] = None,
+    ):
+        if algoritmo not in ALGORITMOS or algoritmo == "descomposicion":
+            raise ValueError(f"Algoritmo por zona no soportado: {algoritmo}")
+        if metodo not in METODOS_ZONAS:
+            raise ValueError(f"Método de división no soportado: {metodo}")
+        self.grafo = grafo
+        self.algoritmo = algoritmo
+        self.metodo = metodo
+        self.clientes_por_zona = max(1, clientes_por_zona)
+        self.trabajadores = trabajadores
+        self.opciones = dict(opciones or {})
+        self.trabajadores_usados = 1
+        self.estadisticas = {}
+
+    def resolver_zonas(
+        self, clientes_zonas: List[List[Dict]], flotas: List[List[Dict]]
+    ) -> List[Dict]:
+        """Resultados del algoritmo en cada zona, en el mismo orden
+
+        Un ``tiempo_limite`` en las opciones es para todas las zonas: cada
+        una recibe tiempo_limite * trabajadores / zonas.
+        """
+        trabajadores = self.trabajadores or nucleos_disponibles()
+        trabajadores = max(1, min(trabajadores, len(clientes_zonas)))
+        self.trabajadores_usados = trabajadores
+
+        opciones = dict(self.opciones)
+        if "tiempo_limite" in opciones:
+            opciones["tiempo_limite"] = (
+                float(opciones["tiempo_limite"]) * trabajadores / len(clientes_zonas)
+            )
+
+        if trabajadores == 1:
+            return [
+                _resolver_zona(self.algoritmo, clientes, flota, opciones)
+                for clientes, flota in zip(clientes_zonas, flotas)
+            ]
+
+        # Los núcleos ya están ocupados con las zonas
+        opciones["trabajadores"] = 1
+        with ProcessPoolExecutor(max_workers=trabajadores) as pool:
+            futuros = [
+                pool.submit(_resolver_zona, self.algoritmo, clientes, flota, opciones)
+                for clientes, flota in zip(clientes_zonas, flotas)
+            ]
+            return [futuro.result() for futuro in futuros]
+
+    def reparar_fronteras(
+        self, rutas_zonas: List[List[Dict]], pares: List[Tuple[int, int]]
+    ) -> Dict:
+        """Búsqueda local sobre las rutas de cada par de zonas vecinas
+
+        Actualiza ``rutas_zonas`` en el lugar (las rutas que quedan vacías
+        se quitan) y devuelve la distancia ahorrada y los movimientos.
+        """
+        mejora, movimientos = 0.0, 0
+        for a, b in pares:
+            par = {"rutas": rutas_zonas[a] + rutas_zonas[b], "metricas": {}}
+            if not par["rutas"]:
+                continue
+            mejorar_resultados(par, tiempo_limite=TIEMPO_REPARACION_PAR)
+            busqueda = par["metricas"]["busqueda_local"]
+            mejora += busqueda["mejora"]
+            movimientos += busqueda["movimientos_aplicados"]
+            rutas_zonas[a] = [ruta for ruta in par["rutas"] if ruta["zona"] == a]
+            rutas_zonas[b] = [ruta for ruta in par["rutas"] if ruta["zona"] == b]
+        return {
+            "pares_reparados": len(pares),
+            "mejora_reparacion": mejora,
+            "movimientos_reparacion": movimientos,
+        }
+
+    def optimizar_rutas(self, clientes: List[Dict], vehiculos: List[Dict]) -> Dict:
+        """Método principal para optimizar rutas por zonas"""
+        tiempo_inicio = time.time()
+
+        try:
+            # Dividir en zonas, a lo sumo una por vehículo disponible
+            disponibles = [v for v in vehiculos if v["disponible"]]
+            num_zonas = math.ceil(len(clientes) / self.clientes_por_zona)
+            num_zonas = max(1, min(num_zonas, len(disponibles)))
+            zonas = METODOS_ZONAS[self.metodo](clientes, num_zonas)
+            clientes_zonas = [[clientes[p] for p in zona] for zona in zonas]
+            flotas = repartir_flota(
+                [sum(c["pedido"] for c in zona) for zona in clientes_zonas],
+                disponibles,
+            )
+            tiempo_division = time.time() - tiempo_inicio
+
+            # Resolver cada zona
+            inicio_zonas = time.time()
+            resultados_zonas = self.resolver_zonas(clientes_zonas, flotas)
+            tiempo_zonas = time.time() - inicio_zonas
+
+            rutas_zonas = []
+            detalle_zonas = []
+            for z, resultado in enumerate(resultados_zonas):
+                rutas = [] if resultado.get("error") else resultado.get("rutas", [])
+                for ruta in rutas:
+                    ruta["zona"] = z
+                rutas_zonas.append(rutas)
+                detalle_zonas.append(
+                    {
+                        "zona": z,
+                        "clientes": len(clientes_zonas[z]),
+                        "demanda": sum(c["pedido"] for c in clientes_zonas[z]),
+                        "vehiculos": len(flotas[z]),
+                        "rutas": len(rutas),
+                        "tiempo_ejecucion": resultado.get("tiempo_ejecucion", 0),
+                        "error": resultado.get("error"),
+                    }
+                )
+
+            # Reparar las fronteras entre zonas vecinas (la búsqueda local no
+            # respeta ventanas de tiempo)
+            inicio_reparacion = time.time()
+            ventanas = any(r.get("ventanas_horarias") for r in resultados_zonas)
+            pares = [] if ventanas else zonas_vecinas(clientes, zonas)
+            reparacion = self.reparar_fronteras(rutas_zonas, pares)
+            tiempo_reparacion = time.time() - inicio_reparacion
+
+            rutas = [ruta for rutas in rutas_zonas for ruta in rutas]
+            atendidos = {c["id"] for ruta in rutas for c in ruta["clientes"]}
+            clientes_no_asignados = [
+                c["id"] for c in clientes if c["id"] not in atendidos
+            ]
+
+            # Calcular métricas
+            distancia_total = sum(ruta["distancia_total"] for ruta in rutas)
+            tiempo_total = sum(ruta["tiempo_estimado"] for ruta in rutas)
+            clientes_atendidos = sum(len(ruta["clientes"]) for ruta in rutas)
+            vehiculos_utilizados = len(rutas)
+
+            self.estadisticas = {
+                "metodo": self.metodo,
+                "algoritmo_zonas": self.algoritmo,
+                "zonas": len(zonas),
+                "trabajadores": self.trabajadores_usados,
+                "tiempo_division": tiempo_division,
+                "tiempo_zonas": tiempo_zonas,
+                "tiempo_reparacion": tiempo_reparacion,
+                **reparacion,
+            }
+
+            tiempo_ejecucion = time.time() - tiempo_inicio
+
+            resultados = {
+                "algoritmo": f"Descomposición por Zonas ({self.algoritmo})",
+                "tiempo_ejecucion": tiempo_ejecucion,
+                "rutas": rutas,
+                "metricas": {
+                    "distancia_total": distancia_total,
+                    "tiempo_total": tiempo_total,
+                    "clientes_atendidos": clientes_atendidos,
+                    "vehiculos_utilizados": vehiculos_utilizados,
+                    "eficiencia": clientes_atendidos / max(vehiculos_utilizados, 1),
+                },
+                "clientes_no_asignados": clientes_no_asignados,
+                "zonas": detalle_zonas,
+                "estadisticas_descomposicion": self.estadisticas,
+            }
+            if ventanas:
+                resultados["ventanas_horarias"] = True
+
+            return resultados
+
+        except Exception as e:
+            return {
+                "algoritmo": "Descomposición por Zonas",
+                "error": str(e),
+                "tiempo_ejecucion": time.time() - tiempo_inicio,
+            }
+
+
+def _resolver_zona(
+    algoritmo: str, clientes: List[Dict], vehiculos: List[Dict], opciones: Dict
+) -> Dict:
+    resultados = obtener_algoritmo(algoritmo)(clientes, vehiculos, **opciones)
+    # La matriz de la zona no hace falta fuera de este proceso
+    resultados.pop("matriz_distancias", None)
+    return resultados
+
+
+def optimizar_rutas_descomposicion(clientes: List[Dict], vehiculos: List[Dict], **kwargs) -> Dict:
+    """
+    Función principal para optimizar rutas dividiendo los clientes en zonas
+
+    Args:
+        clientes: Lista de clientes con sus coordenadas y pedidos
+        vehiculos: Lista de vehículos con sus capacidades
+        **kwargs: algoritmo (el de cada zona), metodo ("barrido" o "kmeans"),
+            clientes_por_zona y trabajadores; el resto se pasa al algoritmo
+            de cada zona
+
+    Returns:
+        Dict con los resultados de la optimización
+    """
+    try:
+        # Crear instancia del algoritmo
+        claves = ("algoritmo", "metodo", "clientes_por_zona", "trabajadores")
+        propias = {clave: kwargs[clave] for clave in claves if clave in kwargs}
+        opciones = {
+            clave: valor for clave, valor in kwargs.items() if clave not in claves
+        }
+        descomposicion = Descomposicion({}, opciones=opciones, **propias)
+
+        # Ejecutar optimización directamente
+        resultados = descomposicion.optimizar_rutas(clientes, vehiculos)
+
+        # Agregar información básica
+        resultados["fecha_ejecucion"] = time.time()
+
+        return resultados
+
+    except Exception as e:
+        return {
+            "algoritmo": "Descomposición por Zonas",
+            "error": f"Error en optimización: {str(e)}",
+            "tiempo_ejecucion": 0,
+            "fecha_ejecucion": time.time()
+        }
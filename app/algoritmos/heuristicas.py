@@ -0,0 +1,58 @@
+import time
+from typing import List, Optional
+
+import numpy as np
+
+
+def costo_recorrido(pesos: np.ndarray, orden: List[int]) -> float:
+    """Calcula el costo de salir del depósito (posición 0), visitar ``orden`` y volver"""
+    recorrido = [0] + list(orden) + [0]
+    return float(pesos[recorrido[:-1], recorrido[1:]].sum())
+
+
+def vecino_mas_cercano(pesos: np.ndarray) -> List[int]:
+    """Construye un recorrido desde el depósito yendo siempre al nodo no visitado más cercano"""
+    n = len(pesos)
+    pendientes = np.ones(n, dtype=bool)
+    pendientes[0] = False
+    orden = []
+    actual = 0
+    for _ in range(n - 1):
+        fila = np.where(pendientes, pesos[actual], np.inf)
+        actual = int(np.argmin(fila))
+        pendientes[actual] = False
+        orden.append(actual)
+    return orden
+
+
+def dos_opt(
+    pesos: np.ndarray, orden: List[int], tiempo_limite: Optional[float] = None
+) -> List[int]:
+    """Mejora un recorrido con movimientos 2-opt hasta que ninguno lo acorte.
+
+    Para cada arista (a, b) se evalúan a la vez, con NumPy, todas las
+    aristas (c, d) posteriores y se aplica la inversión que más ahorra.
+    Supone distancias simétricas. ``tiempo_limite`` (segundos) corta la
+    búsqueda y devuelve el mejor recorrido encontrado hasta ese momento.
+    """
+    recorrido = np.array([0] + list(orden) + [0], dtype=np.int64)
+    n = len(recorrido)
+    inicio = time.time()
+
+    mejoro = True
+    while mejoro:
+        mejoro = False
+        for i in range(n - 3):
+            if tiempo_limite is not None and time.time() - inicio > tiempo_limite:
+                return recorrido[1:-1].tolist()
+            a, b = recorrido[i], recorrido[i + 1]
+            c = recorrido[i + 2 : n - 1]
+            d = recorrido[i + 3 : n]
+            ahorro = pesos[a, b] + pesos[c, d] - pesos[a, c] - pesos[b, d]
+            mejor = int(np.argmax(ahorro))
+            if ahorro[mejor] > 1e-9:
+                j = i + 2 + mejor
+                recorrido[i + 1 : j + 1] = recorrido[i + 1 : j + 1][::-1].copy()
+                mejoro = True
+
+    return recorrido[1:-1].tolist()
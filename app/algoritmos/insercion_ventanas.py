@@ -0,0 +1,384 @@
+import heapq
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from ..utils.calculos_comunes import DEPOSITO, construir_matriz_distancias
+from ..utils.vecinos_cercanos import obtener_vecinos_cercanos
+
+# Vecinos cuyas aristas se prueban antes de recorrer todas las rutas
+K_VECINOS_INSERCION = 10
+MINUTOS_POR_KM = 2  # estimación
+TIEMPO_MAXIMO_RUTA = 480  # 8 horas
+# Ventana de los clientes que no la tienen y horario del depósito
+VENTANA_POR_DEFECTO = ("08:00", "18:00")
+VENTANA_DEPOSITO = ("00:00", "23:59")
+
+
+def a_minutos(hora: str) -> int:
+    """Convierte "HH:MM" a minutos desde la medianoche"""
+    horas, minutos = hora.split(":")
+    return int(horas) * 60 + int(minutos)
+
+
+def a_hora(minutos: float) -> str:
+    """Convierte minutos desde la medianoche a "HH:MM" """
+    minutos = int(round(minutos))
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+class InsercionVentanas:
+    """Inserción más barata con ventanas de tiempo
+
+    Cada ruta guarda, por cliente, el inicio de servicio más temprano
+    (``inicio``) y el más tardío que todavía deja cumplir el resto de la
+    ruta (``tarde``); su diferencia es la holgura hacia adelante. Insertar
+    u entre i y j es factible si u empieza dentro de su ventana y j no
+    tiene que empezar después de ``tarde[j]``: se verifica en O(1) sin
+    volver a simular la ruta. Solo al insertar se recalculan los horarios
+    de esa ruta, en O(largo de la ruta).
+
+    Las posiciones candidatas de un cliente son las aristas junto a sus k
+    vecinos más cercanos ya ruteados y abrir el siguiente vehículo libre;
+    si ninguna es factible se revisan todas las rutas. Los clientes se
+    insertan por prioridad y, dentro de cada prioridad, el de inserción
+    más barata primero (montículo con entradas invalidadas de forma
+    perezosa).
+
+    Cada vehículo sale del depósito cuando se abre su ruta, justo a tiempo
+    para su primer cliente, y debe volver antes de TIEMPO_MAXIMO_RUTA.
+    """
+
+    def __init__(self, grafo: Dict, k_vecinos: int = K_VECINOS_INSERCION):
+        self.grafo = grafo
+        self.k_vecinos = k_vecinos
+        self.clientes_no_asignados = []
+        self.estadisticas = {
+            "evaluaciones": 0,
+            "inserciones": 0,
+            "rutas_abiertas": 0,
+            "recalculos": 0,
+            "busquedas_completas": 0,
+        }
+
+    def _viaje(self, i: int, j: int) -> float:
+        return self.pesos[i, j] * MINUTOS_POR_KM
+
+    def _preparar(
+        self,
+        clientes: List[Dict],
+        vehiculos: List[Dict],
+        pesos: np.ndarray,
+        vecinos: Optional[np.ndarray],
+    ):
+        n = len(clientes) + 1
+        self.pesos = pesos
+        self.vecinos = vecinos
+        self.vehiculos = vehiculos
+        self.demandas = [0.0] + [c["pedido"] for c in clientes]
+        apertura, cierre = (a_minutos(h) for h in VENTANA_DEPOSITO)
+        self.apertura, self.cierre = apertura, cierre
+        self.temprano = [apertura]
+        self.tardio = [cierre]
+        for cliente in clientes:
+            inicio = a_minutos(cliente.get("ventana_inicio") or VENTANA_POR_DEFECTO[0])
+            fin = a_minutos(cliente.get("ventana_fin") or VENTANA_POR_DEFECTO[1])
+            if fin < inicio:
+                fin += 24 * 60
+            self.temprano.append(inicio)
+            self.tardio.append(fin)
+
+        self.rutas: List[List[int]] = []
+        self.salida: List[float] = []
+        self.limite: List[float] = []
+        self.regreso: List[float] = []
+        self.carga: List[float] = []
+        self.version: List[int] = []
+        self.ruta_de = [-1] * n
+        self.indice_en = [-1] * n
+        self.inicio = [0.0] * n
+        self.tarde = [0.0] * n
+
+        # Clientes que tienen a cada nodo entre sus vecinos cercanos
+        self.cercanos_de = [[] for _ in range(n)]
+        if vecinos is not None:
+            for u in range(1, n):
+                for w in vecinos[u].tolist():
+                    if w:
+                        self.cercanos_de[w].append(u)
+
+    def _recalcular(self, r: int):
+        """Horarios temprano y tardío de la ruta r"""
+        ruta = self.rutas[r]
+        for i, cliente in enumerate(ruta):
+            self.ruta_de[cliente] = r
+            self.indice_en[cliente] = i
+
+        t = self.salida[r]
+        anterior = 0
+        for cliente in ruta:
+            t = max(t + self._viaje(anterior, cliente), self.temprano[cliente])
+            self.inicio[cliente] = t
+            anterior = cliente
+        self.regreso[r] = t + self._viaje(anterior, 0)
+
+        t = self.limite[r]
+        siguiente = 0
+        for cliente in reversed(ruta):
+            t = min(self.tardio[cliente], t - self._viaje(cliente, siguiente))
+            self.tarde[cliente] = t
+            siguiente = cliente
+        self.version[r] += 1
+        self.estadisticas["recalculos"] += 1
+
+    def _costo_posicion(self, u: int, r: int, p: int) -> Optional[float]:
+        """Costo de insertar u en la posición p de la ruta r; None si no es factible"""
+        self.estadisticas["evaluaciones"] += 1
+        if self.carga[r] + self.demandas[u] > self.vehiculos[r]["capacidad"]:
+            return None
+        ruta = self.rutas[r]
+        i = ruta[p - 1] if p > 0 else 0
+        j = ruta[p] if p < len(ruta) else 0
+
+        salida_i = self.inicio[i] if i else self.salida[r]
+        inicio_u = max(salida_i + self._viaje(i, u), self.temprano[u])
+        if inicio_u > self.tardio[u]:
+            return None
+        llegada_j = inicio_u + self._viaje(u, j)
+        if j:
+            if max(llegada_j, self.temprano[j]) > self.tarde[j]:
+                return None
+        elif llegada_j > self.limite[r]:
+            return None
+        return float(self.pesos[i, u] + self.pesos[u, j] - self.pesos[i, j])
+
+    def _costo_abrir(self, u: int) -> Optional[Tuple[float, float]]:
+        """Costo y hora de salida de una ruta nueva solo con u"""
+        r = len(self.rutas)
+        if r >= len(self.vehiculos):
+            return None
+        if self.demandas[u] > self.vehiculos[r]["capacidad"]:
+            return None
+        self.estadisticas["evaluaciones"] += 1
+        ida = self._viaje(0, u)
+        # Salida en minuto entero, justo a tiempo para la ventana de u
+        salida = max(self.apertura, math.floor(self.temprano[u] - ida))
+        inicio_u = salida + ida
+        regreso = inicio_u + self._viaje(u, 0)
+        if inicio_u > self.tardio[u] or regreso > min(
+            salida + TIEMPO_MAXIMO_RUTA, self.cierre
+        ):
+            return None
+        return 2 * float(self.pesos[0, u]), salida
+
+    def _mejor_insercion(self, u: int) -> Optional[Tuple[float, int, int]]:
+        """Mejor (costo, ruta, posición) para u; ruta nueva si la ruta es len(rutas)"""
+        mejor = None
+        if self.vecinos is not None:
+            for w in self.vecinos[u].tolist():
+                r = self.ruta_de[w] if w else -1
+                if r < 0:
+                    continue
+                q = self.indice_en[w]
+                for p in (q, q + 1):
+                    costo = self._costo_posicion(u, r, p)
+                    if costo is not None and (mejor is None or costo < mejor[0]):
+                        mejor = (costo, r, p)
+
+        abrir = self._costo_abrir(u)
+        if abrir is not None and (mejor is None or abrir[0] < mejor[0]):
+            mejor = (abrir[0], len(self.rutas), 0)
+
+        if mejor is None and self.rutas:
+            self.estadisticas["busquedas_completas"] += 1
+            for r, ruta in enumerate(self.rutas):
+                for p in range(len(ruta) + 1):
+                    costo = self._costo_posicion(u, r, p)
+                    if costo is not None and (mejor is None or costo < mejor[0]):
+                        mejor = (costo, r, p)
+        return mejor
+
+    def _insertar(self, u: int, r: int, p: int):
+        if r == len(self.rutas):
+            _, salida = self._costo_abrir(u)
+            self.rutas.append([])
+            self.salida.append(salida)
+            self.limite.append(min(salida + TIEMPO_MAXIMO_RUTA, self.cierre))
+            self.regreso.append(salida)
+            self.carga.append(0.0)
+            self.version.append(0)
+            self.estadisticas["rutas_abiertas"] += 1
+        self.rutas[r].insert(p, u)
+        self.carga[r] += self.demandas[u]
+        self._recalcular(r)
+        self.estadisticas["inserciones"] += 1
+
+    def construir_rutas(
+        self,
+        clientes: List[Dict],
+        vehiculos: List[Dict],
+        pesos: np.ndarray,
+        vecinos: Optional[np.ndarray] = None,
+    ) -> List[List[int]]:
+        """Inserta los clientes (posiciones 1..n en ``pesos``) en rutas
+
+        Una ruta por vehículo: ``vehiculos`` se usan en orden y cada ruta
+        nueva toma el siguiente.
+        Devuelve las rutas; los clientes sin inserción factible quedan
+        fuera.
+        """
+        self._preparar(clientes, vehiculos, pesos, vecinos)
+        pendientes = set(range(1, len(clientes) + 1))
+        prioridad = [0] + [c["prioridad"] for c in clientes]
+        # Entrada vigente de cada cliente: (versión de la ruta, cantidad de rutas)
+        vigente = {}
+        monticulo = []
+
+        def evaluar(u: int):
+            mejor = self._mejor_insercion(u)
+            if mejor is None:
+                vigente.pop(u, None)
+                return
+            costo, r, p = mejor
+            version = self.version[r] if r < len(self.rutas) else -1
+            vigente[u] = (r, p, version, len(self.rutas))
+            heapq.heappush(monticulo, (prioridad[u], costo, u, vigente[u]))
+
+        for u in sorted(pendientes):
+            evaluar(u)
+
+        while monticulo:
+            _, _, u, entrada = heapq.heappop(monticulo)
+            if u not in pendientes or vigente.get(u) != entrada:
+                continue
+            r, p, version, rutas_abiertas = entrada
+            # La ruta cambió (o se abrió otra) desde que se evaluó: reevaluar
+            actual = self.version[r] if r < len(self.rutas) else -1
+            if actual != version or rutas_abiertas != len(self.rutas):
+                evaluar(u)
+                continue
+
+            self._insertar(u, r, p)
+            pendientes.discard(u)
+            vigente.pop(u, None)
+            # Nuevas aristas junto a u: sus vecinos pueden insertarse más barato
+            for c in self.cercanos_de[u]:
+                if c in pendientes:
+                    evaluar(c)
+
+        self.clientes_no_asignados.extend(
+            clientes[u - 1]["id"] for u in sorted(pendientes)
+        )
+        return self.rutas
+
+    def optimizar_rutas(self, clientes: List[Dict], vehiculos: List[Dict]) -> Dict:
+        """Método principal para optimizar rutas con inserción y ventanas de tiempo"""
+        tiempo_inicio = time.time()
+
+        try:
+            # Construir matriz de distancias
+            matriz_distancias = construir_matriz_distancias(clientes)
+            nodos = ["deposito"] + [c["id"] for c in clientes]
+            pesos = np.asarray(matriz_distancias.submatriz(nodos), dtype=np.float64)
+
+            vecinos = obtener_vecinos_cercanos([DEPOSITO] + clientes, self.k_vecinos)
+            knn = vecinos.knn_indices if list(vecinos.ids) == nodos else None
+
+            vehiculos_ordenados = sorted(
+                (vehiculo for vehiculo in vehiculos if vehiculo["disponible"]),
+                key=lambda x: x["capacidad"],
+                reverse=True,
+            )
+            self.clientes_no_asignados = []
+            self.construir_rutas(clientes, vehiculos_ordenados, pesos, knn)
+
+            rutas = []
+            for r, ruta in enumerate(self.rutas):
+                vehiculo = vehiculos_ordenados[r]
+                clientes_ruta = [clientes[u - 1] for u in ruta]
+                recorrido = [0] + ruta + [0]
+                distancia_total = float(pesos[recorrido[:-1], recorrido[1:]].sum())
+                rutas.append(
+                    {
+                        "vehiculo_id": vehiculo["id"],
+                        "placa": vehiculo["placa"],
+                        "capacidad": vehiculo["capacidad"],
+                        "clientes": clientes_ruta,
+                        "distancia_total": distancia_total,
+                        "carga_total": self.carga[r],
+                        "tiempo_estimado": self.regreso[r] - self.salida[r],
+                        "orden_visita": ["deposito"]
+                        + [c["id"] for c in clientes_ruta]
+                        + ["deposito"],
+                        "hora_salida": a_hora(self.salida[r]),
+                        "hora_regreso": a_hora(self.regreso[r]),
+                        "horarios": [a_hora(self.inicio[u]) for u in ruta],
+                    }
+                )
+
+            # Calcular métricas
+            distancia_total = sum(ruta["distancia_total"] for ruta in rutas)
+            tiempo_total = sum(ruta["tiempo_estimado"] for ruta in rutas)
+            clientes_atendidos = sum(len(ruta["clientes"]) for ruta in rutas)
+            vehiculos_utilizados = len(rutas)
+
+            tiempo_ejecucion = time.time() - tiempo_inicio
+
+            resultados = {
+                "algoritmo": "Inserción con Ventanas de Tiempo",
+                "tiempo_ejecucion": tiempo_ejecucion,
+                "rutas": rutas,
+                "metricas": {
+                    "distancia_total": distancia_total,
+                    "tiempo_total": tiempo_total,
+                    "clientes_atendidos": clientes_atendidos,
+                    "vehiculos_utilizados": vehiculos_utilizados,
+                    "eficiencia": clientes_atendidos / max(vehiculos_utilizados, 1),
+                },
+                "clientes_no_asignados": self.clientes_no_asignados,
+                "estadisticas_insercion": self.estadisticas,
+                "ventanas_horarias": True,
+            }
+
+            return resultados
+
+        except Exception as e:
+            return {
+                "algoritmo": "Inserción con Ventanas de Tiempo",
+                "error": str(e),
+                "tiempo_ejecucion": time.time() - tiempo_inicio,
+            }
+
+
+def optimizar_rutas_insercion_ventanas(clientes: List[Dict], vehiculos: List[Dict], **kwargs) -> Dict:
+    """
+    Función principal para optimizar rutas por inserción respetando ventanas de tiempo
+
+    Args:
+        clientes: Lista de clientes con sus coordenadas, pedidos y ventanas horarias
+        vehiculos: Lista de vehículos con sus capacidades
+        **kwargs: k_vecinos (el resto se ignora)
+
+    Returns:
+        Dict con los resultados de la optimización
+    """
+    try:
+        # Crear instancia del algoritmo
+        opciones = {clave: kwargs[clave] for clave in ("k_vecinos",) if clave in kwargs}
+        insercion = InsercionVentanas({}, **opciones)
+
+        # Ejecutar optimización directamente
+        resultados = insercion.optimizar_rutas(clientes, vehiculos)
+
+        # Agregar información básica
+        resultados["fecha_ejecucion"] = time.time()
+
+        return resultados
+
+    except Exception as e:
+        return {
+            "algoritmo": "Inserción con Ventanas de Tiempo",
+            "error": f"Error en optimización: {str(e)}",
+            "tiempo_ejecucion": 0,
+            "fecha_ejecucion": time.time()
+        }
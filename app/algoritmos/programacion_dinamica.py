@@ -1,100 +1,225 @@
-import math
 import time
-from typing import Dict, List, Tuple, Optional
-from itertools import combinations
+from collections import deque
+from typing import Dict, List, Tuple
+import numpy as np
 from ..utils.calculos_comunes import calcular_distancia, construir_matriz_distancias
+from ..utils.matriz_distancias import MatrizDistancias
+from .heuristicas import costo_recorrido, dos_opt, vecino_mas_cercano
+
+# Con 21 clientes las tablas ocupan ~220 MB (2^21 x 21 costos float32 + padres int8)
+MAX_CLIENTES_HELD_KARP = 21
+# Tamaños de grupo por método: exacto, ventana restringida y heurística
+MAX_CLIENTES_EXACTO = 12
+MAX_CLIENTES_VENTANA = 400
+TAM_VENTANA = 6
+MINUTOS_POR_KM = 2  # estimación
+TIEMPO_MAXIMO_RUTA = 480  # 8 horas
 
 
 class ProgramacionDinamica:
     """Implementación de Programación Dinámica para optimización de rutas"""
 
-    def __init__(self, grafo: Dict):
+    def __init__(
+        self,
+        grafo: Dict,
+        max_clientes_exacto: int = MAX_CLIENTES_EXACTO,
+        max_clientes_ventana: int = MAX_CLIENTES_VENTANA,
+        tam_ventana: int = TAM_VENTANA,
+    ):
         self.grafo = grafo
         self.memo = {}
         self.caminos = {}
+        self.clientes_no_asignados = []
+        # Límites de tamaño de grupo para elegir el método de cada ruta
+        self.max_clientes_exacto = min(max_clientes_exacto, MAX_CLIENTES_HELD_KARP)
+        self.max_clientes_ventana = max_clientes_ventana
+        self.tam_ventana = tam_ventana
+
+    def _submatriz(
+        self, matriz_distancias: MatrizDistancias, nodos: List, crudo: bool = False
+    ) -> np.ndarray:
+        """Extrae las distancias entre ``nodos`` (en ese orden) como arreglo"""
+        if isinstance(matriz_distancias, MatrizDistancias):
+            return matriz_distancias.submatriz(nodos, crudo=crudo)
+        return np.array(
+            [[matriz_distancias[u][v] for v in nodos] for u in nodos],
+            dtype=np.float64,
+        )
 
     def tsp_programacion_dinamica(
-        self, matriz_distancias: Dict, clientes: List[Dict]
+        self, matriz_distancias: MatrizDistancias, clientes: List[Dict]
     ) -> Tuple[float, List[str]]:
-        """Resuelve el TSP usando Programación Dinámica"""
-        n = len(clientes) + 1  # +1 por el depósito
+        """Resuelve el TSP usando Programación Dinámica (Held-Karp con máscaras)
+
+        costos[mascara, j] es el costo mínimo de salir del depósito, visitar
+        los clientes de ``mascara`` y terminar en j; padres[mascara, j] guarda
+        el cliente anterior a j. Las tablas son arreglos de NumPy y cada capa
+        (máscaras con el mismo número de clientes) se calcula con operaciones
+        vectorizadas sobre todos los predecesores a la vez.
+        """
+        m = len(clientes)
         nodos = ["deposito"] + [cliente["id"] for cliente in clientes]
-
-        # Crear todas las combinaciones posibles de nodos
-        def generar_subconjuntos(n):
-            subconjuntos = []
-            for r in range(1, n + 1):
-                for combo in combinations(
-                    range(1, n), r
-                ):  # Excluir depósito (índice 0)
-                    subconjuntos.append(frozenset([0] + list(combo)))
-            return subconjuntos
-
-        subconjuntos = generar_subconjuntos(n - 1)
-
-        # Inicializar memoización
-        memo = {}
-        caminos = {}
-
-        # Caso base: desde depósito hasta depósito
-        memo[(frozenset([0]), 0)] = 0
-        caminos[(frozenset([0]), 0)] = [0]
-
-        # Llenar la tabla de memoización
-        for subconjunto in subconjuntos:
-            for j in subconjunto:
-                if (
-                    j == 0
-                ):  # No podemos terminar en el depósito si no hemos visitado otros nodos
+        if m == 0:
+            return 0.0, ["deposito", "deposito"]
+        if m > MAX_CLIENTES_HELD_KARP:
+            raise ValueError(
+                f"Held-Karp admite hasta {MAX_CLIENTES_HELD_KARP} clientes "
+                f"por ruta ({m} recibidos)"
+            )
+
+        pesos = self._submatriz(matriz_distancias, nodos, crudo=True)
+        escala = getattr(matriz_distancias, "escala", 1)
+
+        # Enteros (metros) en uint32; distancias en km en float32
+        if np.issubdtype(pesos.dtype, np.integer):
+            tipo_tabla = np.uint32
+            infinito = np.iinfo(np.uint32).max
+        else:
+            tipo_tabla = np.float32
+            infinito = np.inf
+        pesos = pesos.astype(np.float64)
+
+        total_mascaras = 1 << m
+        costos = np.full((total_mascaras, m), infinito, dtype=tipo_tabla)
+        padres = np.full((total_mascaras, m), -1, dtype=np.int8)
+
+        # Caso base: del depósito directo a cada cliente
+        unitarias = 1 << np.arange(m)
+        costos[unitarias, np.arange(m)] = pesos[0, 1:]
+
+        # Máscaras agrupadas por cantidad de clientes visitados
+        mascaras = np.arange(total_mascaras, dtype=np.int64)
+        cantidad = np.zeros(total_mascaras, dtype=np.int8)
+        for bit in range(m):
+            cantidad += ((mascaras >> bit) & 1).astype(np.int8)
+        orden = np.argsort(cantidad, kind="stable")
+        limites = np.searchsorted(cantidad[orden], np.arange(m + 2))
+
+        for tam in range(2, m + 1):
+            capa = orden[limites[tam] : limites[tam + 1]]
+            for j in range(m):
+                con_j = capa[(capa >> j) & 1 == 1]
+                anteriores = con_j ^ (1 << j)
+                # Costo de llegar a j desde cada posible último cliente k
+                candidatos = costos[anteriores].astype(np.float64) + pesos[1:, j + 1]
+                mejor = np.argmin(candidatos, axis=1)
+                # Los estados inalcanzables quedan en "infinito" también en uint32
+                costos[con_j, j] = np.minimum(
+                    candidatos[np.arange(len(con_j)), mejor], infinito
+                )
+                padres[con_j, j] = mejor
+
+        # Cerrar el ciclo volviendo al depósito
+        completa = total_mascaras - 1
+        finales = costos[completa].astype(np.float64) + pesos[1:, 0]
+        ultimo = int(np.argmin(finales))
+        costo_total = float(finales[ultimo]) / escala
+
+        # Reconstrucción siguiendo los punteros a padres
+        camino = []
+        mascara, j = completa, ultimo
+        while j >= 0:
+            camino.append(j + 1)
+            mascara, j = mascara ^ (1 << j), int(padres[mascara, j])
+        camino.reverse()
+
+        return costo_total, ["deposito"] + [nodos[i] for i in camino] + ["deposito"]
+
+    def tsp_ventana_restringida(
+        self, pesos: np.ndarray, orden: List[int], tam_ventana: int
+    ) -> Tuple[float, List[int]]:
+        """Mejora un recorrido con la DP de ventana restringida de Balas-Simonetti
+
+        Entre todos los recorridos en los que un nodo que está al menos
+        ``tam_ventana`` lugares después de otro en ``orden`` se sigue
+        visitando después, encuentra el más corto en tiempo lineal en n.
+        Un estado (f, T, o) indica que f es el primer nodo de ``orden`` sin
+        visitar, T la máscara de los visitados entre f+1 y f+k-1 y f+o el
+        último visitado (o = -1 con f = 0 es el depósito). ``pesos`` tiene el
+        depósito en la posición 0.
+        """
+        n = len(orden)
+        k = max(2, min(tam_ventana, n))
+        recorrido = np.array([0] + list(orden), dtype=np.int64)
+        pesos = pesos[np.ix_(recorrido, recorrido)].astype(np.float64)
+
+        total_mascaras = 1 << (k - 1)
+        desplazamientos = np.arange(-k, k)
+        costos = np.full((n + 1, total_mascaras, 2 * k), np.inf)
+        padres = np.full((n + 1, total_mascaras, 2 * k), -1, dtype=np.int64)
+        costos[0, 0, k - 1] = 0.0
+
+        mascaras = np.arange(total_mascaras)
+        cantidad = np.zeros(total_mascaras, dtype=np.int64)
+        unos_finales = np.zeros(total_mascaras, dtype=np.int64)
+        for bit in range(k - 1):
+            cantidad += (mascaras >> bit) & 1
+        for t in range(k - 1):
+            unos_finales += (mascaras & ((2 << t) - 1)) == (2 << t) - 1
+        capas = [mascaras[cantidad == c] for c in range(k)]
+
+        def estado(f, mascara, o_indice):
+            return (f * total_mascaras + mascara) * 2 * k + o_indice
+
+        for f in range(n):
+            # Fila de pesos del último nodo visitado (+1 por el depósito)
+            ultimos = np.clip(f + desplazamientos, -1, n - 1) + 1
+            for capa in capas:
+                actuales = costos[f, capa]
+                if not np.isfinite(actuales).any():
                     continue
 
-                # Encontrar el costo mínimo para llegar a j visitando todos los nodos en subconjunto
-                min_costo = float("inf")
-                mejor_predecesor = None
-
-                for k in subconjunto:
-                    if k != j:
-                        subconjunto_sin_j = frozenset(
-                            [x for x in subconjunto if x != j]
-                        )
-                        if (subconjunto_sin_j, k) in memo:
-                            costo = (
-                                memo[(subconjunto_sin_j, k)]
-                                + matriz_distancias[nodos[k]][nodos[j]]
-                            )
-                            if costo < min_costo:
-                                min_costo = costo
-                                mejor_predecesor = k
-
-                if min_costo != float("inf"):
-                    memo[(subconjunto, j)] = min_costo
-                    if mejor_predecesor is not None:
-                        caminos[(subconjunto, j)] = caminos[
-                            (
-                                frozenset([x for x in subconjunto if x != j]),
-                                mejor_predecesor,
-                            )
-                        ] + [j]
-
-        # Encontrar el camino mínimo que regresa al depósito
-        todos_nodos = frozenset(range(n))
-        min_costo_final = float("inf")
-        mejor_ultimo_nodo = None
-
-        for j in range(1, n):  # Probar terminar en cada nodo (excepto depósito)
-            if (todos_nodos, j) in memo:
-                costo_final = (
-                    memo[(todos_nodos, j)] + matriz_distancias[nodos[j]][nodos[0]]
+                # Visitar f + d (d >= 1): se marca su bit y f no cambia
+                for d in range(1, k):
+                    if f + d >= n:
+                        break
+                    libres = (capa >> (d - 1)) & 1 == 0
+                    origen = capa[libres]
+                    candidatos = actuales[libres] + pesos[ultimos, f + d + 1]
+                    mejor = np.argmin(candidatos, axis=1)
+                    valores = candidatos[np.arange(len(origen)), mejor]
+                    destino = origen | (1 << (d - 1))
+                    mejora = valores < costos[f, destino, d + k]
+                    costos[f, destino[mejora], d + k] = valores[mejora]
+                    padres[f, destino[mejora], d + k] = estado(
+                        f, origen[mejora], mejor[mejora]
+                    )
+
+                # Visitar f: el primer pendiente avanza tras los ya visitados
+                candidatos = actuales + pesos[ultimos, f + 1]
+                mejor = np.argmin(candidatos, axis=1)
+                valores = candidatos[np.arange(len(capa)), mejor]
+                saltos = unos_finales[capa] + 1
+                siguiente = f + saltos
+                validos = siguiente <= n
+                destino_f = siguiente[validos]
+                destino_t = capa[validos] >> saltos[validos]
+                destino_o = k - saltos[validos]
+                mejora = valores[validos] < costos[destino_f, destino_t, destino_o]
+                costos[destino_f[mejora], destino_t[mejora], destino_o[mejora]] = (
+                    valores[validos][mejora]
+                )
+                padres[destino_f[mejora], destino_t[mejora], destino_o[mejora]] = (
+                    estado(f, capa[validos][mejora], mejor[validos][mejora])
                 )
-                if costo_final < min_costo_final:
-                    min_costo_final = costo_final
-                    mejor_ultimo_nodo = j
 
-        if mejor_ultimo_nodo is not None:
-            camino_completo = caminos[(todos_nodos, mejor_ultimo_nodo)] + [0]
-            return min_costo_final, [nodos[i] for i in camino_completo]
-        else:
-            return float("inf"), []
+        # Volver al depósito desde el último nodo
+        ultimos = np.clip(n + desplazamientos, -1, n - 1) + 1
+        finales = costos[n, 0] + pesos[ultimos, 0]
+        o_final = int(np.argmin(finales))
+        costo_total = float(finales[o_final])
+
+        # Reconstrucción: el último visitado de cada estado es f + o
+        camino = []
+        actual = estado(n, 0, o_final)
+        while actual != estado(0, 0, k - 1):
+            f, resto = divmod(actual, total_mascaras * 2 * k)
+            o_indice = resto % (2 * k)
+            camino.append(orden[f + o_indice - k])
+            actual = int(padres.flat[actual])
+        camino.reverse()
+
+        return costo_total, camino
 
     def dividir_clientes_por_prioridad(
         self, clientes: List[Dict]
@@ -109,59 +234,242 @@ class ProgramacionDinamica:
         return clientes_por_prioridad
 
     def optimizar_ruta_por_prioridad(
-        self, clientes_grupo: List[Dict], matriz_distancias: Dict
+        self, clientes_grupo: List[Dict], matriz_distancias: MatrizDistancias
     ) -> Dict:
-        """Optimiza la ruta para un grupo de clientes de la misma prioridad"""
-        if len(clientes_grupo) <= 1:
+        """Optimiza la ruta para un grupo de clientes de la misma prioridad
+
+        El método depende del tamaño del grupo: Held-Karp exacto hasta
+        ``max_clientes_exacto`` clientes, DP de ventana restringida sobre un
+        recorrido inicial hasta ``max_clientes_ventana`` y, por encima,
+        vecino más cercano mejorado con 2-opt.
+        """
+        if not clientes_grupo:
             return {
                 "distancia_total": 0,
                 "clientes": clientes_grupo,
-                "orden_visita": [cliente["id"] for cliente in clientes_grupo],
+                "orden_visita": [],
+                "metodo": "vacio",
+                "tiempo_metodo": 0,
             }
 
-        # Resolver TSP para este grupo
-        distancia_total, orden_visita = self.tsp_programacion_dinamica(
-            matriz_distancias, clientes_grupo
-        )
+        inicio = time.time()
+        if len(clientes_grupo) <= self.max_clientes_exacto:
+            metodo = "held_karp"
+            distancia_total, orden_visita = self.tsp_programacion_dinamica(
+                matriz_distancias, clientes_grupo
+            )
+        else:
+            nodos = ["deposito"] + [cliente["id"] for cliente in clientes_grupo]
+            pesos = self._submatriz(matriz_distancias, nodos).astype(np.float64)
+            orden = dos_opt(pesos, vecino_mas_cercano(pesos))
+            if len(clientes_grupo) <= self.max_clientes_ventana:
+                metodo = "ventana_balas_simonetti"
+                distancia_total, orden = self.tsp_ventana_restringida(
+                    pesos, orden, self.tam_ventana
+                )
+            else:
+                metodo = "vecino_mas_cercano_2opt"
+                distancia_total = costo_recorrido(pesos, orden)
+            orden_visita = ["deposito"] + [nodos[i] for i in orden] + ["deposito"]
 
         return {
             "distancia_total": distancia_total,
             "clientes": clientes_grupo,
             "orden_visita": orden_visita,
+            "metodo": metodo,
+            "tiempo_metodo": time.time() - inicio,
         }
 
+    def dividir_recorrido(
+        self,
+        clientes: List[Dict],
+        vehiculos: List[Dict],
+        matriz_distancias: MatrizDistancias,
+    ) -> Tuple[List[Tuple[int, int, int]], List[int]]:
+        """Corta un recorrido gigante en viajes factibles (split de Prins)
+
+        ``vehiculos`` debe venir ordenado por capacidad descendente; los
+        viajes se hacen en ese orden a lo largo del recorrido y cada
+        vehículo hace a lo sumo uno. La capa t guarda el menor costo para
+        resolver los primeros i clientes con los t primeros vehículos, donde
+        cada cliente se atiende o se salta pagando una penalización mayor que
+        la distancia de toda la flota: así un cliente que no entra en el
+        vehículo que toca no corta el reparto, y la solución atiende la mayor
+        cantidad posible de clientes y, entre esas, recorre lo menos posible.
+        Los cortes j admisibles por carga y tramo para el viaje (j, i] forman
+        una ventana deslizante (ambos solo crecen con i) que se mantiene en
+        una deque monótona. La duración completa (ida y vuelta incluidas) no
+        es monótona en i, así que los cortes que la exceden no se descartan:
+        se recorre la deque desde el frente hasta el primero que la cumple.
+        Cada capa cuesta O(n·w), con w el largo de la ventana, y O(n) cuando
+        el primer corte ya cumple la duración.
+
+        Devuelve los viajes (vehículo, inicio, fin) y las posiciones de los
+        clientes saltados.
+        """
+        n = len(clientes)
+        m = len(vehiculos)
+        ids = [cliente["id"] for cliente in clientes]
+        demanda = np.zeros(n + 1)
+        demanda[1:] = np.cumsum([cliente["pedido"] for cliente in clientes])
+        # deposito[i]: depósito -> cliente i; tramo[i]: suma del camino 1..i
+        deposito = np.zeros(n + 1)
+        deposito[1:] = [matriz_distancias["deposito"][cliente_id] for cliente_id in ids]
+        tramo = np.zeros(n + 1)
+        tramo[2:] = np.cumsum(
+            [matriz_distancias[u][v] for u, v in zip(ids, ids[1:])]
+        )
+        distancia_maxima = TIEMPO_MAXIMO_RUTA / MINUTOS_POR_KM
+        # Ningún viaje supera distancia_maxima: saltar un cliente cuesta más
+        # que cualquier cambio en la distancia total
+        penalizacion = distancia_maxima * (m + 1)
+
+        def costo_viaje(j, i):
+            return deposito[j + 1] + tramo[i] - tramo[j + 1] + deposito[i]
+
+        # Sin vehículos, todos los clientes se saltan; corte[i] == -1 marca
+        # el cliente i saltado y corte[i] == i el vehículo sin viaje
+        anterior = np.arange(n + 1) * penalizacion
+        cortes = []
+        for vehiculo in vehiculos:
+            capacidad = vehiculo["capacidad"]
+            # Dejar el vehículo sin viaje conserva la capa anterior
+            actual = anterior.copy()
+            corte = np.arange(n + 1)
+            clave = anterior[:-1] + deposito[1:] - tramo[1:]
+            ventana = deque()
+            for i in range(1, n + 1):
+                j = i - 1
+                if np.isfinite(clave[j]):
+                    while ventana and clave[ventana[-1]] >= clave[j]:
+                        ventana.pop()
+                    ventana.append(j)
+                while ventana and (
+                    demanda[i] - demanda[ventana[0]] > capacidad
+                    or tramo[i] - tramo[ventana[0] + 1] > distancia_maxima
+                ):
+                    ventana.popleft()
+
+                for j in ventana:
+                    if costo_viaje(j, i) <= distancia_maxima:
+                        valor = clave[j] + tramo[i] + deposito[i]
+                        if valor < actual[i]:
+                            actual[i] = valor
+                            corte[i] = j
+                        break
+                if actual[i - 1] + penalizacion < actual[i]:
+                    actual[i] = actual[i - 1] + penalizacion
+                    corte[i] = -1
+            cortes.append(corte)
+            anterior = actual
+
+        viajes = []
+        saltados = []
+        i = n
+        t = m - 1
+        while i > 0:
+            if t < 0:
+                saltados.extend(range(i - 1, -1, -1))
+                break
+            j = int(cortes[t][i])
+            if j < 0:
+                saltados.append(i - 1)
+                i -= 1
+                continue
+            if j < i:
+                viajes.append((t, j, i))
+                i = j
+            t -= 1
+        viajes.reverse()
+        saltados.reverse()
+        return viajes, saltados
+
     def asignar_rutas_a_vehiculos(
-        self, rutas_optimizadas: List[Dict], vehiculos: List[Dict]
+        self,
+        rutas_optimizadas: List[Dict],
+        vehiculos: List[Dict],
+        matriz_distancias: MatrizDistancias,
     ) -> List[Dict]:
-        """Asigna las rutas optimizadas a los vehículos disponibles"""
+        """Asigna las rutas optimizadas a los vehículos disponibles
+
+        Las rutas por prioridad se concatenan (la de mayor prioridad primero)
+        en un recorrido gigante que dividir_recorrido reparte entre la flota.
+        Los clientes que no caben en ningún vehículo o que la flota no llega
+        a cubrir quedan en ``self.clientes_no_asignados``. Cada viaje lleva el
+        ``metodo`` y el ``tiempo_metodo`` del grupo de prioridad de sus
+        clientes, como listas si el viaje abarca varios grupos.
+        """
         vehiculos_ordenados = sorted(
-            vehiculos, key=lambda x: x["capacidad"], reverse=True
+            (vehiculo for vehiculo in vehiculos if vehiculo["disponible"]),
+            key=lambda x: x["capacidad"],
+            reverse=True,
+        )
+        capacidad_maxima = max(
+            (vehiculo["capacidad"] for vehiculo in vehiculos_ordenados), default=0
         )
-        rutas_asignadas = []
 
+        por_id = {}
+        grupo_de = {}
+        for grupo, ruta in enumerate(rutas_optimizadas):
+            for cliente in ruta["clientes"]:
+                por_id[cliente["id"]] = cliente
+                grupo_de[cliente["id"]] = grupo
+
+        # Recorrido gigante sin los clientes que ningún viaje puede atender
+        recorrido = []
+        self.clientes_no_asignados = []
         for ruta in rutas_optimizadas:
-            # Encontrar el vehículo más apropiado
-            vehiculo_asignado = None
-            for vehiculo in vehiculos_ordenados:
-                if vehiculo["disponible"] and vehiculo["capacidad"] >= sum(
-                    c["pedido"] for c in ruta["clientes"]
+            for cliente_id in ruta["orden_visita"]:
+                if cliente_id == "deposito":
+                    continue
+                cliente = por_id[cliente_id]
+                ida_y_vuelta = (
+                    matriz_distancias["deposito"][cliente_id]
+                    + matriz_distancias[cliente_id]["deposito"]
+                )
+                if (
+                    cliente["pedido"] > capacidad_maxima
+                    or ida_y_vuelta * MINUTOS_POR_KM > TIEMPO_MAXIMO_RUTA
                 ):
-                    vehiculo_asignado = vehiculo
-                    vehiculo["disponible"] = False  # Marcar como usado
-                    break
-
-            if vehiculo_asignado:
-                ruta_vehiculo = {
-                    "vehiculo_id": vehiculo_asignado["id"],
-                    "placa": vehiculo_asignado["placa"],
-                    "capacidad": vehiculo_asignado["capacidad"],
-                    "clientes": ruta["clientes"],
-                    "distancia_total": ruta["distancia_total"],
-                    "carga_total": sum(c["pedido"] for c in ruta["clientes"]),
-                    "tiempo_estimado": ruta["distancia_total"] * 2,  # 2 minutos por km
-                    "orden_visita": ruta["orden_visita"],
+                    self.clientes_no_asignados.append(cliente_id)
+                else:
+                    recorrido.append(cliente)
+
+        viajes, saltados = self.dividir_recorrido(
+            recorrido, vehiculos_ordenados, matriz_distancias
+        )
+        self.clientes_no_asignados.extend(recorrido[k]["id"] for k in saltados)
+
+        rutas_asignadas = []
+        for t, inicio, fin in viajes:
+            vehiculo = vehiculos_ordenados[t]
+            clientes_viaje = recorrido[inicio:fin]
+            orden_visita = (
+                ["deposito"] + [c["id"] for c in clientes_viaje] + ["deposito"]
+            )
+            distancia_total = sum(
+                matriz_distancias[u][v] for u, v in zip(orden_visita, orden_visita[1:])
+            )
+            grupos = [
+                rutas_optimizadas[grupo]
+                for grupo in dict.fromkeys(grupo_de[c["id"]] for c in clientes_viaje)
+            ]
+            metodos = [grupo["metodo"] for grupo in grupos]
+            tiempos = [grupo["tiempo_metodo"] for grupo in grupos]
+            rutas_asignadas.append(
+                {
+                    "vehiculo_id": vehiculo["id"],
+                    "placa": vehiculo["placa"],
+                    "capacidad": vehiculo["capacidad"],
+                    "clientes": clientes_viaje,
+                    "distancia_total": distancia_total,
+                    "carga_total": sum(c["pedido"] for c in clientes_viaje),
+                    "tiempo_estimado": distancia_total * MINUTOS_POR_KM,
+                    "orden_visita": orden_visita,
+                    "metodo": metodos[0] if len(metodos) == 1 else metodos,
+                    "tiempo_metodo": tiempos[0] if len(tiempos) == 1 else tiempos,
                 }
-                rutas_asignadas.append(ruta_vehiculo)
+            )
 
         return rutas_asignadas
 
@@ -186,7 +494,9 @@ class ProgramacionDinamica:
                 rutas_optimizadas.append(ruta_optimizada)
 
             # Asignar rutas a vehículos
-            rutas_finales = self.asignar_rutas_a_vehiculos(rutas_optimizadas, vehiculos)
+            rutas_finales = self.asignar_rutas_a_vehiculos(
+                rutas_optimizadas, vehiculos, matriz_distancias
+            )
 
             # Calcular métricas
             distancia_total = sum(ruta["distancia_total"] for ruta in rutas_finales)
@@ -208,6 +518,7 @@ class ProgramacionDinamica:
                     "eficiencia": clientes_atendidos / max(vehiculos_utilizados, 1),
                 },
                 "rutas_por_prioridad": rutas_optimizadas,
+                "clientes_no_asignados": self.clientes_no_asignados,
                 "matriz_distancias": matriz_distancias,
             }
 
@@ -228,14 +539,20 @@ def optimizar_rutas_programacion_dinamica(clientes: List[Dict], vehiculos: List[
     Args:
         clientes: Lista de clientes con sus coordenadas y pedidos
         vehiculos: Lista de vehículos con sus capacidades
-        **kwargs: Parámetros adicionales (ignorados para simplificar)
+        **kwargs: max_clientes_exacto, max_clientes_ventana y tam_ventana
+            (el resto se ignora)
     
     Returns:
         Dict con los resultados de la optimización
     """
     try:
         # Crear instancia del algoritmo
-        programacion_dinamica = ProgramacionDinamica({})
+        opciones = {
+            clave: kwargs[clave]
+            for clave in ("max_clientes_exacto", "max_clientes_ventana", "tam_ventana")
+            if clave in kwargs
+        }
+        programacion_dinamica = ProgramacionDinamica({}, **opciones)
         
         # Ejecutar optimización directamente
         resultados = programacion_dinamica.optimizar_rutas(clientes, vehiculos)
@@ -0,0 +1,47 @@
+import importlib
+from typing import Callable
+
+# Algoritmos que se pueden ejecutar por nombre: módulo dentro de
+# app.algoritmos, función principal y mensaje al ejecutarlo. Los módulos
+# se importan recién al pedir el algoritmo.
+ALGORITMOS = {
+    "bellman_ford": (
+        "bellman_ford",
+        "optimizar_rutas_bellman_ford",
+        "🚀 Ejecutando Bellman-Ford...",
+    ),
+    "backtracking": (
+        "backtracking",
+        "optimizar_rutas_backtracking",
+        "🔍 Ejecutando Backtracking...",
+    ),
+    "programacion_dinamica": (
+        "programacion_dinamica",
+        "optimizar_rutas_programacion_dinamica",
+        "⚡ Ejecutando Programación Dinámica...",
+    ),
+    "clarke_wright": (
+        "clarke_wright",
+        "optimizar_rutas_clarke_wright",
+        "💰 Ejecutando Clarke-Wright...",
+    ),
+    "insercion_ventanas": (
+        "insercion_ventanas",
+        "optimizar_rutas_insercion_ventanas",
+        "🕒 Ejecutando Inserción con Ventanas de Tiempo...",
+    ),
+    "alns": ("alns", "optimizar_rutas_alns", "🎲 Ejecutando ALNS..."),
+    "descomposicion": (
+        "descomposicion",
+        "optimizar_rutas_descomposicion",
+        "🧩 Ejecutando Descomposición por Zonas...",
+    ),
+}
+
+
+def obtener_algoritmo(nombre: str) -> Callable:
+    """Importa y devuelve la función principal del algoritmo ``nombre``"""
+    if nombre not in ALGORITMOS:
+        raise ValueError(f"Algoritmo '{nombre}' no registrado")
+    modulo, funcion, _ = ALGORITMOS[nombre]
+    return getattr(importlib.import_module(f".{modulo}", __package__), funcion)
@@ -20,6 +20,27 @@ class Config:
 
         self.TIEMPO_MAXIMO_EJECUCION = 300
         self.MAX_ITERACIONES = 10000
+        # Mejora con 2-opt, Or-opt, relocate y swap de las rutas de cualquier
+        # algoritmo (se puede cambiar por solicitud con "busqueda_local")
+        self.BUSQUEDA_LOCAL = True
+        self.TIEMPO_BUSQUEDA_LOCAL = 2.0
+        # Segundos de búsqueda de ALNS (se puede cambiar por solicitud con
+        # "tiempo_alns")
+        self.TIEMPO_ALNS = 10.0
+        # Descomposición por zonas: algoritmo de cada zona y "barrido" o
+        # "kmeans" (por solicitud con "algoritmo_zonas" y "metodo_zonas")
+        self.ALGORITMO_ZONAS = "clarke_wright"
+        self.METODO_ZONAS = "kmeans"
+
+        # densa, float32, metros, triangular, triangular_float32, triangular_metros
+        self.MODO_MATRIZ_DISTANCIAS = "densa"
+        # Guardar la matriz del dataset inicial junto al CSV (memoria mapeada)
+        self.PERSISTIR_MATRIZ = True
+        # Procesos para construir la matriz (None: automático según tamaño)
+        self.TRABAJADORES_MATRIZ = None
+        # "completo" o "knn" (solo los K_VECINOS más cercanos y el depósito)
+        self.MODO_GRAFO = "completo"
+        self.K_VECINOS = 10
 
         self.DEPOSITO_LAT = -12.0464
         self.DEPOSITO_LNG = -77.0428
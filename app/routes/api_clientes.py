@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify, current_app, render_template
 from app.utils.parser_csv import cargar_clientes_csv
+from app.utils.indice_espacial import obtener_indice_espacial
 import json
+import math
 
 api_clientes_bp = Blueprint("api_clientes", __name__)
 
@@ -36,6 +38,65 @@ def obtener_clientes():
     return jsonify({"total": len(clientes_filtrados), "clientes": clientes_filtrados})
 
 
+@api_clientes_bp.route("/api/clientes/cerca", methods=["GET"])
+def clientes_cercanos():
+    """Busca clientes por radio (lat, lon, radio), k más cercanos (lat, lon, k) o rectángulo (lat_min, lon_min, lat_max, lon_max)"""
+    datos = current_app.config["DATOS_GLOBALES"]
+    clientes = datos.get("clientes", [])
+
+    try:
+        if "radio" in request.args or "k" in request.args:
+            lat = float(request.args["lat"])
+            lon = float(request.args["lon"])
+        if "radio" in request.args:
+            radio = float(request.args["radio"])
+        elif "k" in request.args:
+            k = int(request.args["k"])
+        else:
+            caja = [
+                float(request.args[clave])
+                for clave in ("lat_min", "lon_min", "lat_max", "lon_max")
+            ]
+    except KeyError as e:
+        return jsonify({"error": f"Falta el parámetro {e.args[0]}"}), 400
+    except ValueError:
+        return jsonify({"error": "Parámetros numéricos inválidos"}), 400
+
+    if "radio" in request.args or "k" in request.args:
+        if not (math.isfinite(lat) and math.isfinite(lon)):
+            return jsonify({"error": "lat y lon deben ser números finitos"}), 400
+    if "radio" in request.args:
+        if not math.isfinite(radio) or radio < 0:
+            return jsonify({"error": "El radio debe ser un número no negativo"}), 400
+    elif "k" not in request.args:
+        if not all(math.isfinite(valor) for valor in caja):
+            return jsonify({"error": "Parámetros numéricos inválidos"}), 400
+        lat_min, lon_min, lat_max, lon_max = caja
+        if lat_min > lat_max or lon_min > lon_max:
+            return (
+                jsonify({"error": "lat_min/lon_min no pueden superar lat_max/lon_max"}),
+                400,
+            )
+
+    # El índice se reconstruye solo cuando cambia la lista de clientes
+    indice = obtener_indice_espacial(datos, clientes, id(clientes))
+
+    if "radio" in request.args:
+        encontrados = indice.en_radio(lat, lon, radio)
+    elif "k" in request.args:
+        encontrados = indice.k_cercanos(lat, lon, k)
+    else:
+        encontrados = [(cliente, None) for cliente in indice.en_caja(*caja)]
+
+    resultado = []
+    for cliente, distancia in encontrados:
+        if distancia is not None:
+            cliente = {**cliente, "distancia": round(distancia, 3)}
+        resultado.append(cliente)
+
+    return jsonify({"total": len(resultado), "clientes": resultado})
+
+
 @api_clientes_bp.route("/api/clientes/<int:cliente_id>", methods=["GET"])
 def obtener_cliente(cliente_id):
     """Obtiene un cliente específico"""
@@ -49,6 +110,7 @@ def obtener_cliente(cliente_id):
 
     return jsonify(cliente)
 
+
 @api_clientes_bp.route("/api/clientes/estadisticas", methods=["GET"])
 def estadisticas_clientes():
     """Obtiene estadísticas de los clientes"""
@@ -2,11 +2,29 @@ from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime
 import io
 import csv
-from ..utils.calculos_comunes import get_datos_globales
+import math
+from ..utils.calculos_comunes import construir_matriz_distancias, get_datos_globales
+from ..utils.matriz_distancias import cache_matrices
+from ..algoritmos.registro import ALGORITMOS, obtener_algoritmo
+from ..algoritmos.descomposicion import METODOS_ZONAS
 
 general_bp = Blueprint("general", __name__)
 
 
+def leer_segundos(datos, clave, defecto):
+    """Segundos positivos en ``datos[clave]`` (o ``defecto``); None si el valor no es válido"""
+    valor = datos.get(clave, defecto)
+    if isinstance(valor, bool):
+        return None
+    try:
+        segundos = float(valor)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(segundos) or segundos <= 0:
+        return None
+    return segundos
+
+
 @general_bp.route("/obtener_datos_mapa")
 def api_obtener_datos_mapa():
     """Obtener datos para mostrar en el mapa"""
@@ -114,6 +132,7 @@ def api_estadisticas():
                 ),
                 "tiene_resultados": "resultados" in datos
                 and datos["resultados"] is not None,
+                "cache_matrices": cache_matrices.estadisticas(),
             }
         )
     except Exception as e:
@@ -167,8 +186,12 @@ def api_cargar_csv():
         # Agregar clientes a los datos globales
         datos["clientes"].extend(nuevos_clientes)
 
-        # Reconstruir grafo
-        if datos["clientes"]:
+        # Actualizar el grafo solo con los clientes nuevos
+        if datos.get("grafo"):
+            datos["grafo"] = grafo_builder.actualizar_grafo(
+                datos["grafo"], nuevos_clientes
+            )
+        elif datos["clientes"]:
             datos["grafo"] = grafo_builder.construir_grafo(datos["clientes"])
 
         return jsonify(
@@ -216,32 +239,46 @@ def api_ejecutar_optimizacion():
 
         print(f"📝 Procesando {len(datos_globales['clientes'])} clientes...")
 
-        # Importar y ejecutar algoritmos según sea necesario
+        if algoritmo not in ALGORITMOS:
+            print(f"❌ Algoritmo no soportado: {algoritmo}")
+            return jsonify({"success": False, "message": f"Algoritmo '{algoritmo}' no soportado"}), 400
+
+        # Parámetros propios de cada algoritmo
+        opciones = {}
+        if algoritmo == "descomposicion":
+            opciones["algoritmo"] = datos.get("algoritmo_zonas", current_app.config["ALGORITMO_ZONAS"])
+            opciones["metodo"] = datos.get("metodo_zonas", current_app.config["METODO_ZONAS"])
+            if opciones["algoritmo"] not in ALGORITMOS or opciones["algoritmo"] == "descomposicion":
+                print(f"❌ Algoritmo por zona no soportado: {opciones['algoritmo']}")
+                return jsonify({"success": False, "message": f"Algoritmo por zona '{opciones['algoritmo']}' no soportado"}), 400
+            if opciones["metodo"] not in METODOS_ZONAS:
+                print(f"❌ Método de división no soportado: {opciones['metodo']}")
+                return jsonify({"success": False, "message": f"Método de división '{opciones['metodo']}' no soportado"}), 400
+        if "alns" in (algoritmo, opciones.get("algoritmo")):
+            tiempo_alns = leer_segundos(datos, "tiempo_alns", current_app.config["TIEMPO_ALNS"])
+            if tiempo_alns is None:
+                print(f"❌ tiempo_alns no válido: {datos.get('tiempo_alns')}")
+                return jsonify({"success": False, "message": "tiempo_alns debe ser un número de segundos mayor que 0"}), 400
+            opciones["tiempo_limite"] = tiempo_alns
+
+        usar_busqueda_local = datos.get("busqueda_local", current_app.config["BUSQUEDA_LOCAL"])
+        if usar_busqueda_local:
+            tiempo_busqueda_local = leer_segundos(
+                datos, "tiempo_busqueda_local", current_app.config["TIEMPO_BUSQUEDA_LOCAL"]
+            )
+            if tiempo_busqueda_local is None:
+                print(f"❌ tiempo_busqueda_local no válido: {datos.get('tiempo_busqueda_local')}")
+                return jsonify({"success": False, "message": "tiempo_busqueda_local debe ser un número de segundos mayor que 0"}), 400
+
+        # Importar y ejecutar el algoritmo registrado
         try:
-            if algoritmo == "bellman_ford":
-                print("🚀 Ejecutando Bellman-Ford...")
-                from ..algoritmos.bellman_ford import optimizar_rutas_bellman_ford
-                resultado = optimizar_rutas_bellman_ford(
-                    datos_globales["clientes"],
-                    datos_globales["vehiculos"]
-                )
-            elif algoritmo == "backtracking":
-                print("🔍 Ejecutando Backtracking...")
-                from ..algoritmos.backtracking import optimizar_rutas_backtracking
-                resultado = optimizar_rutas_backtracking(
-                    datos_globales["clientes"],
-                    datos_globales["vehiculos"]
-                )
-            elif algoritmo == "programacion_dinamica":
-                print("⚡ Ejecutando Programación Dinámica...")
-                from ..algoritmos.programacion_dinamica import optimizar_rutas_programacion_dinamica
-                resultado = optimizar_rutas_programacion_dinamica(
-                    datos_globales["clientes"],
-                    datos_globales["vehiculos"]
-                )
-            else:
-                print(f"❌ Algoritmo no soportado: {algoritmo}")
-                return jsonify({"success": False, "message": f"Algoritmo '{algoritmo}' no soportado"}), 400
+            print(ALGORITMOS[algoritmo][2])
+            optimizar = obtener_algoritmo(algoritmo)
+            resultado = optimizar(
+                datos_globales["clientes"],
+                datos_globales["vehiculos"],
+                **opciones
+            )
         except ImportError as ie:
             print(f"❌ Error al importar módulo del algoritmo: {str(ie)}")
             return jsonify({"success": False, "message": f"Error al cargar el módulo del algoritmo: {str(ie)}"}), 500
@@ -253,6 +290,16 @@ def api_ejecutar_optimizacion():
             print("⚠️ El algoritmo no devolvió resultados")
             return jsonify({"success": False, "message": "El algoritmo no generó resultados válidos"}), 500
 
+        # Mejora común de las rutas, sea cual sea el algoritmo
+        if usar_busqueda_local and not resultado.get("error"):
+            print("🔧 Mejorando rutas con búsqueda local...")
+            from ..algoritmos.busqueda_local import mejorar_resultados
+            mejorar_resultados(
+                resultado,
+                tiempo_limite=tiempo_busqueda_local,
+                matriz=construir_matriz_distancias(datos_globales["clientes"]),
+            )
+
         # Guardar resultados en datos globales
         print("💾 Guardando resultados...")
         datos_globales["resultados"] = resultado
@@ -1,6 +1,19 @@
 import math
-from typing import Dict, List
+from typing import Dict, List, Optional
 from flask import current_app
+from .matriz_distancias import (
+    MODO_POR_DEFECTO,
+    MatrizDistancias,
+    cache_matrices,
+    construir_matriz_nodos,
+)
+
+DEPOSITO = {
+    "id": "deposito",
+    "nombre": "Depósito Central",
+    "latitud": -12.0464,
+    "longitud": -77.0428,
+}
 
 
 def calcular_distancia(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -24,35 +37,26 @@ def calcular_distancia(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return R * c
 
 
-def construir_matriz_distancias(clientes: List[Dict]) -> Dict:
-    """Construye la matriz de distancias entre todos los nodos"""
-    matriz = {}
-
-    # Agregar depósito
-    deposito = {
-        "id": "deposito",
-        "nombre": "Depósito Central",
-        "latitud": -12.0464,
-        "longitud": -77.0428,
-    }
-
-    todos_nodos = [deposito] + clientes
-
-    for i, nodo1 in enumerate(todos_nodos):
-        matriz[nodo1["id"]] = {}
-        for j, nodo2 in enumerate(todos_nodos):
-            if i == j:
-                matriz[nodo1["id"]][nodo2["id"]] = 0
-            else:
-                distancia = calcular_distancia(
-                    nodo1["latitud"],
-                    nodo1["longitud"],
-                    nodo2["latitud"],
-                    nodo2["longitud"],
-                )
-                matriz[nodo1["id"]][nodo2["id"]] = distancia
-
-    return matriz
+def construir_matriz_distancias(
+    clientes: List[Dict],
+    deposito: Optional[Dict] = None,
+    modo: Optional[str] = None,
+    usar_cache: bool = True,
+    **opciones_construccion,
+) -> MatrizDistancias:
+    """Construye la matriz de distancias entre todos los nodos (depósito en la fila 0).
+
+    Por defecto la matriz se obtiene de la caché compartida del proceso, por lo
+    que es de solo lectura. Sin ``modo`` se reutiliza la matriz existente en
+    cualquier modo de almacenamiento. ``opciones_construccion`` (trabajadores,
+    tam_bloque, ruta_salida, progreso) controlan el constructor por bloques.
+    """
+    todos_nodos = [deposito or DEPOSITO] + clientes
+    if usar_cache:
+        return cache_matrices.obtener(todos_nodos, modo=modo, **opciones_construccion)
+    return construir_matriz_nodos(
+        todos_nodos, modo=modo or MODO_POR_DEFECTO, **opciones_construccion
+    )
 
 
 def get_datos_globales():
@@ -1,11 +1,164 @@
-import math
-from typing import Dict, List, Tuple, Optional
-from .calculos_comunes import calcular_distancia
+import heapq
+from collections import OrderedDict
+from collections.abc import Mapping
+import numpy as np
+from typing import Callable, Dict, Hashable, Iterator, List, Tuple, Optional
+from .calculos_comunes import calcular_distancia, construir_matriz_distancias
+from .indice_espacial import obtener_indice_espacial
+from .matriz_distancias import cache_matrices, calcular_huella
+from .zonas import dividir_por_barrido, dividir_por_kmeans
+from .vecinos_cercanos import (
+    K_VECINOS_POR_DEFECTO,
+    VecinosCercanos,
+    obtener_vecinos_cercanos,
+)
+
+MINUTOS_POR_KM = 2
+COSTO_POR_KM = 0.5
+# Árboles de caminos mínimos que se conservan por grafo (uno por origen)
+CAPACIDAD_ARBOLES_CAMINOS = 64
+
+
+class VistaAristas(Mapping):
+    """Vista de las aristas del grafo calculada a partir de la matriz o de las listas de vecinos.
+
+    Conserva la interfaz del antiguo diccionario ``grafo["aristas"]``
+    (claves ``"{origen}_{destino}"``) pero cada arista se arma solo cuando se
+    consulta, en lugar de guardar N² diccionarios. Con una matriz el grafo es
+    completo; con VecinosCercanos solo existen las aristas de las listas.
+    """
+
+    def __init__(self, fuente):
+        self.fuente = fuente
+        self._ids_por_texto = {str(nodo_id): nodo_id for nodo_id in fuente.ids}
+
+    def obtener(self, origen: Hashable, destino: Hashable) -> Dict:
+        """Obtiene la arista entre dos nodos a partir de sus ids"""
+        if origen == destino or origen not in self.fuente or destino not in self.fuente:
+            raise KeyError(f"{origen}_{destino}")
+        distancia = self.fuente.distancia(origen, destino)
+        return {
+            "origen": origen,
+            "destino": destino,
+            "distancia": distancia,
+            "tiempo_estimado": distancia * MINUTOS_POR_KM,
+            "costo": distancia * COSTO_POR_KM,
+        }
+
+    def _resolver(self, arista_id: str) -> Tuple[Hashable, Hashable]:
+        # Los ids pueden contener "_", así que se prueban todos los cortes
+        posicion = arista_id.find("_")
+        while posicion != -1:
+            origen = self._ids_por_texto.get(arista_id[:posicion])
+            destino = self._ids_por_texto.get(arista_id[posicion + 1 :])
+            if origen is not None and destino is not None and origen != destino:
+                return origen, destino
+            posicion = arista_id.find("_", posicion + 1)
+        raise KeyError(arista_id)
+
+    def __getitem__(self, arista_id: str) -> Dict:
+        if not isinstance(arista_id, str):
+            raise KeyError(arista_id)
+        return self.obtener(*self._resolver(arista_id))
+
+    def __contains__(self, arista_id: object) -> bool:
+        try:
+            self[arista_id]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        if isinstance(self.fuente, VecinosCercanos):
+            for origen, destino in self.fuente.iterar_aristas():
+                yield f"{origen}_{destino}"
+            return
+        for origen in self.fuente.ids:
+            for destino in self.fuente.ids:
+                if origen != destino:
+                    yield f"{origen}_{destino}"
+
+    def __len__(self) -> int:
+        if isinstance(self.fuente, VecinosCercanos):
+            return self.fuente.total_aristas
+        n = len(self.fuente)
+        return n * (n - 1)
+
+
+class ArbolCaminos:
+    """Árbol de caminos mínimos desde un origen, calculado bajo demanda.
+
+    Dijkstra con montículo binario sobre posiciones enteras de la matriz o de
+    las listas de vecinos. El cálculo se detiene en cuanto se fija el destino
+    pedido y se reanuda desde el mismo estado si después se consulta otro.
+    """
+
+    def __init__(self, fuente, origen: int):
+        n = len(fuente)
+        self.fuente = fuente
+        self.origen = origen
+        self.distancias = np.full(n, np.inf)
+        self.predecesores = np.full(n, -1, dtype=np.int64)
+        self.fijados = np.zeros(n, dtype=bool)
+        self.distancias[origen] = 0.0
+        self._monticulo = [(0.0, origen)]
+        self._todos = None if isinstance(fuente, VecinosCercanos) else np.arange(n)
+
+    def _adyacentes(self, posicion: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self._todos is None:
+            return self.fuente.vecinos(posicion)
+        return self._todos, np.asarray(self.fuente.fila(posicion), dtype=np.float64)
+
+    def avanzar_hasta(self, destino: int) -> bool:
+        """Expande el árbol hasta fijar ``destino``; False si no es alcanzable"""
+        while not self.fijados[destino] and self._monticulo:
+            distancia, actual = heapq.heappop(self._monticulo)
+            if self.fijados[actual] or distancia > self.distancias[actual]:
+                continue
+            self.fijados[actual] = True
+
+            indices, pesos = self._adyacentes(actual)
+            nuevas = distancia + pesos
+            mejora = (nuevas < self.distancias[indices]) & ~self.fijados[indices]
+            indices, nuevas = indices[mejora], nuevas[mejora]
+            self.distancias[indices] = nuevas
+            self.predecesores[indices] = actual
+            for j, d in zip(indices.tolist(), nuevas.tolist()):
+                heapq.heappush(self._monticulo, (d, j))
+        return bool(self.fijados[destino])
+
+    def ruta(self, destino: int) -> Tuple[List[int], float]:
+        """Obtiene las posiciones del camino mínimo hasta ``destino`` y su distancia"""
+        if not self.avanzar_hasta(destino):
+            return [], float("inf")
+        ruta = []
+        actual = destino
+        while actual != -1:
+            ruta.append(actual)
+            actual = int(self.predecesores[actual])
+        ruta.reverse()
+        return ruta, float(self.distancias[destino])
 
 
 class GrafoBuilder:
 
-    def __init__(self):
+    def __init__(
+        self,
+        modo_matriz: Optional[str] = None,
+        trabajadores: Optional[int] = None,
+        tam_bloque: Optional[int] = None,
+        modo_grafo: str = "completo",
+        k_vecinos: int = K_VECINOS_POR_DEFECTO,
+    ):
+        if modo_grafo not in ("completo", "knn"):
+            raise ValueError(f"Modo de grafo desconocido: {modo_grafo}")
+        self.modo_matriz = modo_matriz
+        # Opciones del constructor de la matriz por bloques
+        self.trabajadores = trabajadores
+        self.tam_bloque = tam_bloque
+        # "completo": todas las aristas; "knn": k vecinos más cercanos + depósito
+        self.modo_grafo = modo_grafo
+        self.k_vecinos = k_vecinos
         self.deposito = {
             "id": "deposito",
             "nombre": "Depósito Central",
@@ -14,7 +167,25 @@ class GrafoBuilder:
             "tipo": "deposito",
         }
 
-    def construir_grafo(self, clientes: List[Dict]) -> Dict:
+    def crear_nodo_cliente(self, cliente: Dict) -> Dict:
+        """Crea el nodo del grafo correspondiente a un cliente"""
+        return {
+            "id": cliente["id"],
+            "nombre": cliente["nombre"],
+            "latitud": cliente["latitud"],
+            "longitud": cliente["longitud"],
+            "prioridad": cliente["prioridad"],
+            "ventana_inicio": cliente["ventana_inicio"],
+            "ventana_fin": cliente["ventana_fin"],
+            "pedido": cliente["pedido"],
+            "tipo": "cliente",
+        }
+
+    def construir_grafo(
+        self,
+        clientes: List[Dict],
+        progreso: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict:
         grafo = {
             "nodos": {},
             "aristas": {},
@@ -23,6 +194,7 @@ class GrafoBuilder:
                 "total_nodos": len(clientes) + 1,  # +1 por el depósito
                 "total_aristas": 0,
                 "deposito": self.deposito,
+                "version": 1,
             },
         }
 
@@ -31,59 +203,126 @@ class GrafoBuilder:
 
         # Agregar clientes como nodos
         for cliente in clientes:
-            grafo["nodos"][cliente["id"]] = {
-                "id": cliente["id"],
-                "nombre": cliente["nombre"],
-                "latitud": cliente["latitud"],
-                "longitud": cliente["longitud"],
-                "prioridad": cliente["prioridad"],
-                "ventana_inicio": cliente["ventana_inicio"],
-                "ventana_fin": cliente["ventana_fin"],
-                "pedido": cliente["pedido"],
-                "tipo": "cliente",
-            }
+            grafo["nodos"][cliente["id"]] = self.crear_nodo_cliente(cliente)
 
-        # Construir matriz de distancias
-        todos_nodos = list(grafo["nodos"].values())
-        for i, nodo1 in enumerate(todos_nodos):
-            grafo["matriz_distancias"][nodo1["id"]] = {}
-            for j, nodo2 in enumerate(todos_nodos):
-                if i == j:
-                    grafo["matriz_distancias"][nodo1["id"]][nodo2["id"]] = 0
-                else:
-                    distancia = calcular_distancia(
-                        nodo1["latitud"],
-                        nodo1["longitud"],
-                        nodo2["latitud"],
-                        nodo2["longitud"],
-                    )
-                    grafo["matriz_distancias"][nodo1["id"]][nodo2["id"]] = distancia
-
-                    # Agregar arista
-                    arista_id = f"{nodo1['id']}_{nodo2['id']}"
-                    grafo["aristas"][arista_id] = {
-                        "origen": nodo1["id"],
-                        "destino": nodo2["id"],
-                        "distancia": distancia,
-                        "tiempo_estimado": distancia * 2,  # 2 minutos por km
-                        "costo": distancia * 0.5,  # 0.5 por km
-                    }
+        if self.modo_grafo == "knn":
+            # Grafo disperso: sin matriz completa, solo listas de vecinos
+            vecinos = obtener_vecinos_cercanos(
+                list(grafo["nodos"].values()), self.k_vecinos
+            )
+            grafo["matriz_distancias"] = None
+            grafo["vecinos"] = vecinos
+            grafo["aristas"] = VistaAristas(vecinos)
+            grafo["metadata"]["total_aristas"] = len(grafo["aristas"])
+            grafo["metadata"]["k_vecinos"] = self.k_vecinos
+            return grafo
+
+        # Matriz de distancias compartida con los algoritmos (caché del proceso)
+        matriz = construir_matriz_distancias(
+            clientes,
+            deposito=self.deposito,
+            modo=self.modo_matriz,
+            trabajadores=self.trabajadores,
+            tam_bloque=self.tam_bloque,
+            progreso=progreso,
+        )
+        grafo["matriz_distancias"] = matriz
+
+        # Las aristas se derivan de la matriz al consultarlas
+        grafo["aristas"] = VistaAristas(matriz)
+        grafo["metadata"]["total_aristas"] = len(grafo["aristas"])
 
+        return grafo
+
+    def actualizar_grafo(self, grafo: Dict, clientes_nuevos: List[Dict]) -> Dict:
+        """Agrega clientes a un grafo existente calculando solo las filas y columnas nuevas"""
+        if not clientes_nuevos:
+            return grafo
+
+        ids_nuevos = [cliente["id"] for cliente in clientes_nuevos]
+        if any(cliente_id in grafo["nodos"] for cliente_id in ids_nuevos) or len(
+            set(ids_nuevos)
+        ) != len(ids_nuevos):
+            # Ids repetidos: el grafo incremental no sería consistente
+            clientes = [
+                nodo
+                for nodo in grafo["nodos"].values()
+                if nodo.get("tipo") == "cliente"
+            ]
+            version = grafo["metadata"].get("version", 1)
+            grafo = self.construir_grafo(clientes + clientes_nuevos)
+            grafo["metadata"]["version"] = version + 1
+            return grafo
+
+        for cliente in clientes_nuevos:
+            grafo["nodos"][cliente["id"]] = self.crear_nodo_cliente(cliente)
+
+        if grafo.get("vecinos") is not None:
+            vecinos = grafo["vecinos"].extender(
+                ids_nuevos,
+                np.array([c["latitud"] for c in clientes_nuevos], dtype=np.float64),
+                np.array([c["longitud"] for c in clientes_nuevos], dtype=np.float64),
+            )
+            cache_matrices.almacenar(
+                calcular_huella(list(grafo["nodos"].values())),
+                f"knn-{vecinos.k}",
+                vecinos,
+            )
+            grafo["vecinos"] = vecinos
+            grafo["aristas"] = VistaAristas(vecinos)
+        else:
+            matriz = grafo["matriz_distancias"].extender(clientes_nuevos)
+            cache_matrices.registrar(list(grafo["nodos"].values()), matriz)
+            grafo["matriz_distancias"] = matriz
+            grafo["aristas"] = VistaAristas(matriz)
+
+        grafo["metadata"]["total_nodos"] = len(grafo["nodos"])
         grafo["metadata"]["total_aristas"] = len(grafo["aristas"])
+        grafo["metadata"]["version"] = grafo["metadata"].get("version", 1) + 1
 
         return grafo
 
     def obtener_vecinos(self, grafo: Dict, nodo_id: str) -> List[Dict]:
         """Obtiene los nodos vecinos de un nodo específico"""
         vecinos = []
-        if nodo_id in grafo["matriz_distancias"]:
-            for destino, distancia in grafo["matriz_distancias"][nodo_id].items():
-                if destino != nodo_id and distancia > 0:
-                    vecinos.append(
-                        {"nodo": grafo["nodos"][destino], "distancia": distancia}
-                    )
+        for destino, distancia in self._adyacentes(grafo, nodo_id):
+            if destino != nodo_id and distancia > 0:
+                vecinos.append(
+                    {"nodo": grafo["nodos"][destino], "distancia": distancia}
+                )
         return vecinos
 
+    def _adyacentes(self, grafo: Dict, nodo_id) -> List[Tuple[Hashable, float]]:
+        # Pares (destino, distancia) de las aristas que salen del nodo
+        if grafo.get("vecinos") is not None:
+            if nodo_id not in grafo["vecinos"]:
+                return []
+            return grafo["vecinos"].vecinos_de(nodo_id)
+        if nodo_id not in grafo["matriz_distancias"]:
+            return []
+        return grafo["matriz_distancias"][nodo_id].items()
+
+    def obtener_candidatos(
+        self, grafo: Dict, nodo_id, k: Optional[int] = None
+    ) -> List[Hashable]:
+        """Obtiene los ids de los k nodos más cercanos a un nodo, del más cercano al más lejano"""
+        k = k or self.k_vecinos
+        if grafo.get("vecinos") is not None and k <= grafo["vecinos"].k:
+            vecinos = grafo["vecinos"]
+            return [
+                vecinos.ids[j] for j in vecinos.candidatos(vecinos.indice[nodo_id], k)
+            ]
+
+        matriz = grafo["matriz_distancias"]
+        fila = np.array(matriz.fila(matriz.posicion(nodo_id)), dtype=np.float64)
+        fila[matriz.posicion(nodo_id)] = np.inf
+        k = min(k, len(fila) - 1)
+        if k <= 0:
+            return []
+        cercanos = np.argpartition(fila, k - 1)[:k]
+        cercanos = cercanos[np.argsort(fila[cercanos], kind="stable")]
+        return [matriz.ids[j] for j in cercanos]
+
     def obtener_nodos_por_prioridad(self, grafo: Dict, prioridad: int) -> List[Dict]:
         """Obtiene todos los nodos de una prioridad específica"""
         nodos_prioridad = []
@@ -96,16 +335,10 @@ class GrafoBuilder:
         self, grafo: Dict, centro_lat: float, centro_lon: float, radio_km: float
     ) -> List[Dict]:
         """Obtiene nodos dentro de un radio específico desde un punto central"""
-        nodos_en_radio = []
-
-        for nodo in grafo["nodos"].values():
-            distancia = calcular_distancia(
-                centro_lat, centro_lon, nodo["latitud"], nodo["longitud"]
-            )
-            if distancia <= radio_km:
-                nodos_en_radio.append(nodo)
-
-        return nodos_en_radio
+        indice = obtener_indice_espacial(
+            grafo, grafo["nodos"].values(), grafo["metadata"].get("version")
+        )
+        return [nodo for nodo, _ in indice.en_radio(centro_lat, centro_lon, radio_km)]
 
     def calcular_centroide(self, nodos: List[Dict]) -> Tuple[float, float]:
         """Calcula el centroide de un conjunto de nodos"""
@@ -118,9 +351,14 @@ class GrafoBuilder:
         return (lat_total / len(nodos), lon_total / len(nodos))
 
     def dividir_por_zona_geografica(
-        self, grafo: Dict, num_zonas: int = 4
+        self, grafo: Dict, num_zonas: int = 4, metodo: str = "anillos"
     ) -> Dict[int, List[Dict]]:
-        """Divide los nodos en zonas geográficas"""
+        """Divide los nodos en zonas geográficas
+
+        ``metodo`` es "anillos" (5 km por zona desde el centroide),
+        "barrido" (sectores alrededor del depósito) o "kmeans" (k-means
+        balanceado por demanda).
+        """
         clientes = [
             nodo for nodo in grafo["nodos"].values() if nodo.get("tipo") == "cliente"
         ]
@@ -128,6 +366,11 @@ class GrafoBuilder:
         if not clientes:
             return {}
 
+        if metodo in ("barrido", "kmeans"):
+            dividir = dividir_por_barrido if metodo == "barrido" else dividir_por_kmeans
+            zonas = dividir(clientes, num_zonas, grafo["nodos"].get("deposito"))
+            return {i: [clientes[p] for p in zona] for i, zona in enumerate(zonas)}
+
         # Calcular centroide de todos los clientes
         centro_lat, centro_lon = self.calcular_centroide(clientes)
 
@@ -164,7 +407,13 @@ class GrafoBuilder:
         # Calcular distancias promedio desde el depósito
         distancias_deposito = []
         for cliente in clientes:
-            distancia = grafo["matriz_distancias"]["deposito"][cliente["id"]]
+            if grafo.get("vecinos") is not None:
+                vecinos = grafo["vecinos"]
+                distancia = float(
+                    vecinos.distancias_deposito[vecinos.indice[cliente["id"]]]
+                )
+            else:
+                distancia = grafo["matriz_distancias"]["deposito"][cliente["id"]]
             distancias_deposito.append(distancia)
 
         return {
@@ -177,6 +426,30 @@ class GrafoBuilder:
             "pedido_promedio": sum(c["pedido"] for c in clientes) / len(clientes),
         }
 
+    def _arbol_caminos(self, grafo: Dict, origen: Hashable) -> ArbolCaminos:
+        # Árboles por origen; se descartan cuando cambia la matriz o las listas
+        fuente = (
+            grafo["vecinos"]
+            if grafo.get("vecinos") is not None
+            else grafo["matriz_distancias"]
+        )
+        cache = grafo.get("arboles_caminos")
+        if cache is None or cache["fuente"] is not fuente:
+            cache = {"fuente": fuente, "arboles": OrderedDict()}
+            grafo["arboles_caminos"] = cache
+
+        arboles = cache["arboles"]
+        posicion = fuente.indice[origen]
+        arbol = arboles.get(posicion)
+        if arbol is None:
+            arbol = ArbolCaminos(fuente, posicion)
+            arboles[posicion] = arbol
+            if len(arboles) > CAPACIDAD_ARBOLES_CAMINOS:
+                arboles.popitem(last=False)
+        else:
+            arboles.move_to_end(posicion)
+        return arbol
+
     def encontrar_ruta_mas_corta(
         self, grafo: Dict, origen: str, destino: str
     ) -> Tuple[List[str], float]:
@@ -184,49 +457,24 @@ class GrafoBuilder:
         if origen not in grafo["nodos"] or destino not in grafo["nodos"]:
             return [], float("inf")
 
-        # Implementación simplificada de Dijkstra
-        distancias = {nodo_id: float("inf") for nodo_id in grafo["nodos"]}
-        predecesores = {nodo_id: None for nodo_id in grafo["nodos"]}
-        visitados = set()
-
-        distancias[origen] = 0
-
-        while visitados != set(grafo["nodos"]):
-            # Encontrar nodo no visitado con menor distancia
-            nodo_actual = None
-            min_distancia = float("inf")
-
-            for nodo_id in grafo["nodos"]:
-                if nodo_id not in visitados and distancias[nodo_id] < min_distancia:
-                    min_distancia = distancias[nodo_id]
-                    nodo_actual = nodo_id
-
-            if nodo_actual is None:
-                break
-
-            visitados.add(nodo_actual)
-
-            # Actualizar distancias a vecinos
-            for vecino_id in grafo["matriz_distancias"][nodo_actual]:
-                if vecino_id not in visitados:
-                    nueva_distancia = (
-                        distancias[nodo_actual]
-                        + grafo["matriz_distancias"][nodo_actual][vecino_id]
-                    )
-                    if nueva_distancia < distancias[vecino_id]:
-                        distancias[vecino_id] = nueva_distancia
-                        predecesores[vecino_id] = nodo_actual
-
-        # Reconstruir ruta
-        ruta = []
-        nodo_actual = destino
-        while nodo_actual is not None:
-            ruta.append(nodo_actual)
-            nodo_actual = predecesores[nodo_actual]
-
-        ruta.reverse()
-
-        return ruta, distancias[destino]
+        arbol = self._arbol_caminos(grafo, origen)
+        posiciones, distancia = arbol.ruta(arbol.fuente.indice[destino])
+        return [arbol.fuente.ids[p] for p in posiciones], distancia
+
+    def encontrar_rutas_mas_cortas(
+        self, grafo: Dict, pares: List[Tuple[str, str]]
+    ) -> List[Tuple[List[str], float]]:
+        """Resuelve varios pares (origen, destino) reutilizando un árbol por origen.
+
+        Los pares se agrupan por origen para que cada árbol se calcule una sola
+        vez; el resultado conserva el orden de ``pares``.
+        """
+        resultados = [None] * len(pares)
+        orden = sorted(range(len(pares)), key=lambda i: str(pares[i][0]))
+        for i in orden:
+            origen, destino = pares[i]
+            resultados[i] = self.encontrar_ruta_mas_corta(grafo, origen, destino)
+        return resultados
 
     def validar_grafo(self, grafo: Dict) -> bool:
         """Valida que el grafo esté correctamente construido"""
@@ -241,19 +489,10 @@ class GrafoBuilder:
             if not (-180 <= nodo["longitud"] <= 180):
                 return False
 
-        # Verificar que la matriz de distancias es simétrica
-        for origen in grafo["matriz_distancias"]:
-            for destino in grafo["matriz_distancias"][origen]:
-                if origen != destino:
-                    distancia_origen_destino = grafo["matriz_distancias"][origen][
-                        destino
-                    ]
-                    distancia_destino_origen = grafo["matriz_distancias"][destino][
-                        origen
-                    ]
-
-                    # Permitir pequeñas diferencias por errores de redondeo
-                    if abs(distancia_origen_destino - distancia_destino_origen) > 0.001:
-                        return False
+        # El grafo de vecinos cercanos no es simétrico por construcción
+        if grafo.get("matriz_distancias") is None:
+            return grafo.get("vecinos") is not None
 
-        return True
+        # Verificar que la matriz de distancias es simétrica
+        # (se permiten pequeñas diferencias por errores de redondeo)
+        return grafo["matriz_distancias"].es_simetrica(0.001)
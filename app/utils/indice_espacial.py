@@ -0,0 +1,188 @@
+import math
+from typing import Collection, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .matriz_distancias import RADIO_TIERRA_KM, calcular_matriz_haversine
+
+# Puntos que se esperan en promedio por celda de la grilla
+PUNTOS_POR_CELDA = 4
+KM_POR_GRADO = RADIO_TIERRA_KM * math.pi / 180
+
+
+class IndiceEspacial:
+    """Grilla uniforme sobre las coordenadas de un conjunto de nodos.
+
+    Los nodos se ordenan por celda (fila * columnas + columna) y ``inicio``
+    guarda dónde empieza cada celda, así que las celdas de una misma fila de
+    la grilla ocupan un tramo contiguo. Una consulta solo calcula Haversine
+    para los nodos de las celdas que toca, en lugar de para todos.
+    """
+
+    def __init__(
+        self, elementos: Iterable[Dict], puntos_por_celda: int = PUNTOS_POR_CELDA
+    ):
+        # Se conserva la lista original (sin copiarla) para devolver sus elementos
+        self.elementos = elementos if isinstance(elementos, list) else list(elementos)
+        n = len(self.elementos)
+        self.lats = np.fromiter((e["latitud"] for e in self.elementos), np.float64, n)
+        self.lons = np.fromiter((e["longitud"] for e in self.elementos), np.float64, n)
+
+        if n:
+            self.lat_min, self.lat_max = float(self.lats.min()), float(self.lats.max())
+            self.lon_min, self.lon_max = float(self.lons.min()), float(self.lons.max())
+        else:
+            self.lat_min = self.lat_max = self.lon_min = self.lon_max = 0.0
+
+        # Celdas aproximadamente cuadradas en km
+        alto_km = max((self.lat_max - self.lat_min) * KM_POR_GRADO, 1e-6)
+        ancho_km = max(
+            (self.lon_max - self.lon_min)
+            * KM_POR_GRADO
+            * math.cos(math.radians((self.lat_min + self.lat_max) / 2)),
+            1e-6,
+        )
+        celdas = max(1, n // max(1, puntos_por_celda))
+        self.tam_celda_km = math.sqrt(alto_km * ancho_km / celdas)
+        self.filas = max(1, min(celdas, math.ceil(alto_km / self.tam_celda_km)))
+        self.columnas = max(1, min(celdas, math.ceil(ancho_km / self.tam_celda_km)))
+        self.alto_celda = max(self.lat_max - self.lat_min, 1e-9) / self.filas
+        self.ancho_celda = max(self.lon_max - self.lon_min, 1e-9) / self.columnas
+
+        celda = self._fila(self.lats) * self.columnas + self._columna(self.lons)
+        self.orden = np.argsort(celda, kind="stable")
+        self.inicio = np.searchsorted(
+            celda[self.orden], np.arange(self.filas * self.columnas + 1)
+        )
+
+    def __len__(self) -> int:
+        return len(self.elementos)
+
+    def _fila(self, lats: np.ndarray) -> np.ndarray:
+        filas = np.floor((lats - self.lat_min) / self.alto_celda).astype(np.int64)
+        return np.clip(filas, 0, self.filas - 1)
+
+    def _columna(self, lons: np.ndarray) -> np.ndarray:
+        columnas = np.floor((lons - self.lon_min) / self.ancho_celda).astype(np.int64)
+        return np.clip(columnas, 0, self.columnas - 1)
+
+    def _candidatos(
+        self, lat_min: float, lon_min: float, lat_max: float, lon_max: float
+    ) -> Tuple[np.ndarray, bool]:
+        # Posiciones de los nodos en las celdas que cortan la caja, y si la
+        # caja cubre toda la grilla
+        if (
+            not len(self)
+            or lat_min > lat_max
+            or lon_min > lon_max
+            or lat_max < self.lat_min
+            or lat_min > self.lat_max
+            or lon_max < self.lon_min
+            or lon_min > self.lon_max
+        ):
+            return np.zeros(0, dtype=np.int64), False
+
+        f0, f1 = self._fila(np.array([lat_min, lat_max]))
+        c0, c1 = self._columna(np.array([lon_min, lon_max]))
+        if f0 > f1 or c0 > c1:
+            return np.zeros(0, dtype=np.int64), False
+        cubre_todo = (
+            lat_min <= self.lat_min
+            and lat_max >= self.lat_max
+            and lon_min <= self.lon_min
+            and lon_max >= self.lon_max
+        )
+        tramos = [
+            self.orden[
+                self.inicio[f * self.columnas + c0] : self.inicio[
+                    f * self.columnas + c1 + 1
+                ]
+            ]
+            for f in range(f0, f1 + 1)
+        ]
+        return np.concatenate(tramos), cubre_todo
+
+    def _en_radio(
+        self, lat: float, lon: float, radio_km: float
+    ) -> Tuple[np.ndarray, np.ndarray, bool]:
+        # Caja que contiene al círculo; en longitud se usa la latitud más
+        # alejada del ecuador para no quedarse corto
+        delta_lat = radio_km / KM_POR_GRADO
+        lat_extrema = min(90.0, max(abs(lat - delta_lat), abs(lat + delta_lat)))
+        cos_lat = math.cos(math.radians(lat_extrema))
+        delta_lon = 360.0 if cos_lat < 1e-9 else radio_km / (KM_POR_GRADO * cos_lat)
+        posiciones, cubre_todo = self._candidatos(
+            lat - delta_lat, lon - delta_lon, lat + delta_lat, lon + delta_lon
+        )
+        distancias = calcular_matriz_haversine(
+            [lat], [lon], self.lats[posiciones], self.lons[posiciones]
+        )[0]
+        dentro = distancias <= radio_km
+        return posiciones[dentro], distancias[dentro], cubre_todo
+
+    def en_radio(
+        self, lat: float, lon: float, radio_km: float
+    ) -> List[Tuple[Dict, float]]:
+        """Obtiene los pares (nodo, distancia) a menos de ``radio_km``, del más cercano al más lejano"""
+        posiciones, distancias, _ = self._en_radio(lat, lon, radio_km)
+        orden = np.argsort(distancias, kind="stable")
+        return [
+            (self.elementos[p], d)
+            for p, d in zip(posiciones[orden].tolist(), distancias[orden].tolist())
+        ]
+
+    def k_cercanos(self, lat: float, lon: float, k: int) -> List[Tuple[Dict, float]]:
+        """Obtiene los k pares (nodo, distancia) más cercanos a un punto"""
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+
+        # El radio crece hasta que el círculo contiene k nodos: entonces los
+        # k más cercanos están todos dentro de él
+        radio = self.tam_celda_km * max(1.0, math.sqrt(k / PUNTOS_POR_CELDA))
+        while True:
+            posiciones, distancias, cubre_todo = self._en_radio(lat, lon, radio)
+            if len(posiciones) >= k:
+                break
+            if cubre_todo:
+                posiciones = np.arange(len(self))
+                distancias = calcular_matriz_haversine(
+                    [lat], [lon], self.lats, self.lons
+                )[0]
+                break
+            radio *= 2
+
+        cercanos = np.argpartition(distancias, k - 1)[:k]
+        cercanos = cercanos[np.argsort(distancias[cercanos], kind="stable")]
+        return [
+            (self.elementos[p], d)
+            for p, d in zip(
+                posiciones[cercanos].tolist(), distancias[cercanos].tolist()
+            )
+        ]
+
+    def en_caja(
+        self, lat_min: float, lon_min: float, lat_max: float, lon_max: float
+    ) -> List[Dict]:
+        """Obtiene los nodos dentro de un rectángulo de coordenadas"""
+        posiciones, _ = self._candidatos(lat_min, lon_min, lat_max, lon_max)
+        lats, lons = self.lats[posiciones], self.lons[posiciones]
+        dentro = (
+            (lats >= lat_min)
+            & (lats <= lat_max)
+            & (lons >= lon_min)
+            & (lons <= lon_max)
+        )
+        return [self.elementos[p] for p in np.sort(posiciones[dentro]).tolist()]
+
+
+def obtener_indice_espacial(
+    contenedor: Dict, elementos: Collection[Dict], version: Optional[Hashable] = None
+) -> IndiceEspacial:
+    """Obtiene el índice guardado en ``contenedor``; se reconstruye solo si cambió la versión de los datos"""
+    guardado = contenedor.get("indice_espacial")
+    clave = (version, len(elementos))
+    if guardado is None or guardado[0] != clave:
+        guardado = (clave, IndiceEspacial(elementos))
+        contenedor["indice_espacial"] = guardado
+    return guardado[1]
@@ -0,0 +1,683 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Hashable, Iterator, List, Optional
+
+import numpy as np
+
+RADIO_TIERRA_KM = 6371
+CAPACIDAD_CACHE_MATRICES = 4
+FACTOR_CRECIMIENTO = 1.5
+TAM_BLOQUE_FILAS = 512
+# Memoria aproximada de los temporales float64 de un bloque de filas
+BYTES_POR_BLOQUE = 32 * 1024 * 1024
+# Nodos a partir de los cuales la matriz se construye en paralelo
+UMBRAL_PARALELO = 5000
+
+# Modo de almacenamiento -> (tipo de dato, solo mitad triangular)
+MODOS_ALMACENAMIENTO = {
+    "densa": (np.float64, False),
+    "float32": (np.float32, False),
+    "metros": (np.uint32, False),
+    "triangular": (np.float64, True),
+    "triangular_float32": (np.float32, True),
+    "triangular_metros": (np.uint32, True),
+}
+MODO_POR_DEFECTO = "densa"
+
+
+def calcular_matriz_haversine(
+    lats_origen: np.ndarray,
+    lons_origen: np.ndarray,
+    lats_destino: Optional[np.ndarray] = None,
+    lons_destino: Optional[np.ndarray] = None,
+    dtype=np.float64,
+) -> np.ndarray:
+    """Calcula todas las distancias Haversine (km) entre dos conjuntos de puntos en una sola operación"""
+    if lats_destino is None:
+        lats_destino, lons_destino = lats_origen, lons_origen
+
+    lat1 = np.radians(np.asarray(lats_origen, dtype=np.float64))[:, None]
+    lon1 = np.radians(np.asarray(lons_origen, dtype=np.float64))[:, None]
+    lat2 = np.radians(np.asarray(lats_destino, dtype=np.float64))[None, :]
+    lon2 = np.radians(np.asarray(lons_destino, dtype=np.float64))[None, :]
+
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    return (RADIO_TIERRA_KM * c).astype(dtype, copy=False)
+
+
+def a_unidades_almacenamiento(distancias_km: np.ndarray, dtype) -> np.ndarray:
+    """Convierte distancias en km al tipo de almacenamiento (metros si es entero)"""
+    if np.issubdtype(dtype, np.integer):
+        return np.rint(distancias_km * 1000).astype(dtype)
+    return distancias_km.astype(dtype, copy=False)
+
+
+def posicion_triangular(i, j):
+    """Posición en el arreglo empaquetado del par (i, j) con i > j"""
+    return i * (i - 1) // 2 + j
+
+
+class FilaDistancias(Mapping):
+    """Vista de solo lectura de una fila de la matriz, compatible con un diccionario"""
+
+    def __init__(self, matriz: "MatrizDistancias", posicion: int):
+        self._matriz = matriz
+        self._posicion = posicion
+
+    def __getitem__(self, destino: Hashable) -> float:
+        return self._matriz.valor(self._posicion, self._matriz.indice[destino])
+
+    def __contains__(self, destino: object) -> bool:
+        return destino in self._matriz.indice
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._matriz.ids)
+
+    def __len__(self) -> int:
+        return len(self._matriz.ids)
+
+
+class MatrizDistancias(Mapping):
+    """Matriz de distancias con índice id -> fila.
+
+    Se comporta como el antiguo diccionario de diccionarios
+    (``matriz[origen][destino]``, en km) mientras los algoritmos migran a
+    trabajar con arreglos. El arreglo ``datos`` guarda la matriz según el
+    modo de almacenamiento:
+
+    - ``densa`` / ``float32``: matriz N x N en float64 o float32.
+    - ``metros``: matriz N x N de enteros uint32 en metros.
+    - ``triangular*``: solo la mitad inferior (i > j) empaquetada por filas
+      en un arreglo de N(N-1)/2 elementos, aprovechando la simetría.
+
+    ``valor``, ``fila``, ``submatriz`` y ``como_array`` ocultan esas
+    diferencias; con ``crudo=True`` devuelven las unidades de
+    almacenamiento (por ejemplo, enteros en metros) para que los bucles
+    internos comparen enteros.
+    """
+
+    def __init__(
+        self,
+        ids: List[Hashable],
+        datos: np.ndarray,
+        lats: Optional[np.ndarray] = None,
+        lons: Optional[np.ndarray] = None,
+        modo: str = MODO_POR_DEFECTO,
+    ):
+        if modo not in MODOS_ALMACENAMIENTO:
+            raise ValueError(f"Modo de almacenamiento desconocido: {modo}")
+        n = len(ids)
+        self.triangular = MODOS_ALMACENAMIENTO[modo][1]
+        forma_esperada = (n * (n - 1) // 2,) if self.triangular else (n, n)
+        if datos.shape != forma_esperada:
+            raise ValueError(
+                f"Dimensiones de la matriz {datos.shape} no coinciden con {n} nodos"
+            )
+        self.ids = list(ids)
+        self.indice = {nodo_id: i for i, nodo_id in enumerate(self.ids)}
+        self.datos = datos
+        self.lats = lats
+        self.lons = lons
+        self.modo = modo
+        # Unidades de almacenamiento por km
+        self.escala = 1000 if np.issubdtype(datos.dtype, np.integer) else 1
+        # Arreglo con capacidad sobrante del que ``datos`` es una vista, y
+        # cantidad de filas ya ocupadas en él (compartida entre vistas)
+        self._buffer = datos
+        self._ocupado = [n]
+
+    def __getitem__(self, origen: Hashable) -> FilaDistancias:
+        return FilaDistancias(self, self.indice[origen])
+
+    def __contains__(self, origen: object) -> bool:
+        return origen in self.indice
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria ocupada por las distancias"""
+        return self.datos.nbytes
+
+    def huella(self) -> str:
+        """Hash de los nodos de la matriz, igual al de ``calcular_huella``"""
+        return _huella(self.ids, self.lats, self.lons)
+
+    def posicion(self, nodo_id: Hashable) -> int:
+        """Obtiene la fila/columna asociada a un nodo"""
+        return self.indice[nodo_id]
+
+    def posiciones(self, ids: List[Hashable]) -> np.ndarray:
+        """Obtiene las filas/columnas asociadas a una lista de nodos"""
+        return np.fromiter(
+            (self.indice[nodo_id] for nodo_id in ids), dtype=np.intp, count=len(ids)
+        )
+
+    def valor(self, i: int, j: int) -> float:
+        """Obtiene la distancia en km entre dos posiciones"""
+        if self.triangular:
+            if i == j:
+                return 0.0
+            if i < j:
+                i, j = j, i
+            return float(self.datos[posicion_triangular(i, j)]) / self.escala
+        return float(self.datos[i, j]) / self.escala
+
+    def distancia(self, origen: Hashable, destino: Hashable) -> float:
+        """Obtiene la distancia en km entre dos nodos por su id"""
+        return self.valor(self.indice[origen], self.indice[destino])
+
+    def _bloque(self, filas: np.ndarray, columnas: np.ndarray) -> np.ndarray:
+        if not self.triangular:
+            return self.datos[np.ix_(filas, columnas)]
+        if not self.datos.size:
+            return np.zeros((len(filas), len(columnas)), dtype=self.datos.dtype)
+        i = filas[:, None]
+        j = columnas[None, :]
+        mayor = np.maximum(i, j)
+        menor = np.minimum(i, j)
+        diagonal = mayor == menor
+        valores = self.datos[posicion_triangular(mayor, menor - diagonal)]
+        valores[diagonal] = 0
+        return valores
+
+    def _convertir(self, valores: np.ndarray, crudo: bool) -> np.ndarray:
+        if crudo:
+            return valores
+        if self.escala != 1:
+            return valores / self.escala
+        return valores.astype(np.float64, copy=False)
+
+    def fila(self, i: int, crudo: bool = False) -> np.ndarray:
+        """Obtiene las distancias desde la posición ``i`` a todos los nodos"""
+        if self.triangular:
+            valores = self._bloque(np.array([i]), np.arange(len(self.ids)))[0]
+        else:
+            valores = self.datos[i]
+        return self._convertir(valores, crudo)
+
+    def filas(self, inicio: int, fin: int, crudo: bool = False) -> np.ndarray:
+        """Obtiene el bloque de filas [inicio, fin) completo"""
+        if self.triangular:
+            valores = self._bloque(np.arange(inicio, fin), np.arange(len(self.ids)))
+        else:
+            valores = self.datos[inicio:fin]
+        return self._convertir(valores, crudo)
+
+    def submatriz(self, ids: List[Hashable], crudo: bool = False) -> np.ndarray:
+        """Extrae la submatriz densa de los nodos indicados (en ese orden)"""
+        posiciones = self.posiciones(ids)
+        return self._convertir(self._bloque(posiciones, posiciones), crudo)
+
+    def como_array(self, crudo: bool = False) -> np.ndarray:
+        """Devuelve la matriz completa como arreglo denso de NumPy"""
+        if self.triangular:
+            posiciones = np.arange(len(self.ids))
+            return self._convertir(self._bloque(posiciones, posiciones), crudo)
+        return self._convertir(self.datos, crudo)
+
+    def es_simetrica(self, tolerancia_km: float = 0.001) -> bool:
+        """Verifica la simetría de la matriz (siempre cierta en modo triangular)"""
+        if self.triangular:
+            return True
+        datos = self.datos.astype(np.float64)
+        return bool(np.all(np.abs(datos - datos.T) <= tolerancia_km * self.escala))
+
+    def extender(self, nodos_nuevos: List[Dict]) -> "MatrizDistancias":
+        """Devuelve una nueva matriz con los nodos agregados al final.
+
+        Solo se calculan las filas y columnas nuevas. El espacio se reserva con
+        holgura, así que agregados sucesivos no copian la matriz completa; la
+        matriz original no se modifica.
+        """
+        if self.lats is None or self.lons is None:
+            raise ValueError("La matriz no guarda las coordenadas de sus nodos")
+
+        ids_nuevos = [nodo["id"] for nodo in nodos_nuevos]
+        repetidos = [nodo_id for nodo_id in ids_nuevos if nodo_id in self.indice]
+        if repetidos or len(set(ids_nuevos)) != len(ids_nuevos):
+            raise ValueError(f"Nodos repetidos en la matriz: {repetidos}")
+
+        n = len(self.ids)
+        m = len(ids_nuevos)
+        total = n + m
+        lats_nuevas = np.fromiter(
+            (nodo["latitud"] for nodo in nodos_nuevos), np.float64, m
+        )
+        lons_nuevas = np.fromiter(
+            (nodo["longitud"] for nodo in nodos_nuevos), np.float64, m
+        )
+        lats = np.concatenate([self.lats, lats_nuevas])
+        lons = np.concatenate([self.lons, lons_nuevas])
+
+        # Filas nuevas contra todos los nodos; las columnas salen por simetría
+        bloque = a_unidades_almacenamiento(
+            calcular_matriz_haversine(lats_nuevas, lons_nuevas, lats, lons),
+            self.datos.dtype,
+        )
+        bloque[np.arange(m), n + np.arange(m)] = 0
+
+        buffer, ocupado = self._buffer, self._ocupado
+        tamano = posicion_triangular(total, 0) if self.triangular else total
+        usado = self.datos.shape[0]
+        if buffer.shape[0] < tamano or ocupado[0] != n:
+            # Sin holgura, o la holgura ya la usa otra matriz extendida de esta
+            capacidad = max(tamano, int(tamano * FACTOR_CRECIMIENTO))
+            if self.triangular:
+                buffer = np.empty(capacidad, dtype=self.datos.dtype)
+                buffer[:usado] = self.datos
+            else:
+                buffer = np.empty((capacidad, capacidad), dtype=self.datos.dtype)
+                buffer[:n, :n] = self.datos
+            ocupado = [n]
+
+        if self.triangular:
+            # Las filas nuevas van al final del arreglo empaquetado
+            for k in range(m):
+                i = n + k
+                inicio = posicion_triangular(i, 0)
+                buffer[inicio : inicio + i] = bloque[k, :i]
+            datos = buffer[:tamano]
+        else:
+            buffer[n:total, :total] = bloque
+            buffer[:n, n:total] = bloque[:, :n].T
+            datos = buffer[:total, :total]
+        ocupado[0] = total
+
+        matriz = MatrizDistancias(self.ids + ids_nuevos, datos, lats, lons, self.modo)
+        matriz._buffer = buffer
+        matriz._ocupado = ocupado
+        return matriz
+
+    def a_dict(self) -> Dict[Hashable, Dict[Hashable, float]]:
+        """Convierte la matriz al formato de diccionario de diccionarios"""
+        filas = self.como_array().tolist()
+        return {
+            origen: dict(zip(self.ids, fila)) for origen, fila in zip(self.ids, filas)
+        }
+
+
+def _calcular_bloque_filas(
+    destino: np.ndarray,
+    lats: np.ndarray,
+    lons: np.ndarray,
+    triangular: bool,
+    inicio: int,
+    fin: int,
+):
+    """Calcula las filas [inicio, fin) de la matriz y las escribe en ``destino``"""
+    # En modo triangular solo hacen falta las columnas anteriores a cada fila
+    columnas = fin if triangular else len(lats)
+    bloque = a_unidades_almacenamiento(
+        calcular_matriz_haversine(
+            lats[inicio:fin], lons[inicio:fin], lats[:columnas], lons[:columnas]
+        ),
+        destino.dtype,
+    )
+    if triangular:
+        for i in range(inicio, fin):
+            posicion = posicion_triangular(i, 0)
+            destino[posicion : posicion + i] = bloque[i - inicio, :i]
+    else:
+        bloque[np.arange(fin - inicio), np.arange(inicio, fin)] = 0
+        destino[inicio:fin] = bloque
+
+
+# Estado de cada proceso trabajador del constructor por bloques
+_trabajador = {}
+
+
+def _iniciar_trabajador(
+    ruta: str, lats: np.ndarray, lons: np.ndarray, triangular: bool
+):
+    _trabajador["destino"] = np.load(ruta, mmap_mode="r+")
+    _trabajador["lats"] = lats
+    _trabajador["lons"] = lons
+    _trabajador["triangular"] = triangular
+
+
+def _procesar_bloque(inicio: int, fin: int) -> int:
+    _calcular_bloque_filas(
+        _trabajador["destino"],
+        _trabajador["lats"],
+        _trabajador["lons"],
+        _trabajador["triangular"],
+        inicio,
+        fin,
+    )
+    return fin - inicio
+
+
+def nucleos_disponibles() -> int:
+    """Cantidad de núcleos que puede usar este proceso"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def calcular_tam_bloque(n: int) -> int:
+    """Cantidad de filas por bloque para que los temporales float64 no superen BYTES_POR_BLOQUE"""
+    return max(1, min(TAM_BLOQUE_FILAS, BYTES_POR_BLOQUE // (8 * max(n, 1))))
+
+
+def construir_matriz_nodos(
+    nodos: List[Dict],
+    modo: str = MODO_POR_DEFECTO,
+    trabajadores: Optional[int] = None,
+    tam_bloque: Optional[int] = None,
+    ruta_salida: Optional[str] = None,
+    progreso: Optional[Callable[[int, int], None]] = None,
+) -> MatrizDistancias:
+    """Construye la matriz de distancias para una lista de nodos con latitud/longitud.
+
+    La matriz se calcula por bloques de filas, así que nunca hace falta un
+    temporal de N x N en float64. Con más de un trabajador los bloques se
+    reparten en un pool de procesos que escriben directamente en un archivo
+    .npy mapeado en memoria (``ruta_salida``, o un temporal que luego se
+    carga en RAM). ``progreso(filas_listas, total_filas)`` se invoca al
+    terminar cada bloque.
+
+    Args:
+        trabajadores: procesos a usar; por defecto todos los núcleos a partir
+            de UMBRAL_PARALELO nodos y uno solo por debajo.
+        tam_bloque: filas por bloque; por defecto según BYTES_POR_BLOQUE.
+        ruta_salida: archivo .npy donde dejar la matriz (memoria mapeada).
+    """
+    if modo not in MODOS_ALMACENAMIENTO:
+        raise ValueError(f"Modo de almacenamiento desconocido: {modo}")
+    dtype, triangular = MODOS_ALMACENAMIENTO[modo]
+
+    n = len(nodos)
+    lats = np.fromiter((nodo["latitud"] for nodo in nodos), np.float64, n)
+    lons = np.fromiter((nodo["longitud"] for nodo in nodos), np.float64, n)
+    ids = [nodo["id"] for nodo in nodos]
+    forma = (posicion_triangular(n, 0),) if triangular else (n, n)
+
+    if trabajadores is None:
+        trabajadores = nucleos_disponibles() if n >= UMBRAL_PARALELO else 1
+    tam_bloque = tam_bloque or calcular_tam_bloque(n)
+    bloques = [
+        (inicio, min(inicio + tam_bloque, n)) for inicio in range(0, n, tam_bloque)
+    ]
+    filas_listas = 0
+
+    if trabajadores <= 1 or len(bloques) <= 1:
+        if ruta_salida:
+            datos = np.lib.format.open_memmap(ruta_salida, "w+", dtype, forma)
+        else:
+            datos = np.empty(forma, dtype=dtype)
+        for inicio, fin in bloques:
+            _calcular_bloque_filas(datos, lats, lons, triangular, inicio, fin)
+            filas_listas += fin - inicio
+            if progreso:
+                progreso(filas_listas, n)
+        return MatrizDistancias(ids, datos, lats, lons, modo)
+
+    ruta = ruta_salida
+    if ruta is None:
+        descriptor, ruta = tempfile.mkstemp(suffix=".npy")
+        os.close(descriptor)
+    try:
+        salida = np.lib.format.open_memmap(ruta, "w+", dtype, forma)
+        salida.flush()
+        with ProcessPoolExecutor(
+            max_workers=trabajadores,
+            initializer=_iniciar_trabajador,
+            initargs=(ruta, lats, lons, triangular),
+        ) as pool:
+            futuros = [pool.submit(_procesar_bloque, *bloque) for bloque in bloques]
+            for futuro in as_completed(futuros):
+                filas_listas += futuro.result()
+                if progreso:
+                    progreso(filas_listas, n)
+
+        if ruta_salida:
+            datos = salida
+        else:
+            datos = np.array(salida)
+            del salida
+    finally:
+        if ruta_salida is None and os.path.exists(ruta):
+            os.remove(ruta)
+
+    return MatrizDistancias(ids, datos, lats, lons, modo)
+
+
+def calcular_huella(nodos: List[Dict]) -> str:
+    """Calcula un hash del contenido (ids y coordenadas) de una lista de nodos"""
+    lats = np.fromiter((nodo["latitud"] for nodo in nodos), np.float64, len(nodos))
+    lons = np.fromiter((nodo["longitud"] for nodo in nodos), np.float64, len(nodos))
+    return _huella([nodo["id"] for nodo in nodos], lats, lons)
+
+
+def _huella(ids: List[Hashable], lats: np.ndarray, lons: np.ndarray) -> str:
+    huella = hashlib.sha1()
+    huella.update(repr(ids).encode())
+    huella.update(lats.tobytes())
+    huella.update(lons.tobytes())
+    return huella.hexdigest()
+
+
+class CacheMatrices:
+    """Caché LRU de matrices de distancias compartida por todo el proceso.
+
+    Las matrices se indexan por la huella de los nodos (depósito incluido) y
+    el modo de almacenamiento, de modo que GrafoBuilder y los algoritmos
+    reutilizan la misma matriz mientras el conjunto de clientes no cambie.
+    Quien no pide un modo concreto recibe la matriz ya construida en
+    cualquier modo. Las matrices guardadas son de solo lectura.
+
+    ``consultar``/``almacenar`` permiten guardar otras estructuras derivadas
+    de los mismos nodos (por ejemplo, listas de vecinos) con otra etiqueta.
+    """
+
+    def __init__(self, capacidad: int = CAPACIDAD_CACHE_MATRICES):
+        self.capacidad = capacidad
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self._entradas: "OrderedDict[tuple, MatrizDistancias]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _buscar(self, huella: str, modo: Optional[str]) -> Optional[MatrizDistancias]:
+        if modo is not None:
+            return self._entradas.get((huella, modo))
+        for (huella_entrada, etiqueta), matriz in reversed(self._entradas.items()):
+            if huella_entrada == huella and etiqueta in MODOS_ALMACENAMIENTO:
+                return matriz
+        return None
+
+    def buscar(
+        self, huella: str, modo: Optional[str] = None
+    ) -> Optional[MatrizDistancias]:
+        """Busca una matriz por huella sin construirla ni contar la consulta"""
+        with self._lock:
+            return self._buscar(huella, modo)
+
+    def obtener(
+        self, nodos: List[Dict], modo: Optional[str] = None, **opciones_construccion
+    ) -> MatrizDistancias:
+        """Devuelve la matriz de los nodos, construyéndola solo si no está en caché.
+
+        ``opciones_construccion`` se pasan a construir_matriz_nodos
+        (trabajadores, tam_bloque, progreso).
+        """
+        huella = calcular_huella(nodos)
+
+        with self._lock:
+            matriz = self._buscar(huella, modo)
+            if matriz is not None:
+                self._entradas.move_to_end((huella, matriz.modo))
+                self.aciertos += 1
+                return matriz
+            self.fallos += 1
+
+        matriz = construir_matriz_nodos(
+            nodos, modo=modo or MODO_POR_DEFECTO, **opciones_construccion
+        )
+        self.guardar(huella, matriz)
+        return matriz
+
+    def registrar(self, nodos: List[Dict], matriz: MatrizDistancias):
+        """Registra una matriz construida fuera de la caché (por ejemplo, extendida)"""
+        self.guardar(calcular_huella(nodos), matriz)
+
+    def guardar(self, huella: str, matriz: MatrizDistancias):
+        """Registra una matriz ya construida bajo la huella indicada"""
+        matriz.datos.flags.writeable = False
+        self.almacenar(huella, matriz.modo, matriz)
+
+    def consultar(self, huella: str, etiqueta: str):
+        """Busca una estructura guardada con ``almacenar``; None si no está"""
+        clave = (huella, etiqueta)
+        with self._lock:
+            valor = self._entradas.get(clave)
+            if valor is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def almacenar(self, huella: str, etiqueta: str, valor):
+        """Guarda una estructura asociada a la huella de unos nodos"""
+        clave = (huella, etiqueta)
+        with self._lock:
+            self._entradas[clave] = valor
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+
+    def limpiar(self):
+        """Vacía la caché y reinicia los contadores"""
+        with self._lock:
+            self._entradas.clear()
+            self.aciertos = 0
+            self.fallos = 0
+            self.desalojos = 0
+
+    def estadisticas(self) -> Dict:
+        """Obtiene los contadores de uso de la caché"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "capacidad": self.capacidad,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0,
+                "memoria_bytes": sum(m.nbytes for m in self._entradas.values()),
+            }
+
+
+# Caché única para todo el proceso
+cache_matrices = CacheMatrices()
+
+
+def ruta_instantanea(archivo_origen: str, nodos: List[Dict], modo: str) -> str:
+    """Obtiene la ruta base de la instantánea de la matriz de un dataset.
+
+    La clave es el hash del contenido del archivo y del depósito, así que un
+    archivo modificado nunca reutiliza una instantánea vieja.
+    """
+    contenido = hashlib.sha256()
+    with open(archivo_origen, "rb") as f:
+        for trozo in iter(lambda: f.read(1 << 20), b""):
+            contenido.update(trozo)
+    deposito = nodos[0]
+    contenido.update(repr((deposito["latitud"], deposito["longitud"])).encode())
+
+    base, _ = os.path.splitext(archivo_origen)
+    return f"{base}.matriz-{modo}-{contenido.hexdigest()[:16]}"
+
+
+def _guardar_atomico(ruta: str, escribir):
+    directorio = os.path.dirname(ruta) or "."
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            escribir(f)
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def guardar_instantanea(matriz: MatrizDistancias, ruta_base: str):
+    """Guarda la matriz (.npy) y su índice de nodos (.npz) en disco"""
+    _guardar_atomico(
+        ruta_base + ".npz",
+        lambda f: np.savez(
+            f,
+            ids=np.array(json.dumps(matriz.ids)),
+            lats=matriz.lats,
+            lons=matriz.lons,
+            modo=np.array(matriz.modo),
+        ),
+    )
+    # La matriz se escribe al final: su presencia indica una instantánea completa
+    _guardar_atomico(
+        ruta_base + ".npy", lambda f: np.save(f, np.ascontiguousarray(matriz.datos))
+    )
+
+
+def cargar_instantanea(ruta_base: str) -> Optional[MatrizDistancias]:
+    """Abre una instantánea con memoria mapeada; devuelve None si no existe o no es válida"""
+    if not (os.path.exists(ruta_base + ".npy") and os.path.exists(ruta_base + ".npz")):
+        return None
+    try:
+        with np.load(ruta_base + ".npz") as indice:
+            ids = json.loads(str(indice["ids"]))
+            lats = indice["lats"]
+            lons = indice["lons"]
+            modo = str(indice["modo"])
+        datos = np.load(ruta_base + ".npy", mmap_mode="r")
+        return MatrizDistancias(ids, datos, lats, lons, modo)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def obtener_matriz_persistida(
+    archivo_origen: str,
+    nodos: List[Dict],
+    modo: str = MODO_POR_DEFECTO,
+    **opciones_construccion,
+) -> MatrizDistancias:
+    """Obtiene la matriz de un dataset desde su instantánea en disco o la construye y la guarda.
+
+    La matriz queda registrada en la caché del proceso, así que los
+    consumidores posteriores (GrafoBuilder, algoritmos) la reutilizan. Varios
+    procesos que abren la misma instantánea comparten las páginas mapeadas.
+    """
+    ruta_base = ruta_instantanea(archivo_origen, nodos, modo)
+    matriz = cargar_instantanea(ruta_base)
+    ids = [nodo["id"] for nodo in nodos]
+
+    if matriz is None or matriz.ids != ids or matriz.modo != modo:
+        matriz = construir_matriz_nodos(nodos, modo=modo, **opciones_construccion)
+        try:
+            guardar_instantanea(matriz, ruta_base)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar la instantánea de la matriz: {e}")
+
+    cache_matrices.registrar(nodos, matriz)
+    return matriz
@@ -0,0 +1,243 @@
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from .matriz_distancias import (
+    MatrizDistancias,
+    cache_matrices,
+    calcular_huella,
+    calcular_matriz_haversine,
+    calcular_tam_bloque,
+)
+
+K_VECINOS_POR_DEFECTO = 10
+
+
+def _k_menores(distancias: np.ndarray, columnas: np.ndarray, k: int):
+    """Selecciona por fila las k columnas de menor distancia, ordenadas"""
+    if k <= 0:
+        vacio = np.empty((distancias.shape[0], 0))
+        return vacio.astype(np.int64), vacio
+    if k < distancias.shape[1]:
+        parte = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+        distancias = np.take_along_axis(distancias, parte, axis=1)
+        columnas = np.take_along_axis(columnas, parte, axis=1)
+    orden = np.argsort(distancias, axis=1, kind="stable")
+    return (
+        np.take_along_axis(columnas, orden, axis=1),
+        np.take_along_axis(distancias, orden, axis=1),
+    )
+
+
+class VecinosCercanos:
+    """Grafo disperso con los k vecinos más cercanos de cada nodo.
+
+    El nodo en la posición 0 es el depósito: todos los nodos tienen arista
+    hacia él y él tiene arista hacia todos, para que cualquier cliente sea
+    alcanzable. Las listas se exponen en formato CSR (``indptr``,
+    ``indices``, ``pesos``), así que recorrer los vecinos de un nodo cuesta
+    O(k) en lugar de O(N).
+    """
+
+    def __init__(
+        self,
+        ids: List[Hashable],
+        lats: np.ndarray,
+        lons: np.ndarray,
+        knn_indices: np.ndarray,
+        knn_distancias: np.ndarray,
+        k: int,
+    ):
+        self.ids = list(ids)
+        self.indice = {nodo_id: i for i, nodo_id in enumerate(self.ids)}
+        self.lats = lats
+        self.lons = lons
+        self.k = k
+        # Vecinos más cercanos de cada nodo (N x k), ordenados por distancia
+        self.knn_indices = knn_indices
+        self.knn_distancias = knn_distancias
+        self.distancias_deposito = calcular_matriz_haversine(
+            lats[:1], lons[:1], lats, lons
+        )[0]
+        self.distancias_deposito[0] = 0
+        self._construir_csr()
+
+    def _construir_csr(self):
+        n = len(self.ids)
+        if n <= 1:
+            self.indptr = np.zeros(n + 1, dtype=np.int64)
+            self.indices = np.zeros(0, dtype=np.int64)
+            self.pesos = np.zeros(0)
+            return
+
+        # Filas de clientes: sus k vecinos más la arista al depósito si falta
+        tiene_deposito = (self.knn_indices[1:] == 0).any(axis=1)
+        extra_indices = np.where(tiene_deposito, -1, 0)[:, None]
+        extra_pesos = self.distancias_deposito[1:, None]
+        indices = np.hstack([self.knn_indices[1:], extra_indices])
+        pesos = np.hstack([self.knn_distancias[1:], extra_pesos])
+        validos = indices >= 0
+
+        # Fila del depósito: todos los clientes ordenados por distancia
+        orden_deposito = np.argsort(self.distancias_deposito[1:], kind="stable") + 1
+
+        conteos = np.concatenate([[n - 1], validos.sum(axis=1)])
+        self.indptr = np.concatenate([[0], np.cumsum(conteos)]).astype(np.int64)
+        self.indices = np.concatenate([orden_deposito, indices[validos]]).astype(
+            np.int64
+        )
+        self.pesos = np.concatenate(
+            [self.distancias_deposito[orden_deposito], pesos[validos]]
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, nodo_id: object) -> bool:
+        return nodo_id in self.indice
+
+    @property
+    def total_aristas(self) -> int:
+        return int(self.indptr[-1])
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria ocupada por las listas de vecinos"""
+        return (
+            self.knn_indices.nbytes
+            + self.knn_distancias.nbytes
+            + self.indptr.nbytes
+            + self.indices.nbytes
+            + self.pesos.nbytes
+        )
+
+    def vecinos(self, posicion: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Obtiene las posiciones y distancias de los vecinos de un nodo"""
+        inicio, fin = self.indptr[posicion], self.indptr[posicion + 1]
+        return self.indices[inicio:fin], self.pesos[inicio:fin]
+
+    def candidatos(self, posicion: int, k: Optional[int] = None) -> np.ndarray:
+        """Obtiene los k vecinos más cercanos de un nodo (sin la arista extra al depósito)"""
+        return self.knn_indices[posicion, :k]
+
+    def vecinos_de(self, nodo_id: Hashable) -> List[Tuple[Hashable, float]]:
+        """Obtiene los pares (id vecino, distancia) de un nodo"""
+        indices, pesos = self.vecinos(self.indice[nodo_id])
+        return [(self.ids[j], p) for j, p in zip(indices.tolist(), pesos.tolist())]
+
+    def distancia(self, origen: Hashable, destino: Hashable) -> float:
+        """Obtiene la distancia de una arista del grafo; KeyError si no existe"""
+        indices, pesos = self.vecinos(self.indice[origen])
+        encontrados = np.flatnonzero(indices == self.indice[destino])
+        if not len(encontrados):
+            raise KeyError(f"{origen}_{destino}")
+        return float(pesos[encontrados[0]])
+
+    def iterar_aristas(self):
+        """Recorre los pares (origen, destino) de todas las aristas"""
+        for i, origen in enumerate(self.ids):
+            indices, _ = self.vecinos(i)
+            for j in indices.tolist():
+                yield origen, self.ids[j]
+
+    def extender(
+        self,
+        ids_nuevos: List[Hashable],
+        lats_nuevas: np.ndarray,
+        lons_nuevas: np.ndarray,
+    ) -> "VecinosCercanos":
+        """Devuelve un nuevo grafo con los nodos agregados al final.
+
+        Solo se calculan las distancias entre los nodos nuevos y todos los
+        demás: O(N·m) en lugar de recalcular las N² distancias.
+        """
+        n = len(self.ids)
+        m = len(ids_nuevos)
+        lats = np.concatenate([self.lats, lats_nuevas])
+        lons = np.concatenate([self.lons, lons_nuevas])
+        k = min(self.k, n + m - 1)
+
+        # Distancias de los nodos nuevos a todos (incluidos los nuevos)
+        nuevos = calcular_matriz_haversine(lats_nuevas, lons_nuevas, lats, lons)
+        nuevos[np.arange(m), n + np.arange(m)] = np.inf
+        columnas = np.broadcast_to(np.arange(n + m), nuevos.shape)
+        knn_nuevos, dist_nuevos = _k_menores(nuevos, columnas, k)
+
+        # Los nodos existentes solo pueden ganar como vecinos a los nodos nuevos
+        candidatos_distancias = np.hstack([self.knn_distancias, nuevos[:, :n].T])
+        candidatos_indices = np.hstack(
+            [self.knn_indices, np.broadcast_to(n + np.arange(m), (n, m))]
+        )
+        knn_viejos, dist_viejos = _k_menores(
+            candidatos_distancias, candidatos_indices, k
+        )
+
+        return VecinosCercanos(
+            self.ids + list(ids_nuevos),
+            lats,
+            lons,
+            np.vstack([knn_viejos, knn_nuevos]),
+            np.vstack([dist_viejos, dist_nuevos]),
+            self.k,
+        )
+
+
+def calcular_vecinos_cercanos(
+    ids: List[Hashable],
+    lats: np.ndarray,
+    lons: np.ndarray,
+    k: int,
+    matriz: Optional[MatrizDistancias] = None,
+) -> VecinosCercanos:
+    """Calcula los k vecinos más cercanos de cada nodo (el depósito en la posición 0).
+
+    Si se dispone de la matriz de distancias se reutilizan sus filas; si no,
+    las distancias se calculan por bloques de filas sin llegar a formar la
+    matriz completa.
+    """
+    n = len(ids)
+    k_efectivo = max(0, min(k, n - 1))
+    knn_indices = np.empty((n, k_efectivo), dtype=np.int64)
+    knn_distancias = np.empty((n, k_efectivo))
+
+    tam_bloque = calcular_tam_bloque(n)
+    for inicio in range(0, n, tam_bloque):
+        fin = min(inicio + tam_bloque, n)
+        if matriz is not None:
+            bloque = np.array(matriz.filas(inicio, fin), dtype=np.float64)
+        else:
+            bloque = calcular_matriz_haversine(
+                lats[inicio:fin], lons[inicio:fin], lats, lons
+            )
+        bloque[np.arange(fin - inicio), np.arange(inicio, fin)] = np.inf
+        columnas = np.broadcast_to(np.arange(n), bloque.shape)
+        knn_indices[inicio:fin], knn_distancias[inicio:fin] = _k_menores(
+            bloque, columnas, k_efectivo
+        )
+
+    return VecinosCercanos(ids, lats, lons, knn_indices, knn_distancias, k)
+
+
+def obtener_vecinos_cercanos(
+    nodos: List[Dict], k: int = K_VECINOS_POR_DEFECTO
+) -> VecinosCercanos:
+    """Obtiene las listas de vecinos de los nodos desde la caché del proceso.
+
+    Si la caché ya tiene la matriz completa de esos nodos, las listas se
+    extraen de ella en lugar de recalcular distancias.
+    """
+    huella = calcular_huella(nodos)
+    etiqueta = f"knn-{k}"
+    vecinos = cache_matrices.consultar(huella, etiqueta)
+    if vecinos is None:
+        lats = np.fromiter((nodo["latitud"] for nodo in nodos), np.float64, len(nodos))
+        lons = np.fromiter((nodo["longitud"] for nodo in nodos), np.float64, len(nodos))
+        vecinos = calcular_vecinos_cercanos(
+            [nodo["id"] for nodo in nodos],
+            lats,
+            lons,
+            k,
+            matriz=cache_matrices.buscar(huella),
+        )
+        cache_matrices.almacenar(huella, etiqueta, vecinos)
+    return vecinos
@@ -0,0 +1,161 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .calculos_comunes import DEPOSITO
+from .indice_espacial import KM_POR_GRADO
+
+# Demanda que una zona puede tener sobre el promedio en el k-means balanceado
+HOLGURA_ZONAS = 0.1
+ITERACIONES_KMEANS = 10
+# Zonas más cercanas (por centroide) que se consideran vecinas de cada zona
+ZONAS_VECINAS = 2
+
+
+def proyectar(nodos: List[Dict], origen: Optional[Dict] = None) -> np.ndarray:
+    """Coordenadas planas (km) de los nodos respecto de ``origen``.
+
+    Proyección equirectangular: suficiente para agrupar puntos de una
+    ciudad, no para medir distancias.
+    """
+    origen = origen or DEPOSITO
+    lats = np.fromiter((n["latitud"] for n in nodos), np.float64, len(nodos))
+    lons = np.fromiter((n["longitud"] for n in nodos), np.float64, len(nodos))
+    escala_lon = KM_POR_GRADO * math.cos(math.radians(origen["latitud"]))
+    return np.column_stack(
+        [
+            (lons - origen["longitud"]) * escala_lon,
+            (lats - origen["latitud"]) * KM_POR_GRADO,
+        ]
+    )
+
+
+def _demandas(clientes: List[Dict]) -> np.ndarray:
+    return np.fromiter((c["pedido"] for c in clientes), np.float64, len(clientes))
+
+
+def dividir_por_barrido(
+    clientes: List[Dict], num_zonas: int, deposito: Optional[Dict] = None
+) -> List[List[int]]:
+    """Divide los clientes en sectores angulares alrededor del depósito.
+
+    Los clientes se recorren por ángulo desde el mayor hueco angular entre
+    ellos (así ningún sector queda partido por ese hueco) y se cortan en
+    ``num_zonas`` sectores de demanda parecida. Devuelve las posiciones en
+    ``clientes`` de cada zona, sin zonas vacías.
+    """
+    n = len(clientes)
+    if not n:
+        return []
+    num_zonas = max(1, min(num_zonas, n))
+
+    puntos = proyectar(clientes, deposito)
+    angulos = np.arctan2(puntos[:, 1], puntos[:, 0])
+    orden = np.argsort(angulos, kind="stable")
+    ordenados = angulos[orden]
+    huecos = np.diff(np.append(ordenados, ordenados[0] + 2 * math.pi))
+    orden = np.roll(orden, -((int(np.argmax(huecos)) + 1) % n))
+
+    demandas = _demandas(clientes)[orden]
+    total = demandas.sum()
+    if total > 0:
+        # Cada cliente va al sector donde cae la mitad de su pedido
+        acumulada = np.cumsum(demandas) - demandas / 2
+        etiquetas = (acumulada / total * num_zonas).astype(np.int64)
+    else:
+        etiquetas = np.arange(n) * num_zonas // n
+    etiquetas = np.minimum(etiquetas, num_zonas - 1)
+
+    zonas = [orden[etiquetas == z].tolist() for z in range(num_zonas)]
+    return [zona for zona in zonas if zona]
+
+
+def _asignar_con_limite(
+    puntos: np.ndarray, centros: np.ndarray, demandas: np.ndarray, limite: float
+) -> np.ndarray:
+    """Zona de cada punto: la más cercana que todavía tenga demanda libre.
+
+    Primero se asignan los puntos que más pierden si no van a su centro más
+    cercano; si ninguna zona tiene lugar, el punto va a la menos cargada.
+    """
+    distancias = np.linalg.norm(puntos[:, None, :] - centros[None, :, :], axis=2)
+    preferencias = np.argsort(distancias, axis=1)
+    if len(centros) > 1:
+        filas = np.arange(len(puntos))
+        ventaja = (
+            distancias[filas, preferencias[:, 1]]
+            - distancias[filas, preferencias[:, 0]]
+        )
+    else:
+        ventaja = np.zeros(len(puntos))
+
+    carga = [0.0] * len(centros)
+    etiquetas = np.empty(len(puntos), dtype=np.int64)
+    for i in np.argsort(-ventaja, kind="stable").tolist():
+        demanda = demandas[i]
+        for z in preferencias[i].tolist():
+            if carga[z] + demanda <= limite:
+                break
+        else:
+            z = min(range(len(carga)), key=carga.__getitem__)
+        carga[z] += demanda
+        etiquetas[i] = z
+    return etiquetas
+
+
+def dividir_por_kmeans(
+    clientes: List[Dict],
+    num_zonas: int,
+    deposito: Optional[Dict] = None,
+    holgura: float = HOLGURA_ZONAS,
+) -> List[List[int]]:
+    """Divide los clientes con k-means balanceado por demanda.
+
+    Parte de los centroides del barrido y alterna asignar cada cliente a la
+    zona más cercana con demanda libre (ninguna supera el promedio por más
+    de ``holgura``) y recalcular los centroides, hasta que las zonas no
+    cambien o se cumplan ITERACIONES_KMEANS. Devuelve las posiciones en
+    ``clientes`` de cada zona, sin zonas vacías.
+    """
+    zonas = dividir_por_barrido(clientes, num_zonas, deposito)
+    if len(zonas) <= 1:
+        return zonas
+
+    puntos = proyectar(clientes, deposito)
+    demandas = _demandas(clientes)
+    k = len(zonas)
+    centros = np.array([puntos[zona].mean(axis=0) for zona in zonas])
+    limite = demandas.sum() / k * (1 + holgura)
+
+    etiquetas = None
+    for _ in range(ITERACIONES_KMEANS):
+        nuevas = _asignar_con_limite(puntos, centros, demandas, limite)
+        if etiquetas is not None and np.array_equal(nuevas, etiquetas):
+            break
+        etiquetas = nuevas
+        conteo = np.bincount(etiquetas, minlength=k)
+        ocupadas = conteo > 0
+        for eje in range(2):
+            sumas = np.bincount(etiquetas, weights=puntos[:, eje], minlength=k)
+            centros[ocupadas, eje] = sumas[ocupadas] / conteo[ocupadas]
+
+    zonas = [np.flatnonzero(etiquetas == z).tolist() for z in range(k)]
+    return [zona for zona in zonas if zona]
+
+
+def zonas_vecinas(
+    clientes: List[Dict], zonas: List[List[int]], vecinas: int = ZONAS_VECINAS
+) -> List[Tuple[int, int]]:
+    """Pares (a, b), a < b, de zonas cuyos centroides están entre los más cercanos"""
+    if len(zonas) < 2:
+        return []
+    puntos = proyectar(clientes)
+    centros = np.array([puntos[zona].mean(axis=0) for zona in zonas])
+    distancias = np.linalg.norm(centros[:, None, :] - centros[None, :, :], axis=2)
+    np.fill_diagonal(distancias, np.inf)
+    vecinas = min(vecinas, len(zonas) - 1)
+    pares = set()
+    for a, fila in enumerate(np.argsort(distancias, axis=1)[:, :vecinas].tolist()):
+        pares.update((min(a, b), max(a, b)) for b in fila)
+    return sorted(pares)